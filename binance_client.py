@@ -5,15 +5,32 @@ Handles all API communication with Binance
 
 import hashlib
 import hmac
+import json
+import re
+import threading
 import time
 from typing import Dict, List, Optional, Any
 from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
 
 import config
 from logger import logger
 
+# orjson is optional - parses kline-heavy responses several times faster
+try:
+    import orjson
+    json_loads = orjson.loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    json_loads = json.loads
+    ORJSON_AVAILABLE = False
+
+# Index / delivery / DeFi composite symbols - filtered out of pair lists
+# (pump_detector imports this too, so both filters stay in step)
+SPECIAL_PAIR = re.compile(r'_|DEFI|INDEX')
+
 
 class BinanceClient:
     """Client for Binance USDT-M Futures API"""
@@ -28,13 +45,71 @@ class BinanceClient:
             'X-MBX-APIKEY': self.api_key
         })
         
+        # Enough keep-alive connections for the thread pools that share this
+        # session (watcher 16 + scanner 10 + protective orders 4), so concurrent
+        # fetches reuse TLS connections instead of reconnecting
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=32)
+        self.session.mount('https://', adapter)
+        
         # Rate limiting
         self.last_request_time = 0
         self.min_request_interval = 0.1  # 100ms between requests
+        
+        # Server clock offset for signed requests (resynced in the background)
+        self.time_offset_ms = 0
+        self.time_sync_interval = 60  # seconds
+        self.time_sync_retry = 5  # seconds until the next attempt while never synced
+        self.time_sync_timeout = 5  # seconds per /fapi/v1/time request
+        self._time_synced = False
+        self._time_sync_started = False  # Resync loop running (started once)
+        self._time_sync_lock = threading.Lock()
+        self._time_sync_timer: Optional[threading.Timer] = None
+        
+        # Symbol trading rules from exchangeInfo, loaded once
+        self._symbol_info: Dict[str, Dict] = {}
+        self._symbol_info_loaded_at = 0.0
+        self.symbol_info_reload_interval = 60  # min seconds between reloads for unknown symbols
     
     def _get_timestamp(self) -> int:
-        """Get current timestamp in milliseconds"""
-        return int(time.time() * 1000)
+        """Get current timestamp in milliseconds, adjusted to server time"""
+        return int(time.time() * 1000) + self.time_offset_ms
+    
+    def sync_time(self):
+        """Update the local/server clock offset from /fapi/v1/time"""
+        try:
+            # Direct call (no rate-limit sleep) so the round trip is tight
+            local_ms = int(time.time() * 1000)
+            response = self.session.get(f"{self.base_url}/fapi/v1/time",
+                                        timeout=self.time_sync_timeout)
+            response.raise_for_status()
+            server_ms = response.json()['serverTime']
+            # Assume the server stamped the response halfway through the round trip
+            self.time_offset_ms = server_ms - (local_ms + int(time.time() * 1000)) // 2
+            self._time_synced = True
+            logger.debug(f"Server time offset: {self.time_offset_ms}ms")
+        except Exception as e:
+            logger.debug(f"Time sync failed: {e}")
+    
+    def _start_time_sync(self):
+        """First sync plus the background resync loop - once per client"""
+        with self._time_sync_lock:
+            if self._time_sync_started:
+                return
+            # Under the lock so concurrent first signed calls wait for the offset
+            self.sync_time()
+            self._schedule_time_sync()
+            self._time_sync_started = True
+    
+    def _schedule_time_sync(self):
+        """Resync every time_sync_interval seconds (sooner while the first sync keeps failing)"""
+        delay = self.time_sync_interval if self._time_synced else self.time_sync_retry
+        self._time_sync_timer = threading.Timer(delay, self._time_sync_loop)
+        self._time_sync_timer.daemon = True
+        self._time_sync_timer.start()
+    
+    def _time_sync_loop(self):
+        self.sync_time()
+        self._schedule_time_sync()
     
     def _sign(self, params: Dict) -> str:
         """Generate HMAC SHA256 signature"""
@@ -54,15 +129,19 @@ class BinanceClient:
         self.last_request_time = time.time()
     
     def _request(self, method: str, endpoint: str, params: Dict = None, 
-                 signed: bool = False) -> Any:
+                 signed: bool = False, _retried: bool = False) -> Any:
         """Make API request with error handling"""
         
+        if signed and not self._time_sync_started:
+            self._start_time_sync()
+        
         self._rate_limit()
         
         url = f"{self.base_url}{endpoint}"
         params = params or {}
         
         if signed:
+            params.pop('signature', None)
             params['timestamp'] = self._get_timestamp()
             params['signature'] = self._sign(params)
         
@@ -77,18 +156,26 @@ class BinanceClient:
                 raise ValueError(f"Unsupported method: {method}")
             
             response.raise_for_status()
-            return response.json()
+            return json_loads(response.content)
             
         except requests.exceptions.HTTPError as e:
             error_msg = f"HTTP Error: {e}"
+            error_code = None
             try:
                 error_data = response.json()
                 error_code = error_data.get('code')
                 error_msg = f"API Error {error_code}: {error_data.get('msg')}"
-                # Don't log harmless errors
-                if error_code != -4046:  # "No need to change margin type"
-                    logger.error(error_msg)
             except:
+                pass
+            
+            # Timestamp outside recvWindow - resync the clock and retry once
+            if error_code == -1021 and signed and not _retried:
+                logger.warning("⏱️ Timestamp rejected, resyncing server time...")
+                self.sync_time()
+                return self._request(method, endpoint, params, signed, _retried=True)
+            
+            # Don't log harmless errors
+            if error_code != -4046:  # "No need to change margin type"
                 logger.error(error_msg)
             raise Exception(error_msg)
             
@@ -142,15 +229,20 @@ class BinanceClient:
             params['symbol'] = symbol
         return self._request('GET', '/fapi/v1/premiumIndex', params)
     
+    def get_all_mark_prices(self) -> Dict[str, float]:
+        """Get mark prices for every symbol in one request"""
+        return {p['symbol']: float(p['markPrice']) for p in self.get_mark_price()}
+    
     def get_top_pairs_by_volume(self, count: int = 30) -> List[str]:
         """Get top trading pairs sorted by 24h volume"""
         tickers = self.get_ticker_24h()
+        quote = config.QUOTE_ASSET
         
         # Filter USDT perpetual pairs only
         usdt_pairs = [
             t for t in tickers 
-            if t['symbol'].endswith(config.QUOTE_ASSET) 
-            and not any(x in t['symbol'] for x in ['_', 'DEFI', 'INDEX'])
+            if t['symbol'].endswith(quote) 
+            and not SPECIAL_PAIR.search(t['symbol'])
         ]
         
         # Sort by quote volume (USDT volume)
@@ -173,38 +265,27 @@ class BinanceClient:
             List of symbols sorted by volatility (highest first)
         """
         tickers = self.get_ticker_24h()
-        
-        # Filter USDT perpetual pairs only
-        usdt_pairs = [
-            t for t in tickers 
-            if t['symbol'].endswith(config.QUOTE_ASSET) 
-            and not any(x in t['symbol'] for x in ['_', 'DEFI', 'INDEX'])
-        ]
-        
-        # Apply blacklist filter
-        blacklist = getattr(config, 'BLACKLIST', [])
-        usdt_pairs = [
-            t for t in usdt_pairs 
-            if t['symbol'] not in blacklist
-        ]
-        
-        # Filter by minimum volatility
+        quote = config.QUOTE_ASSET
+        blacklist = frozenset(getattr(config, 'BLACKLIST', []))
         min_volatility = getattr(config, 'MIN_VOLATILITY_PERCENT', 1.0)
-        volatile_pairs = [
-            t for t in usdt_pairs
-            if abs(float(t.get('priceChangePercent', 0))) >= min_volatility
-        ]
+        
+        # One pass: USDT perpetuals only, not blacklisted, above min volatility
+        volatile_pairs = []
+        for t in tickers:
+            symbol = t['symbol']
+            if not symbol.endswith(quote) or symbol in blacklist or SPECIAL_PAIR.search(symbol):
+                continue
+            
+            change = abs(float(t.get('priceChangePercent', 0)))
+            if change >= min_volatility:
+                volatile_pairs.append((change, symbol))
         
         # Sort by absolute price change (volatility)
-        sorted_pairs = sorted(
-            volatile_pairs, 
-            key=lambda x: abs(float(x.get('priceChangePercent', 0))), 
-            reverse=True
-        )
+        volatile_pairs.sort(key=lambda x: x[0], reverse=True)
         
-        logger.info(f"Found {len(sorted_pairs)} volatile pairs (min {min_volatility}%)")
+        logger.info(f"Found {len(volatile_pairs)} volatile pairs (min {min_volatility}%)")
         
-        return [p['symbol'] for p in sorted_pairs[:count]]
+        return [symbol for _, symbol in volatile_pairs[:count]]
     
     # =========================================================================
     # Account Endpoints
@@ -308,6 +389,45 @@ class BinanceClient:
         }
         return self._request('POST', '/fapi/v1/order', params, signed=True)
     
+    def place_batch_orders(self, orders: List[Dict]) -> List[Dict]:
+        """
+        Place up to 5 orders in a single request
+        
+        Args:
+            orders: Order param dicts (same keys as the single-order endpoint)
+        
+        Returns:
+            Per-order responses in submission order; failed orders come back
+            as {'code': ..., 'msg': ...}
+        """
+        batch = [{k: str(v) for k, v in order.items()} for order in orders]
+        params = {'batchOrders': json.dumps(batch, separators=(',', ':'))}
+        return self._request('POST', '/fapi/v1/batchOrders', params, signed=True)
+    
+    def cancel_order(self, symbol: str, order_id: int) -> Dict:
+        """Cancel a single open order by id"""
+        params = {
+            'symbol': symbol,
+            'orderId': order_id
+        }
+        return self._request('DELETE', '/fapi/v1/order', params, signed=True)
+    
+    def cancel_batch_orders(self, symbol: str, order_ids: List[int]) -> List[Dict]:
+        """
+        Cancel several orders of one symbol (10 per request)
+        
+        Returns:
+            Per-order responses; failed cancels come back as {'code': ..., 'msg': ...}
+        """
+        results = []
+        for i in range(0, len(order_ids), 10):
+            params = {
+                'symbol': symbol,
+                'orderIdList': json.dumps([int(o) for o in order_ids[i:i + 10]], separators=(',', ':'))
+            }
+            results.extend(self._request('DELETE', '/fapi/v1/batchOrders', params, signed=True))
+        return results
+    
     def cancel_all_orders(self, symbol: str) -> Dict:
         """Cancel all open orders for a symbol"""
         params = {'symbol': symbol}
@@ -325,12 +445,18 @@ class BinanceClient:
     # =========================================================================
     
     def get_symbol_info(self, symbol: str) -> Optional[Dict]:
-        """Get symbol trading rules"""
-        exchange_info = self.get_exchange_info()
-        for s in exchange_info['symbols']:
-            if s['symbol'] == symbol:
-                return s
-        return None
+        """Get symbol trading rules (cached; reloaded for unknown symbols)"""
+        info = self._symbol_info.get(symbol)
+        if info is not None:
+            return info
+        
+        # New listing or first call - reload, but not on every miss
+        if time.time() - self._symbol_info_loaded_at >= self.symbol_info_reload_interval:
+            exchange_info = self.get_exchange_info()
+            self._symbol_info = {s['symbol']: s for s in exchange_info['symbols']}
+            self._symbol_info_loaded_at = time.time()
+        
+        return self._symbol_info.get(symbol)
     
     def get_price_precision(self, symbol: str) -> int:
         """Get price precision for a symbol"""
@@ -22,9 +22,16 @@ USE_TESTNET = True
 TESTNET_BASE_URL = "https://testnet.binancefuture.com"
 PRODUCTION_BASE_URL = "https://fapi.binance.com"
 
+# WebSocket stream URLs
+TESTNET_WS_URL = "wss://stream.binancefuture.com/ws"
+PRODUCTION_WS_URL = "wss://fstream.binance.com/ws"
+
 def get_base_url():
     return TESTNET_BASE_URL if USE_TESTNET else PRODUCTION_BASE_URL
 
+def get_ws_url():
+    return TESTNET_WS_URL if USE_TESTNET else PRODUCTION_WS_URL
+
 # =============================================================================
 # GROK AI CONFIGURATION
 # =============================================================================
@@ -47,6 +54,8 @@ VISION_MIN_CONFIDENCE = 0.6           # Minimum confidence to use vision SL/TP
 # =============================================================================
 SCAN_INTERVAL_SECONDS = 10      # Scan every 10 seconds
 TOP_PAIRS_COUNT = 30            # Number of top pairs to scan
+SCAN_WORKERS = 10               # Concurrent symbol scans
+SCAN_TIMEOUT_SECONDS = 10       # Whole-scan budget; unfinished symbols are skipped
 QUOTE_ASSET = "USDT"            # Only USDT pairs
 
 # Volatility-Based Pair Selection
@@ -73,6 +82,8 @@ TREND_TIMEFRAME = "15m"         # Medium-term trend
 MACRO_TIMEFRAME = "30m"         # Main trend
 MAJOR_TIMEFRAME = "1h"          # Major trend direction
 KLINES_LIMIT = 100              # Number of candles to fetch
+KLINE_STREAM_ENABLED = True     # Keep scanner klines live over WebSocket (needs websocket-client)
+KLINE_CACHE_FILE = "kline_cache.db"  # Closed candles on disk, only the tail is refetched (None = off)
 
 # =============================================================================
 # INDICATOR SETTINGS
@@ -101,6 +112,9 @@ ADX_PERIOD = 14
 ADX_FILTER_ENABLED = True         # Only trade when trend is strong
 ADX_MIN_THRESHOLD = 25            # Minimum ADX for strong trend
 
+# Compiled scanner indicator pass (only takes effect when numba is installed)
+USE_NUMBA_INDICATORS = True
+
 # =============================================================================
 # DAILY LOSS LIMIT
 # =============================================================================
@@ -140,6 +154,8 @@ MAX_LOSS_PERCENT = 0.5
 TRAILING_STOP_ENABLED = True          # Enable trailing stop loss
 TRAILING_STOP_ACTIVATION = 1.0        # Activate after 1% profit
 TRAILING_STOP_CALLBACK = 0.5          # Trail 0.5% behind price
+MARK_PRICE_STREAM_ENABLED = True      # Evaluate stops on mark price WebSocket ticks (needs websocket-client)
+TRAILING_STOP_UPDATE_INTERVAL = 5     # Stream mode: move a trailing stop at most once per N seconds per symbol
 
 # Break-even Stop (move SL to entry after profit)
 BREAKEVEN_ENABLED = True              # Enable break-even stop
@@ -184,9 +200,12 @@ VISION_MIN_CONFIDENCE = 65      # Minimum Vision confidence % (0-100)
 # =============================================================================
 MARTINGALE_ENABLED = True       # Enable Martingale mode
 MARTINGALE_MIN_PUMP = 20        # Minimum pump % to consider coin (20%+)
+PUMP_CACHE_TTL = 30             # Reuse pumped coin scan results for 30 seconds
 MARTINGALE_MAX_POSITIONS = 5    # Max concurrent Martingale positions
 MARTINGALE_EMERGENCY_STOP = 20  # Emergency close at -20% drawdown (percentage based)
 MARTINGALE_HARD_STOP_USD = 55   # Emergency close at -$55 loss (dollar based)
+MARTINGALE_LOOKBACK_DRAWDOWN = 0  # Emergency close at X% equity drop from recent peak (0 = off)
+MARTINGALE_DRAWDOWN_LOOKBACK_SECONDS = 3600  # Window for the recent peak (seconds)
 MARTINGALE_HALF_CLOSE_PERCENT = 2  # Close half when within 2% of average
 MARTINGALE_TP_PERCENT = 1.5     # Take profit at 1.5% profit
 
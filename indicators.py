@@ -5,7 +5,7 @@ Calculates EMA, RSI, MACD, ATR for trading signals
 
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import NamedTuple, Tuple, TypedDict
 
 import config
 
@@ -29,12 +29,15 @@ def calculate_rsi(series: pd.Series, period: int = 14) -> pd.Series:
     Calculate Relative Strength Index
     
     Args:
-        series: Price series
+        series: Price series (Series or 1-D array)
         period: RSI period (default 14, use 7 for scalping)
     
     Returns:
         RSI series (0-100)
     """
+    if not isinstance(series, pd.Series):
+        series = pd.Series(series)
+    
     delta = series.diff()
     
     gain = delta.where(delta > 0, 0)
@@ -163,8 +166,34 @@ def calculate_bollinger_bands(series: pd.Series, period: int = 20,
     return upper, middle, lower
 
 
+class SRLevels(NamedTuple):
+    """Support/Resistance around the current price (NaN = no level on that side)"""
+    support: float  # Nearest support below price
+    resistance: float  # Nearest resistance above price
+    supports: Tuple[float, ...] = ()  # Up to 3 nearest, nearest first
+    resistances: Tuple[float, ...] = ()
+
+
+class IndicatorDict(TypedDict):
+    """Latest values for one timeframe (get_latest_indicators / calculate_latest_indicators)"""
+    close: float
+    ema_fast: float
+    ema_slow: float
+    rsi: float
+    macd: float
+    macd_signal: float
+    macd_hist: float
+    atr: float
+    adx: float
+    trend: int  # 1 = EMA fast above slow, -1 otherwise
+    ema_cross: int  # 1 bullish / -1 bearish cross on the last candle, else 0
+    macd_cross: int
+    volume: float
+    volume_ratio: float  # Last volume / VOLUME_LOOKBACK average
+
+
 def find_support_resistance(high: pd.Series, low: pd.Series, close: pd.Series,
-                            lookback: int = 50, sensitivity: float = 0.02) -> dict:
+                            lookback: int = 50, sensitivity: float = 0.02) -> SRLevels:
     """
     Find Support and Resistance levels using pivot points and price clustering
     
@@ -176,10 +205,10 @@ def find_support_resistance(high: pd.Series, low: pd.Series, close: pd.Series,
         sensitivity: Price clustering sensitivity (2% default)
     
     Returns:
-        Dict with support and resistance levels
+        SRLevels with the nearest and top 3 support/resistance levels
     """
     if len(close) < lookback:
-        return {'supports': [], 'resistances': [], 'nearest_support': None, 'nearest_resistance': None}
+        return SRLevels(np.nan, np.nan)
     
     # Get recent data
     recent_high = high.tail(lookback)
@@ -230,17 +259,16 @@ def find_support_resistance(high: pd.Series, low: pd.Series, close: pd.Series,
     supports = [s for s in supports if s < current_price]
     resistances = [r for r in resistances if r > current_price]
     
-    # Find nearest levels
-    nearest_support = max(supports) if supports else None
-    nearest_resistance = min(resistances) if resistances else None
+    # Top 3 nearest, nearest first
+    supports = tuple(float(s) for s in sorted(supports, reverse=True)[:3])
+    resistances = tuple(float(r) for r in sorted(resistances)[:3])
     
-    return {
-        'supports': sorted(supports, reverse=True)[:3],  # Top 3 nearest
-        'resistances': sorted(resistances)[:3],  # Top 3 nearest
-        'nearest_support': nearest_support,
-        'nearest_resistance': nearest_resistance,
-        'current_price': current_price
-    }
+    return SRLevels(
+        support=supports[0] if supports else np.nan,
+        resistance=resistances[0] if resistances else np.nan,
+        supports=supports,
+        resistances=resistances
+    )
 
 
 def calculate_stochastic(high: pd.Series, low: pd.Series, close: pd.Series,
@@ -267,6 +295,160 @@ def calculate_stochastic(high: pd.Series, low: pd.Series, close: pd.Series,
     return k, d
 
 
+# Column indices of klines_to_ohlcv arrays
+OPEN, HIGH, LOW, CLOSE, VOLUME, OPEN_TIME = range(6)
+
+
+def klines_to_ohlcv(klines: list, out: np.ndarray = None) -> np.ndarray:
+    """
+    Convert Binance klines to a float64 OHLCV array (no DataFrame overhead)
+    
+    Args:
+        klines: Raw kline data from Binance API
+        out: Optional preallocated (M, 6) float64 buffer with M >= len(klines);
+            filled in place and a view of its first N rows is returned
+    
+    Returns:
+        Array of shape (N, 6): open, high, low, close, volume, open_time (ms)
+    """
+    rows = [(*k[1:6], k[0]) for k in klines]
+    if out is None or len(rows) > len(out):
+        return np.array(rows, dtype=np.float64)
+    
+    view = out[:len(rows)]
+    view[:] = rows
+    return view
+
+
+def volume_window_means(ohlcv: np.ndarray) -> Tuple[float, float]:
+    """
+    Mean volume of the last 3 candles and of the 7 candles before them
+    
+    Both means are views on one slice of the volume column (no copies).
+    
+    Returns:
+        Tuple of (recent_mean, previous_mean)
+    """
+    window = ohlcv[-10:, VOLUME]
+    return window[-3:].mean(), window[:7].mean()
+
+
+def _ewm_mean(values: np.ndarray, span: int) -> np.ndarray:
+    """
+    Same as Series.ewm(span=span, adjust=False).mean(), NaN handling included
+    """
+    alpha = 2.0 / (span + 1.0)
+    beta = 1.0 - alpha
+    out = values.tolist()
+    if not out:
+        return values.copy()
+    
+    weighted = out[0]
+    old_wt = 1.0
+    for i in range(1, len(out)):
+        cur = out[i]
+        if weighted == weighted:
+            old_wt *= beta
+            if cur == cur:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                old_wt = 1.0
+        else:
+            weighted = cur
+        out[i] = weighted
+    return np.array(out, dtype=np.float64)
+
+
+def _cross(fast: np.ndarray, slow: np.ndarray) -> int:
+    """1 if fast crossed above slow on the last candle, -1 if below, else 0"""
+    if len(fast) < 2:
+        return 0
+    if fast[-1] > slow[-1] and fast[-2] <= slow[-2]:
+        return 1
+    if fast[-1] < slow[-1] and fast[-2] >= slow[-2]:
+        return -1
+    return 0
+
+
+def calculate_latest_indicators(ohlcv: np.ndarray) -> dict:
+    """
+    get_latest_indicators(calculate_all_indicators(df)) on a klines_to_ohlcv
+    array, without building a DataFrame
+    
+    Args:
+        ohlcv: Array from klines_to_ohlcv
+    
+    Returns:
+        Dictionary with latest values
+    """
+    if len(ohlcv) == 0:
+        return {}
+    
+    high = ohlcv[:, HIGH]
+    low = ohlcv[:, LOW]
+    close = ohlcv[:, CLOSE]
+    volume = ohlcv[:, VOLUME]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # EMAs
+        ema_fast = _ewm_mean(close, config.EMA_FAST_PERIOD)
+        ema_slow = _ewm_mean(close, config.EMA_SLOW_PERIOD)
+        
+        # RSI
+        delta = np.diff(close, prepend=np.nan)
+        avg_gain = _ewm_mean(np.where(delta > 0, delta, 0.0), config.RSI_PERIOD)
+        avg_loss = _ewm_mean(-np.where(delta < 0, delta, 0.0), config.RSI_PERIOD)
+        rsi = 100 - (100 / (1 + avg_gain[-1] / avg_loss[-1]))
+        
+        # MACD
+        macd = (_ewm_mean(close, config.MACD_FAST_PERIOD)
+                - _ewm_mean(close, config.MACD_SLOW_PERIOD))
+        macd_signal = _ewm_mean(macd, config.MACD_SIGNAL_PERIOD)
+        
+        # True range (NaN previous close on the first candle is skipped)
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)),
+                             np.abs(low - prev_close))
+        atr = _ewm_mean(true_range, config.ATR_PERIOD)
+        
+        # ADX (Trend Strength)
+        adx_period = getattr(config, 'ADX_PERIOD', 14)
+        high_diff = np.diff(high, prepend=np.nan)
+        low_diff = np.abs(np.diff(low, prepend=np.nan)) * -1
+        plus_dm = np.where((high_diff > np.abs(low_diff)) & (high_diff > 0), high_diff, 0.0)
+        minus_dm = np.where((np.abs(low_diff) > high_diff) & (low_diff < 0), np.abs(low_diff), 0.0)
+        adx_atr = atr if adx_period == config.ATR_PERIOD else _ewm_mean(true_range, adx_period)
+        plus_di = 100 * (_ewm_mean(plus_dm, adx_period) / adx_atr)
+        minus_di = 100 * (_ewm_mean(minus_dm, adx_period) / adx_atr)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di + 0.0001)
+        adx = _ewm_mean(dx, adx_period)
+    
+    # Volume ratio (current vs average)
+    volume_lookback = getattr(config, 'VOLUME_LOOKBACK', 20)
+    if len(ohlcv) >= volume_lookback:
+        avg_volume = volume[-volume_lookback:].mean()
+        volume_ratio = volume[-1] / avg_volume if avg_volume > 0 else 1.0
+    else:
+        volume_ratio = 1.0
+    
+    return {
+        'close': close[-1],
+        'ema_fast': ema_fast[-1],
+        'ema_slow': ema_slow[-1],
+        'rsi': rsi,
+        'macd': macd[-1],
+        'macd_signal': macd_signal[-1],
+        'macd_hist': macd[-1] - macd_signal[-1],
+        'atr': atr[-1],
+        'adx': adx[-1],
+        'trend': 1 if ema_fast[-1] > ema_slow[-1] else -1,
+        'ema_cross': _cross(ema_fast, ema_slow),
+        'macd_cross': _cross(macd, macd_signal),
+        'volume': volume[-1],
+        'volume_ratio': volume_ratio
+    }
+
+
 def klines_to_dataframe(klines: list) -> pd.DataFrame:
     """
     Convert Binance klines to pandas DataFrame
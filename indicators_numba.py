@@ -0,0 +1,177 @@
+"""
+Numba Indicators Module
+calculate_latest_indicators as one compiled pass over the candles
+"""
+
+import numpy as np
+
+import config
+from indicators import HIGH, LOW, CLOSE, VOLUME
+# numba is optional - without it use indicators.calculate_latest_indicators
+from numba_compat import njit, NUMBA_AVAILABLE
+
+
+@njit(cache=True)
+def _ewm_step(weighted, old_wt, cur, alpha):
+    """One Series.ewm(adjust=False) update, NaN handling included -> (weighted, old_wt)"""
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if cur == cur:
+            if weighted != cur:
+                weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            old_wt = 1.0
+        return weighted, old_wt
+    return cur, old_wt
+
+
+@njit(cache=True)
+def _fmax(a, b):
+    """np.fmax for scalars (a NaN side is ignored)"""
+    if a != a:
+        return b
+    if b != b or a >= b:
+        return a
+    return b
+
+
+# nogil: scan threads run the kernel concurrently (no process pool / pickling needed)
+@njit(cache=True, nogil=True, error_model='numpy')
+def _latest_kernel(high, low, close, ema_fast_span, ema_slow_span, rsi_span,
+                   macd_fast_span, macd_slow_span, macd_signal_span, atr_span, adx_span):
+    """
+    Latest EMA/RSI/MACD/ATR/ADX values (and previous EMA/MACD for crosses)
+    
+    Returns:
+        (ema_fast, ema_fast_prev, ema_slow, ema_slow_prev, rsi,
+         macd, macd_prev, macd_signal, macd_signal_prev, atr, adx)
+    """
+    nan = np.nan
+    a_ema_fast = 2.0 / (ema_fast_span + 1.0)
+    a_ema_slow = 2.0 / (ema_slow_span + 1.0)
+    a_rsi = 2.0 / (rsi_span + 1.0)
+    a_macd_fast = 2.0 / (macd_fast_span + 1.0)
+    a_macd_slow = 2.0 / (macd_slow_span + 1.0)
+    a_macd_signal = 2.0 / (macd_signal_span + 1.0)
+    a_atr = 2.0 / (atr_span + 1.0)
+    a_adx = 2.0 / (adx_span + 1.0)
+    
+    # (value, old weight) per EWM; NaN value = no observation yet
+    ema_fast = ema_slow = avg_gain = avg_loss = nan
+    macd_fast = macd_slow = macd_signal = atr = adx_atr = plus_dm_avg = minus_dm_avg = adx = nan
+    w_ema_fast = w_ema_slow = w_gain = w_loss = 1.0
+    w_macd_fast = w_macd_slow = w_signal = w_atr = w_adx_atr = w_plus = w_minus = w_adx = 1.0
+    
+    ema_fast_prev = ema_slow_prev = macd = macd_prev = macd_signal_prev = nan
+    
+    for i in range(len(close)):
+        c = close[i]
+        h = high[i]
+        lo = low[i]
+        
+        ema_fast_prev = ema_fast
+        ema_slow_prev = ema_slow
+        macd_prev = macd
+        macd_signal_prev = macd_signal
+        
+        ema_fast, w_ema_fast = _ewm_step(ema_fast, w_ema_fast, c, a_ema_fast)
+        ema_slow, w_ema_slow = _ewm_step(ema_slow, w_ema_slow, c, a_ema_slow)
+        
+        if i > 0:
+            prev_close = close[i - 1]
+            delta = c - prev_close
+            high_diff = h - high[i - 1]
+            low_diff = -abs(lo - low[i - 1])
+        else:
+            prev_close = delta = high_diff = low_diff = nan
+        
+        # RSI
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain, w_gain = _ewm_step(avg_gain, w_gain, gain, a_rsi)
+        avg_loss, w_loss = _ewm_step(avg_loss, w_loss, loss, a_rsi)
+        
+        # MACD
+        macd_fast, w_macd_fast = _ewm_step(macd_fast, w_macd_fast, c, a_macd_fast)
+        macd_slow, w_macd_slow = _ewm_step(macd_slow, w_macd_slow, c, a_macd_slow)
+        macd = macd_fast - macd_slow
+        macd_signal, w_signal = _ewm_step(macd_signal, w_signal, macd, a_macd_signal)
+        
+        # ATR
+        true_range = _fmax(_fmax(h - lo, abs(h - prev_close)), abs(lo - prev_close))
+        atr, w_atr = _ewm_step(atr, w_atr, true_range, a_atr)
+        
+        # ADX
+        plus_dm = high_diff if (high_diff > abs(low_diff) and high_diff > 0) else 0.0
+        minus_dm = abs(low_diff) if (abs(low_diff) > high_diff and low_diff < 0) else 0.0
+        adx_atr, w_adx_atr = _ewm_step(adx_atr, w_adx_atr, true_range, a_adx)
+        plus_dm_avg, w_plus = _ewm_step(plus_dm_avg, w_plus, plus_dm, a_adx)
+        minus_dm_avg, w_minus = _ewm_step(minus_dm_avg, w_minus, minus_dm, a_adx)
+        plus_di = 100 * (plus_dm_avg / adx_atr)
+        minus_di = 100 * (minus_dm_avg / adx_atr)
+        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di + 0.0001)
+        adx, w_adx = _ewm_step(adx, w_adx, dx, a_adx)
+    
+    rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return (ema_fast, ema_fast_prev, ema_slow, ema_slow_prev, rsi,
+            macd, macd_prev, macd_signal, macd_signal_prev, atr, adx)
+
+
+def _cross(fast: float, fast_prev: float, slow: float, slow_prev: float) -> int:
+    """1 if fast crossed above slow on the last candle, -1 if below, else 0"""
+    if fast > slow and fast_prev <= slow_prev:
+        return 1
+    if fast < slow and fast_prev >= slow_prev:
+        return -1
+    return 0
+
+
+def calculate_latest_indicators_numba(ohlcv: np.ndarray) -> dict:
+    """
+    indicators.calculate_latest_indicators via the compiled kernel
+    
+    Args:
+        ohlcv: Array from klines_to_ohlcv
+    
+    Returns:
+        Dictionary with latest values
+    """
+    if len(ohlcv) == 0:
+        return {}
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        (ema_fast, ema_fast_prev, ema_slow, ema_slow_prev, rsi,
+         macd, macd_prev, macd_signal, macd_signal_prev, atr, adx) = _latest_kernel(
+            np.ascontiguousarray(ohlcv[:, HIGH]),
+            np.ascontiguousarray(ohlcv[:, LOW]),
+            np.ascontiguousarray(ohlcv[:, CLOSE]),
+            float(config.EMA_FAST_PERIOD), float(config.EMA_SLOW_PERIOD), float(config.RSI_PERIOD),
+            float(config.MACD_FAST_PERIOD), float(config.MACD_SLOW_PERIOD),
+            float(config.MACD_SIGNAL_PERIOD), float(config.ATR_PERIOD),
+            float(getattr(config, 'ADX_PERIOD', 14))
+        )
+    
+    # Volume ratio (current vs average)
+    volume = ohlcv[:, VOLUME]
+    volume_lookback = getattr(config, 'VOLUME_LOOKBACK', 20)
+    if len(ohlcv) >= volume_lookback:
+        avg_volume = volume[-volume_lookback:].mean()
+        volume_ratio = volume[-1] / avg_volume if avg_volume > 0 else 1.0
+    else:
+        volume_ratio = 1.0
+    
+    return {
+        'close': ohlcv[-1, CLOSE],
+        'ema_fast': ema_fast,
+        'ema_slow': ema_slow,
+        'rsi': rsi,
+        'macd': macd,
+        'macd_signal': macd_signal,
+        'macd_hist': macd - macd_signal,
+        'atr': atr,
+        'adx': adx,
+        'trend': 1 if ema_fast > ema_slow else -1,
+        'ema_cross': _cross(ema_fast, ema_fast_prev, ema_slow, ema_slow_prev),
+        'macd_cross': _cross(macd, macd_prev, macd_signal, macd_signal_prev),
+        'volume': volume[-1],
+        'volume_ratio': volume_ratio
+    }
@@ -0,0 +1,112 @@
+"""
+Kline Cache Module
+Closed candles on disk (SQLite) so restarts and reseeds only fetch the tail
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from kline_stream import interval_ms
+from logger import logger
+
+
+class KlineCache:
+    """
+    Closed klines per (symbol, interval), keyed by open time
+    
+    A closed candle never changes, so it stays valid forever; only the
+    forming candle and anything after the newest stored one is refetched.
+    """
+    
+    def __init__(self, path: str, limit: int):
+        """
+        Args:
+            path: SQLite file
+            limit: Candles kept per (symbol, interval) (same as the REST limit)
+        """
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS klines ("
+            "symbol TEXT, interval TEXT, open_time INTEGER, row TEXT, "
+            "PRIMARY KEY (symbol, interval, open_time))"
+        )
+        self._db.commit()
+    
+    def plan(self, symbol: str, interval: str) -> Tuple[List[list], int]:
+        """
+        Cached closed klines and how many to fetch to bring them current
+        
+        Returns:
+            (cached klines oldest first, REST limit) - ([], limit) on a miss
+        """
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT row FROM klines WHERE symbol = ? AND interval = ? "
+                    "ORDER BY open_time DESC LIMIT ?",
+                    (symbol, interval, self.limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"Kline cache read failed for {symbol} {interval}: {e}")
+            return [], self.limit
+        
+        if not rows:
+            return [], self.limit
+        
+        cached = [json.loads(r[0]) for r in reversed(rows)]
+        # Candles opened since the newest cached one, plus it (overlap) and the forming one
+        missing = (int(time.time() * 1000) - cached[-1][0]) // interval_ms(interval) + 1
+        if missing >= self.limit or len(cached) + missing < self.limit:
+            return [], self.limit  # Cheaper (or only possible) to fetch in full
+        return cached, missing + 1
+    
+    def merge(self, symbol: str, interval: str, cached: List[list],
+              klines: List[list]) -> Optional[List[list]]:
+        """
+        Join cached and freshly fetched klines and store the new closed ones
+        
+        Returns:
+            The last `limit` klines, or None if they don't line up (refetch in full)
+        """
+        if not klines:
+            return None
+        
+        if cached:
+            if klines[0][0] > cached[-1][0] + interval_ms(interval):
+                return None  # Gap between cache and fetch
+            klines = [k for k in cached if k[0] < klines[0][0]] + klines
+            klines = klines[-self.limit:]
+            if len(klines) < self.limit:
+                return None
+        
+        self._store(symbol, interval, klines)
+        return klines
+    
+    def _store(self, symbol: str, interval: str, klines: List[list]):
+        """Insert the closed candles and drop ones older than the window"""
+        now_ms = int(time.time() * 1000)
+        closed = [(symbol, interval, k[0], json.dumps(k)) for k in klines if k[6] < now_ms]
+        if not closed:
+            return
+        
+        oldest = klines[-1][0] - (self.limit - 1) * interval_ms(interval)
+        try:
+            with self._lock:
+                self._db.executemany("INSERT OR IGNORE INTO klines VALUES (?, ?, ?, ?)", closed)
+                self._db.execute(
+                    "DELETE FROM klines WHERE symbol = ? AND interval = ? AND open_time < ?",
+                    (symbol, interval, oldest)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"Kline cache write failed for {symbol} {interval}: {e}")
+    
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._db.close()
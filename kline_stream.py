@@ -0,0 +1,138 @@
+"""
+Kline Stream Module
+Keeps rolling candle buffers per (symbol, interval) from <symbol>@kline_<interval>
+"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from mark_price_stream import BinanceStream
+
+# Interval unit -> milliseconds (1m, 5m, 1h, 1d, ...)
+_UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+# Slack for clock skew and the first push of a new candle
+_STALE_GRACE_MS = 5_000
+
+
+def interval_ms(interval: str) -> int:
+    """Length of a kline interval in milliseconds"""
+    return int(interval[:-1]) * _UNIT_MS[interval[-1]]
+
+
+class KlineStream(BinanceStream):
+    """
+    Live klines for many (symbol, interval) pairs on one connection
+    
+    Buffers are seeded from a REST fetch (seed) and then kept current by the
+    stream. A buffer is dropped when the stream skips a candle, the
+    connection closes, or it goes stale (its last candle has ended, or no
+    event arrived for about one interval - a lost subscription or a silently
+    stalled socket), so the next read falls back to REST and reseeds.
+    """
+    
+    NAME = "kline stream"
+    
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit: Candles kept per buffer (same as the REST limit)
+        """
+        super().__init__()
+        self.limit = limit
+        self._bars: Dict[Tuple[str, str], Deque[list]] = {}
+        self._last_event: Dict[Tuple[str, str], float] = {}  # key -> local time (ms) of the last update
+    
+    def set_pairs(self, symbols: Iterable[str], intervals: Iterable[str]):
+        """Subscribe to every symbol x interval (buffers of dropped pairs are freed)"""
+        keys = {(s, i) for s in symbols for i in intervals}
+        with self._lock:
+            for key in list(self._bars):
+                if key not in keys:
+                    self._drop(key)
+        self.set_streams(f"{s.lower()}@kline_{i}" for s, i in keys)
+    
+    def seed(self, symbol: str, interval: str, klines: List[list]):
+        """Start a buffer from REST klines (only while connected and subscribed)"""
+        if not self.connected:
+            return
+        
+        key = (symbol, interval)
+        with self._lock:
+            if f"{symbol.lower()}@kline_{interval}" in self.streams:
+                self._bars[key] = deque((list(k) for k in klines), maxlen=self.limit)
+                self._last_event[key] = time.time() * 1000
+    
+    def get_klines(self, symbol: str, interval: str) -> Optional[List[list]]:
+        """
+        Buffered klines in REST format, or None if not seeded yet or stale
+        """
+        key = (symbol, interval)
+        with self._lock:
+            bars = self._bars.get(key)
+            if bars is None or len(bars) < self.limit:
+                return None
+            
+            # Frozen buffer: the last candle has closed with no successor, or
+            # the stream has gone quiet for this pair - drop it and reseed
+            deadline = time.time() * 1000 - interval_ms(interval) - _STALE_GRACE_MS
+            if bars[-1][0] < deadline or self._last_event.get(key, 0) < deadline:
+                self._drop(key)
+                return None
+            return list(bars)
+    
+    def _drop(self, key: Tuple[str, str]):
+        """Forget one buffer (caller holds the lock)"""
+        self._bars.pop(key, None)
+        self._last_event.pop(key, None)
+    
+    def _handle_event(self, data: Dict):
+        if data['e'] != 'kline':
+            return
+        
+        k = data['k']
+        key = (data['s'], k['i'])
+        # Same column order as GET /fapi/v1/klines
+        row = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'],
+               k['q'], k['n'], k['V'], k['Q'], '0']
+        
+        with self._lock:
+            bars = self._bars.get(key)
+            if bars is None:
+                return
+            
+            self._last_event[key] = time.time() * 1000
+            last_open = bars[-1][0]
+            if row[0] == last_open:
+                bars[-1] = row  # Forming candle update
+            elif row[0] == last_open + interval_ms(k['i']):
+                bars.append(row)  # Next candle opened
+            elif row[0] > last_open:
+                self._drop(key)  # Missed a candle - reseed from REST
+    
+    def _on_close(self, ws, status_code, msg):
+        super()._on_close(ws, status_code, msg)
+        # Updates are lost while disconnected
+        with self._lock:
+            self._bars.clear()
+            self._last_event.clear()
+
+
+# Test when run directly
+if __name__ == "__main__":
+    from binance_client import BinanceClient
+    
+    print("Testing Kline Stream...")
+    
+    client = BinanceClient()
+    stream = KlineStream(limit=50)
+    stream.set_pairs(["BTCUSDT"], ["1m"])
+    
+    if stream.start():
+        time.sleep(3)
+        stream.seed("BTCUSDT", "1m", client.get_klines("BTCUSDT", "1m", 50))
+        time.sleep(5)
+        klines = stream.get_klines("BTCUSDT", "1m")
+        print(f"✅ Buffered {len(klines) if klines else 0} candles, last close {klines[-1][4] if klines else '-'}")
+        stream.stop()
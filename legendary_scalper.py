@@ -112,6 +112,9 @@ class LegendaryScalper:
         self.scan_count += 1
         current_time = time.time()
         
+        # Expire dynamic blacklist entries once per cycle
+        self.martingale.dynamic_blacklist.sweep_blacklist(current_time)
+        
         # 1. Check existing positions (always)
         logger.info(f"📊 Cycle #{self.scan_count} | Checking positions...")
         actions = self.watcher.check_positions()
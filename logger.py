@@ -3,8 +3,11 @@ Logger Module for Binance Scalping Bot
 Provides colored console output and file logging
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 from colorama import init, Fore, Style, Back
 
@@ -50,7 +53,7 @@ def setup_logger(name: str = "ScalpingBot") -> logging.Logger:
         datefmt='%H:%M:%S'
     )
     console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # File handler (if enabled)
     if config.LOG_TO_FILE:
@@ -61,7 +64,14 @@ def setup_logger(name: str = "ScalpingBot") -> logging.Logger:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_format)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Console/file writes happen on a listener thread - callers only enqueue
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # Drain the queue on exit
     
     return logger
 
@@ -42,7 +42,7 @@ class ScalpingBot:
         self.scanner = Scanner(self.client)
         self.risk_manager = RiskManager(self.client)
         self.executor = OrderExecutor(self.client)
-        self.position_monitor = PositionMonitor(self.client)
+        self.position_monitor = PositionMonitor(self.client, self.executor.batcher)
         
         # Initialize Grok AI if enabled
         self.grok = None
@@ -144,7 +144,9 @@ class ScalpingBot:
             return False
         
         # Check if already in this symbol
-        if self.risk_manager.is_symbol_in_position(signal.symbol, positions):
+        if self.risk_manager.is_symbol_in_position(
+            signal.symbol, self.risk_manager.open_symbols(positions)
+        ):
             logger.debug(f"Already in position for {signal.symbol}")
             return False
         
@@ -162,8 +164,8 @@ class ScalpingBot:
                 import pandas as pd
                 df = pd.DataFrame(klines_15m)
                 sr_levels = find_support_resistance(df['high'], df['low'], df['close'])
-                if sr_levels and sr_levels.get('nearest_support'):
-                    logger.debug(f"📊 S/R: Support={sr_levels['nearest_support']:.4f}, Resistance={sr_levels.get('nearest_resistance', 'N/A')}")
+                if sr_levels.support > 0:
+                    logger.debug(f"📊 S/R: Support={sr_levels.support:.4f}, Resistance={sr_levels.resistance:.4f}")
         except Exception as e:
             logger.debug(f"S/R detection failed: {e}")
         
@@ -201,11 +203,11 @@ class ScalpingBot:
             # Use Vision SL/TP if available
             if vision_data.get('vision_used'):
                 if vision_data.get('stop_loss'):
-                    trade_params['stop_loss'] = self.client.round_price(
+                    trade_params.stop_loss = self.client.round_price(
                         signal.symbol, vision_data['stop_loss']
                     )
                 if vision_data.get('take_profit'):
-                    trade_params['take_profit'] = self.client.round_price(
+                    trade_params.take_profit = self.client.round_price(
                         signal.symbol, vision_data['take_profit']
                     )
                 logger.info(f"✅ Vision Confirm: {signal.type} | Pattern={vision_data.get('pattern', 'N/A')} | Conf={vision_data.get('confidence', 0)}%")
@@ -218,8 +220,8 @@ class ScalpingBot:
         
         # Execute trade
         logger.info(f"🚀 Executing trade: {signal.symbol} {signal.type}")
-        logger.info(f"   Entry: {signal.price:.4f} | SL: {trade_params['stop_loss']:.4f} | TP: {trade_params['take_profit']:.4f}")
-        logger.info(f"   Quantity: {trade_params['quantity']} | Margin: ${trade_params['initial_margin']:.2f} | Risk: ${trade_params['risk_usdt']:.2f}")
+        logger.info(f"   Entry: {signal.price:.4f} | SL: {trade_params.stop_loss:.4f} | TP: {trade_params.take_profit:.4f}")
+        logger.info(f"   Quantity: {trade_params.quantity} | Margin: ${trade_params.initial_margin:.2f} | Risk: ${trade_params.risk_usdt:.2f}")
         
         result = self.executor.execute_entry(trade_params)
         
@@ -392,23 +394,28 @@ class ScalpingBot:
             positions = self.client.get_positions()
             print_position_summary(positions)
             
-            # Check partial take profit and update trailing stops
-            for pos in positions:
-                symbol = pos['symbol']
-                current_price = float(pos.get('markPrice', 0))
-                if current_price > 0:
-                    self.position_monitor.check_partial_take_profit(symbol, current_price)
-            
-            # Update trailing stops
-            updated = self.position_monitor.update_trailing_stops(positions)
-            if updated > 0:
-                logger.info(f"🔄 Updated {updated} trailing stop(s)")
+            if self.position_monitor.stream_active:
+                # Partial TP and trailing stops run on mark price pushes;
+                # just keep the tracked/streamed symbols in sync
+                self.position_monitor.sync_positions(positions)
+            else:
+                # Check partial take profit and update trailing stops
+                for pos in positions:
+                    symbol = pos['symbol']
+                    current_price = float(pos.get('markPrice', 0))
+                    if current_price > 0:
+                        self.position_monitor.check_partial_take_profit(symbol, current_price)
+                
+                # Update trailing stops
+                updated = self.position_monitor.update_trailing_stops(positions)
+                if updated > 0:
+                    logger.info(f"🔄 Updated {updated} trailing stop(s)")
         except Exception as e:
             logger.debug(f"Error getting positions: {e}")
             positions = []
         
-        # Scan for signals
-        signals = self.scanner.scan_all_pairs_threaded()
+        # Scan for signals (symbols already in a position are skipped)
+        signals = self.scanner.scan_all_pairs_threaded(self.risk_manager.open_symbols(positions))
         
         if not signals:
             logger.info("No valid signals found")
@@ -433,6 +440,13 @@ class ScalpingBot:
             logger.error("Startup checks failed. Exiting.")
             return
         
+        # Event-driven trailing stops (falls back to per-scan polling)
+        if self.position_monitor.start_stream():
+            self.position_monitor.sync_positions(self.client.get_positions())
+        
+        # Live klines for the scanner (falls back to REST per scan)
+        self.scanner.start_stream()
+        
         logger.info(f"🚀 Starting main loop (interval: {config.SCAN_INTERVAL_SECONDS}s)")
         logger.info("Press Ctrl+C to stop\n")
         
@@ -460,6 +474,8 @@ class ScalpingBot:
     def stop(self):
         """Stop the bot gracefully"""
         self.running = False
+        self.position_monitor.stop_stream()
+        self.scanner.close()
         
         # Print summary
         logger.info("\n" + "="*50)
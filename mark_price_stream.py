@@ -0,0 +1,171 @@
+"""
+Mark Price Stream Module
+Pushes Binance Futures mark price updates (<symbol>@markPrice@1s) to a callback
+"""
+
+import json
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import config
+from binance_client import json_loads
+from logger import logger
+
+# websocket-client is optional - without it the bot falls back to polling
+try:
+    import websocket
+    WEBSOCKET_AVAILABLE = True
+except ImportError:
+    WEBSOCKET_AVAILABLE = False
+
+
+class BinanceStream:
+    """
+    One market-stream connection with a managed subscription set
+    
+    Subclasses name the streams they want (set_streams) and handle the
+    event payloads in _handle_event.
+    """
+    
+    RECONNECT_DELAY = 5  # seconds between reconnect attempts
+    NAME = "market stream"
+    
+    def __init__(self):
+        self.url = config.get_ws_url()
+        self.streams: Set[str] = set()
+        self.running = False
+        self.connected = False
+        
+        self._ws = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._request_id = 0
+    
+    def start(self) -> bool:
+        """Start the stream in a background thread"""
+        if not WEBSOCKET_AVAILABLE:
+            logger.warning(f"⚠️ websocket-client not installed - {self.NAME} disabled")
+            return False
+        
+        if self.running:
+            return True
+        
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._run, name=self.NAME.replace(' ', '-'), daemon=True
+        )
+        self._thread.start()
+        logger.info(f"📡 {self.NAME.capitalize()} started")
+        return True
+    
+    def stop(self):
+        """Stop the stream and close the connection"""
+        self.running = False
+        if self._ws is not None:
+            self._ws.close()
+    
+    def set_streams(self, streams: Iterable[str]):
+        """Subscribe to exactly these stream names (diffed against the current set)"""
+        streams = set(streams)
+        with self._lock:
+            added = streams - self.streams
+            removed = self.streams - streams
+            self.streams = streams
+        
+        if self.connected:
+            if added:
+                self._send('SUBSCRIBE', added)
+            if removed:
+                self._send('UNSUBSCRIBE', removed)
+    
+    def _run(self):
+        """Connection loop (reconnects until stopped)"""
+        while self.running:
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            self._ws.run_forever(ping_interval=180, ping_timeout=10)
+            
+            if self.running:
+                logger.debug(f"{self.NAME.capitalize()} disconnected, reconnecting in {self.RECONNECT_DELAY}s")
+                time.sleep(self.RECONNECT_DELAY)
+    
+    def _send(self, method: str, streams: Iterable[str]):
+        """Send a SUBSCRIBE/UNSUBSCRIBE request"""
+        params = list(streams)
+        if not params:
+            return
+        
+        with self._lock:
+            self._request_id += 1
+            request_id = self._request_id
+        
+        try:
+            self._ws.send(json.dumps({'method': method, 'params': params, 'id': request_id}))
+        except Exception as e:
+            logger.debug(f"{self.NAME.capitalize()} {method} failed: {e}")
+    
+    def _on_open(self, ws):
+        self.connected = True
+        # Resubscribe everything after a (re)connect
+        with self._lock:
+            streams = list(self.streams)
+        self._send('SUBSCRIBE', streams)
+    
+    def _on_message(self, ws, message):
+        try:
+            data = json_loads(message)
+            if not isinstance(data, dict) or 'e' not in data:
+                return  # Subscription acks etc.
+            
+            self._handle_event(data)
+        except Exception as e:
+            logger.debug(f"Error handling {self.NAME} update: {e}")
+    
+    def _handle_event(self, data: Dict):
+        """Handle one event payload (override)"""
+    
+    def _on_error(self, ws, error):
+        logger.debug(f"{self.NAME.capitalize()} error: {error}")
+    
+    def _on_close(self, ws, status_code, msg):
+        self.connected = False
+
+
+class MarkPriceStream(BinanceStream):
+    """Subscribes to per-symbol mark price streams on one connection"""
+    
+    NAME = "mark price stream"
+    
+    def __init__(self, on_mark_price: Callable[[str, float], None]):
+        """
+        Args:
+            on_mark_price: Called as on_mark_price(symbol, mark_price) per update
+        """
+        super().__init__()
+        self.on_mark_price = on_mark_price
+    
+    def set_symbols(self, symbols: Iterable[str]):
+        """Subscribe to exactly these symbols"""
+        self.set_streams(f"{s.lower()}@markPrice@1s" for s in symbols)
+    
+    def _handle_event(self, data: Dict):
+        if data['e'] == 'markPriceUpdate':
+            self.on_mark_price(data['s'], float(data['p']))
+
+
+# Test when run directly
+if __name__ == "__main__":
+    print("Testing Mark Price Stream...")
+    
+    stream = MarkPriceStream(lambda s, p: print(f"✅ {s}: {p}"))
+    stream.set_symbols(["BTCUSDT", "ETHUSDT"])
+    
+    if stream.start():
+        time.sleep(5)
+        stream.stop()
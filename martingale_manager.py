@@ -2,15 +2,121 @@
 Martingale Manager - Handle step-based counter-trend positions
 """
 
+import heapq
 import time
-from typing import Dict, List, Optional
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
 from logger import logger
 import config
+# numba is optional; without it batch_check_tp uses the NumPy path instead
+from numba_compat import njit, NUMBA_AVAILABLE
 
 
-@dataclass
+# Shared read-only results for the common "nothing to do" branches of should_*
+_NO_ADD = MappingProxyType({'should_add': False})
+_NO_CLOSE = MappingProxyType({'should_close': False})
+_NO_RECYCLE = MappingProxyType({'should_recycle': False})
+
+
+def compute_drawdown_series(equity: np.ndarray) -> np.ndarray:
+    """
+    Drawdown % from the running peak for an equity (or price) series
+    
+    Used for replay/backtest analytics; same units as MARTINGALE_EMERGENCY_STOP.
+    
+    Args:
+        equity: 1-D series of equity values
+    
+    Returns:
+        Drawdown % at each point (0 where the peak is not positive)
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = (peak - equity) / peak * 100
+    return np.where(peak > 0, drawdown, 0.0)
+
+
+# Trailing TP kernel actions (int8)
+_TP_HOLD = 0
+_TP_ACTIVATED = 1
+_TP_NEW_MAX = 2
+_TP_CLOSE = 3
+
+
+@njit(cache=True)
+def _trailing_tp_kernel(pnl: float, tp_target: float, trailing: bool, max_pnl: float,
+                        callback: float):
+    """
+    Trailing TP state machine for one position
+    
+    Returns:
+        (action, trailing, max_pnl) - action is one of the _TP_* codes
+    """
+    if pnl >= tp_target:
+        if not trailing:
+            return _TP_ACTIVATED, True, pnl
+        if pnl > max_pnl:
+            return _TP_NEW_MAX, True, pnl
+        if max_pnl > 0.0 and (max_pnl - pnl) / max_pnl >= callback:
+            return _TP_CLOSE, True, max_pnl
+        return _TP_HOLD, True, max_pnl
+    
+    # Reset trailing if profit dropped below half the target
+    if trailing and pnl < tp_target * 0.5:
+        return _TP_HOLD, False, 0.0
+    return _TP_HOLD, trailing, max_pnl
+
+
+@njit(cache=True)
+def _trailing_tp_pass(pnl, tp_target, valid, trailing, max_pnl, callback, action):
+    """Run _trailing_tp_kernel over the SoA arrays (trailing/max_pnl updated in place)"""
+    for i in range(len(pnl)):
+        if not valid[i]:
+            action[i] = _TP_HOLD
+            continue
+        action[i], trailing[i], max_pnl[i] = _trailing_tp_kernel(
+            pnl[i], tp_target[i], trailing[i], max_pnl[i], callback
+        )
+
+
+class RollingMax:
+    """
+    Max of a value over the last `window` seconds (monotonic deque)
+    
+    Each sample is pushed and popped at most once, so per-tick work is O(1)
+    amortized regardless of the window length.
+    """
+    __slots__ = ('window', 'dq')
+    
+    def __init__(self, window: float):
+        self.window = window
+        self.dq = deque()  # (timestamp, value), values strictly decreasing
+    
+    def push(self, ts: float, value: float):
+        """Add a sample and drop samples that can no longer be the max"""
+        dq = self.dq
+        while dq and dq[-1][1] <= value:
+            dq.pop()
+        dq.append((ts, value))
+        
+        cutoff = ts - self.window
+        while dq[0][0] < cutoff:
+            dq.popleft()
+    
+    def peak(self) -> float:
+        """Max value inside the window (0 if empty)"""
+        return self.dq[0][1] if self.dq else 0.0
+
+
+@dataclass(slots=True)
 class MartingalePosition:
     """Track a Martingale position with multiple entries"""
     symbol: str
@@ -20,6 +126,8 @@ class MartingalePosition:
     total_quantity: float = 0
     total_margin: float = 0
     average_entry: float = 0
+    notional_sum: float = 0  # Sum of price * quantity over entries
+    entry_quantity: float = 0  # Sum of quantity over entries
     created_at: datetime = field(default_factory=datetime.now)
     last_step_time: datetime = field(default_factory=datetime.now)
     half_closed: bool = False
@@ -30,9 +138,17 @@ class MartingalePosition:
     max_profit_usd: float = 0  # Maximum profit reached (for trailing)
 
 
-@dataclass
-class StopLossRecord:
-    """Track a single stop loss event"""
+class PositionArrays(NamedTuple):
+    """Per-field arrays aligned with MartingaleManager.snapshot_positions() (SoA view)"""
+    step: np.ndarray
+    average_entry: np.ndarray
+    total_quantity: np.ndarray
+    trailing_tp_active: np.ndarray
+    max_profit_usd: np.ndarray
+
+
+class StopLossRecord(NamedTuple):
+    """A single stop loss event (materialized view of DynamicBlacklist history)"""
     symbol: str
     timestamp: datetime
     reason: str
@@ -46,8 +162,17 @@ class DynamicBlacklist:
     Rule: If a token has N stop losses within X hours, blacklist it for Y hours.
     """
     def __init__(self):
-        self.stop_loss_history: List[StopLossRecord] = []
+        # Stop loss history as parallel per-field lists (append-only, time ordered)
+        self._sl_ts: List[float] = []
+        self._sl_symbol: List[str] = []
+        self._sl_loss: List[float] = []
+        self._sl_reason: List[int] = []
+        self._reason_table: Dict[str, int] = {}  # reason -> reason_id
+        self._reasons: List[str] = []  # reason_id -> reason
+        
         self.blacklisted: Dict[str, datetime] = {}  # symbol -> blacklist_until
+        self._bl_heap: List[tuple] = []  # (expiry_ts, symbol) min-heap
+        self._live_bl: set = set()  # Symbols currently blacklisted
         
         # Load settings from config
         self.enabled = getattr(config, 'DYNAMIC_BLACKLIST_ENABLED', True)
@@ -55,6 +180,11 @@ class DynamicBlacklist:
         self.window_hours = getattr(config, 'DYNAMIC_BLACKLIST_WINDOW_HOURS', 2)
         self.blacklist_hours = getattr(config, 'DYNAMIC_BLACKLIST_DURATION_HOURS', 6)
         
+        # Window/duration deltas built once and reused on every check
+        self._window_td = timedelta(hours=self.window_hours)
+        self._blacklist_td = timedelta(hours=self.blacklist_hours)
+        self._cleanup_td = timedelta(hours=24)
+        
         logger.info(f"🚫 Dynamic Blacklist: {self.max_stop_losses} SLs in {self.window_hours}h → {self.blacklist_hours}h ban")
     
     def record_stop_loss(self, symbol: str, reason: str, loss_usd: float):
@@ -62,13 +192,16 @@ class DynamicBlacklist:
         if not self.enabled:
             return
         
-        record = StopLossRecord(
-            symbol=symbol,
-            timestamp=datetime.now(),
-            reason=reason,
-            loss_usd=loss_usd
-        )
-        self.stop_loss_history.append(record)
+        reason_id = self._reason_table.get(reason)
+        if reason_id is None:
+            reason_id = len(self._reasons)
+            self._reason_table[reason] = reason_id
+            self._reasons.append(reason)
+        
+        self._sl_ts.append(time.time())
+        self._sl_symbol.append(symbol)
+        self._sl_loss.append(loss_usd)
+        self._sl_reason.append(reason_id)
         
         # Check if we should blacklist this token
         self._check_and_blacklist(symbol)
@@ -78,40 +211,55 @@ class DynamicBlacklist:
     
     def _check_and_blacklist(self, symbol: str):
         """Check if token has too many stop losses in window"""
-        cutoff = datetime.now() - timedelta(hours=self.window_hours)
+        cutoff = time.time() - self._window_td.total_seconds()
         
+        # History is time ordered, so only scan records inside the window
+        start = bisect_left(self._sl_ts, cutoff)
+        sl_symbol = self._sl_symbol
         recent_losses = [
-            r for r in self.stop_loss_history
-            if r.symbol == symbol and r.timestamp >= cutoff
+            i for i in range(start, len(sl_symbol))
+            if sl_symbol[i] == symbol
         ]
         
         if len(recent_losses) >= self.max_stop_losses:
-            blacklist_until = datetime.now() + timedelta(hours=self.blacklist_hours)
+            blacklist_until = datetime.now() + self._blacklist_td
             self.blacklisted[symbol] = blacklist_until
+            heapq.heappush(self._bl_heap, (blacklist_until.timestamp(), symbol))
+            self._live_bl.add(symbol)
             
-            total_loss = sum(r.loss_usd for r in recent_losses)
+            total_loss = sum(self._sl_loss[i] for i in recent_losses)
             logger.warning(f"🚫 BLACKLISTED: {symbol} for {self.blacklist_hours}h")
             logger.warning(f"   Reason: {len(recent_losses)} stop losses in {self.window_hours}h")
             logger.warning(f"   Total loss: ${abs(total_loss):.2f}")
     
+    def sweep_blacklist(self, now: float = None):
+        """Drop expired blacklist entries (O(1) when nothing has expired)"""
+        if now is None:
+            now = time.time()
+        
+        heap = self._bl_heap
+        while heap and heap[0][0] <= now:
+            _, symbol = heapq.heappop(heap)
+            
+            # Skip stale entries left behind by a re-blacklist with a later expiry
+            expires = self.blacklisted.get(symbol)
+            if expires is None or expires.timestamp() > now:
+                continue
+            
+            del self.blacklisted[symbol]
+            self._live_bl.discard(symbol)
+            logger.info(f"✅ {symbol} removed from dynamic blacklist (expired)")
+    
     def is_blacklisted(self, symbol: str) -> bool:
         """Check if a token is currently blacklisted"""
         if not self.enabled:
             return False
-        
-        if symbol not in self.blacklisted:
-            return False
-        
-        # Check if blacklist expired
-        if datetime.now() >= self.blacklisted[symbol]:
-            del self.blacklisted[symbol]
-            logger.info(f"✅ {symbol} removed from dynamic blacklist (expired)")
-            return False
-        
-        return True
+        self.sweep_blacklist()
+        return symbol in self._live_bl
     
     def get_blacklist_status(self, symbol: str) -> Dict:
         """Get blacklist status for a symbol"""
+        self.sweep_blacklist()
         if symbol not in self.blacklisted:
             return {'blacklisted': False}
         
@@ -124,13 +272,23 @@ class DynamicBlacklist:
             'remaining_hours': max(0, remaining)
         }
     
+    @property
+    def stop_loss_history(self) -> List[StopLossRecord]:
+        """Stop loss history as records (built on demand)"""
+        return [
+            StopLossRecord(symbol, datetime.fromtimestamp(ts), self._reasons[reason_id], loss)
+            for ts, symbol, loss, reason_id in zip(self._sl_ts, self._sl_symbol, self._sl_loss, self._sl_reason)
+        ]
+    
     def _cleanup_old_records(self):
         """Remove records older than 24 hours"""
-        cutoff = datetime.now() - timedelta(hours=24)
-        self.stop_loss_history = [
-            r for r in self.stop_loss_history
-            if r.timestamp >= cutoff
-        ]
+        cutoff = time.time() - self._cleanup_td.total_seconds()
+        start = bisect_left(self._sl_ts, cutoff)
+        if start:
+            del self._sl_ts[:start]
+            del self._sl_symbol[:start]
+            del self._sl_loss[:start]
+            del self._sl_reason[:start]
 
 
 class MartingaleManager:
@@ -143,19 +301,19 @@ class MartingaleManager:
     - Dynamic half-close
     """
     
-    # Load from config - extended to 15 steps for recycling strategy
-    # Load from config - extended to 15 steps
-    STEPS = getattr(config, 'MARTINGALE_STEPS', [
+    # Load from config once - extended to 15 steps for recycling strategy
+    # Frozen as tuples so the step tables can't drift at runtime
+    STEPS = tuple(getattr(config, 'MARTINGALE_STEPS', [
         3, 3, 5, 5, 7, 10, 15, 20, 25, 30, 40, 50, 60, 80, 100
-    ])
+    ]))
     
-    STEP_DISTANCES = getattr(config, 'MARTINGALE_STEP_DISTANCES', [
+    STEP_DISTANCES = tuple(getattr(config, 'MARTINGALE_STEP_DISTANCES', [
         0, 3, 5, 8, 12, 16, 20, 25, 30, 35, 40, 45, 50, 60, 70
-    ])
+    ]))
     
-    STEP_WAIT_TIMES = getattr(config, 'MARTINGALE_STEP_WAIT_TIMES', [
+    STEP_WAIT_TIMES = tuple(getattr(config, 'MARTINGALE_STEP_WAIT_TIMES', [
         0, 2, 2, 3, 3, 5, 5, 10, 10, 15, 20, 30, 45, 60, 90
-    ])
+    ]))
     
     # Margin recycling settings
     RECYCLE_AFTER_STEP = 5  # Start recycling after this step
@@ -171,11 +329,38 @@ class MartingaleManager:
         self.executor = executor
         self.positions: Dict[str, MartingalePosition] = {}
         self.dynamic_blacklist = DynamicBlacklist()
+        self._qty_precision_cache: Dict[str, int] = {}  # symbol -> quantityPrecision
         
         # Load settings from config if available
         self.max_positions = getattr(config, 'MARTINGALE_MAX_POSITIONS', 3)
         self.emergency_stop_percent = getattr(config, 'MARTINGALE_EMERGENCY_STOP', 20)
         self.half_close_threshold = getattr(config, 'MARTINGALE_HALF_CLOSE_PERCENT', 2)
+        self.hard_stop_usd = float(getattr(config, 'MARTINGALE_HARD_STOP_USD', 55))
+        self.lookback_drawdown = float(getattr(config, 'MARTINGALE_LOOKBACK_DRAWDOWN', 0))
+        self.drawdown_lookback_sec = float(getattr(config, 'MARTINGALE_DRAWDOWN_LOOKBACK_SECONDS', 3600))
+        self._equity_peaks: Dict[str, RollingMax] = {}  # symbol -> recent equity peak
+        self.leverage = getattr(config, 'LEVERAGE', 5)
+        
+        # Per-step tables as contiguous float arrays, distance/wait padded to the
+        # step count so lookups never branch
+        self._n_steps = len(self.STEPS)
+        self._steps_np = np.asarray(self.STEPS, dtype=np.float64)
+        self._dist_np = np.asarray(
+            list(self.STEP_DISTANCES) + [50] * max(0, self._n_steps - len(self.STEP_DISTANCES)),
+            dtype=np.float64
+        )
+        self._wait_np = np.asarray(
+            list(self.STEP_WAIT_TIMES) + [0] * max(0, self._n_steps - len(self.STEP_WAIT_TIMES)),
+            dtype=np.float64
+        )
+        # Cumulative margin per step with 20% tolerance (for step recovery)
+        self._cum_steps_tol = np.cumsum(self._steps_np) * 1.2
+        
+        # (status, monotonic_ns) - replaced wholesale on every position change
+        self._status_snapshot = None
+        self._positions_snapshot = ()
+        self._arrays: Optional[PositionArrays] = None
+        self._publish_status()
         
         logger.info("🎰 Martingale Manager initialized")
         logger.info(f"   Steps: {self.STEPS}")
@@ -194,25 +379,30 @@ class MartingaleManager:
                 logger.info("📦 No existing positions to recover")
                 return 0
             
+            # Parse the whole position array at once
+            df = pd.DataFrame(positions)
+            if 'symbol' not in df:
+                df['symbol'] = ''
+            for col in ('positionAmt', 'entryPrice', 'unRealizedProfit'):
+                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0).astype(float) if col in df else 0.0
+            
+            # Only recover SHORT positions (negative positionAmt)
+            shorts = df[(df['positionAmt'] < 0) & (df['entryPrice'] > 0)]
+            
+            # Calculate margin and estimate step based on quantity
+            quantities = shorts['positionAmt'].abs().to_numpy()
+            entry_prices = shorts['entryPrice'].to_numpy()
+            margins = quantities * entry_prices / 10  # Assuming 10x leverage
+            steps = np.minimum(
+                np.searchsorted(self._cum_steps_tol, margins, side='left') + 1,
+                self._n_steps
+            )
+            
             recovered = 0
-            for pos in positions:
-                symbol = pos.get('symbol', '')
-                position_amt = float(pos.get('positionAmt', 0))
-                entry_price = float(pos.get('entryPrice', 0))
-                unrealized_pnl = float(pos.get('unRealizedProfit', 0))
-                
-                # Only recover SHORT positions (negative positionAmt)
-                if position_amt >= 0 or entry_price <= 0:
-                    continue
-                
-                # Calculate margin and estimate step based on quantity
-                quantity = abs(position_amt)
-                notional = quantity * entry_price
-                margin = notional / 10  # Assuming 10x leverage
-                
-                # Estimate step based on margin
-                step = self._estimate_step_from_margin(margin)
-                
+            for symbol, quantity, entry_price, margin, step, unrealized_pnl in zip(
+                shorts['symbol'], quantities.tolist(), entry_prices.tolist(),
+                margins.tolist(), steps.tolist(), shorts['unRealizedProfit'].tolist()
+            ):
                 # Create position object
                 martingale_pos = MartingalePosition(
                     symbol=symbol,
@@ -226,7 +416,9 @@ class MartingaleManager:
                     step=step,
                     total_quantity=quantity,
                     total_margin=margin,
-                    average_entry=entry_price
+                    average_entry=entry_price,
+                    notional_sum=entry_price * quantity,
+                    entry_quantity=quantity
                 )
                 
                 self.positions[symbol] = martingale_pos
@@ -240,21 +432,13 @@ class MartingaleManager:
             if recovered > 0:
                 logger.info(f"✅ Recovered {recovered} positions from Binance")
             
+            self._publish_status()
             return recovered
             
         except Exception as e:
             logger.error(f"Failed to recover positions: {e}")
             return 0
     
-    def _estimate_step_from_margin(self, margin: float) -> int:
-        """Estimate which step based on total margin used"""
-        cumulative = 0
-        for i, step_margin in enumerate(self.STEPS):
-            cumulative += step_margin
-            if margin <= cumulative * 1.2:  # 20% tolerance
-                return i + 1
-        return len(self.STEPS)  # Max step
-    
     def get_total_margin(self) -> float:
         """Get total margin used across all positions"""
         return sum(pos.total_margin for pos in self.positions.values())
@@ -268,8 +452,15 @@ class MartingaleManager:
     
     def can_open_new_position(self) -> bool:
         """Check if we can open a new Martingale position"""
-        max_pos = self.get_dynamic_max_positions()
-        return len(self.positions) < max_pos
+        n = len(self.positions)
+        
+        # Outside the band between the two limits the margin total doesn't matter
+        if n >= max(self.MAX_POSITIONS_BELOW_THRESHOLD, self.MAX_POSITIONS_ABOVE_THRESHOLD):
+            return False
+        if n < min(self.MAX_POSITIONS_BELOW_THRESHOLD, self.MAX_POSITIONS_ABOVE_THRESHOLD):
+            return True
+        
+        return n < self.get_dynamic_max_positions()
     
     def has_position(self, symbol: str) -> bool:
         """Check if we have an active Martingale position"""
@@ -297,7 +488,7 @@ class MartingaleManager:
             logger.info(f"⏭️ Skipping {symbol} - Dynamic blacklist ({status['remaining_hours']:.1f}h remaining)")
             return False
         
-        margin = self.STEPS[0]  # First step margin
+        margin = float(self._steps_np[0])  # First step margin
         
         try:
             # Calculate quantity
@@ -330,7 +521,9 @@ class MartingaleManager:
                     step=1,
                     total_quantity=quantity,
                     total_margin=margin,
-                    average_entry=current_price
+                    average_entry=current_price,
+                    notional_sum=current_price * quantity,
+                    entry_quantity=quantity
                 )
                 
                 self.positions[symbol] = position
@@ -338,6 +531,7 @@ class MartingaleManager:
                 logger.info(f"🎰 Martingale Step 1: {symbol} SHORT")
                 logger.info(f"   Entry: {current_price:.6f} | Margin: ${margin}")
                 
+                self._publish_status()
                 return True
             
         except Exception as e:
@@ -355,17 +549,16 @@ class MartingaleManager:
         - Not at max steps
         
         Returns:
-            Dict with should_add, reason, step_num
+            Dict with should_add, reason, step_num (shared _NO_ADD when not ready)
         """
         position = self.get_position(symbol)
         if not position:
-            return {'should_add': False, 'reason': 'No position'}
+            return _NO_ADD
         
         current_step = position.step
-        max_steps = len(self.STEPS)
         
-        if current_step >= max_steps:
-            return {'should_add': False, 'reason': 'Max steps reached'}
+        if current_step >= self._n_steps:
+            return _NO_ADD
         
         next_step = current_step + 1
         
@@ -388,56 +581,41 @@ class MartingaleManager:
                 required_loss_percent = 90
             
             if margin_loss_percent < required_loss_percent:
-                return {
-                    'should_add': False,
-                    'reason': f'Margin loss {margin_loss_percent:.0f}% < {required_loss_percent}% required',
-                    'margin_loss': margin_loss_percent,
-                    'current_loss': current_loss
-                }
+                return _NO_ADD
             
             # Loss threshold reached - ready for next step
             return {
                 'should_add': True,
                 'reason': f'Margin loss {margin_loss_percent:.0f}% >= {required_loss_percent}% - Ready!',
                 'step_num': next_step,
-                'margin': self.STEPS[next_step - 1],
+                'margin': float(self._steps_np[next_step - 1]),
                 'margin_loss': margin_loss_percent,
                 'current_loss': current_loss
             }
         
         # For steps 5+: Use distance-based entry (original logic)
         distance_percent = ((current_price - position.average_entry) / position.average_entry) * 100
-        required_distance = self.STEP_DISTANCES[next_step - 1] if next_step <= len(self.STEP_DISTANCES) else 50
+        required_distance = self._dist_np[next_step - 1]
         
         # Time since last step
         time_since_last = (datetime.now() - position.last_step_time).total_seconds() / 60
-        required_wait = self.STEP_WAIT_TIMES[next_step - 1] if next_step <= len(self.STEP_WAIT_TIMES) else 0
+        required_wait = self._wait_np[next_step - 1]
         
         # Check distance
         if distance_percent < required_distance:
-            return {
-                'should_add': False,
-                'reason': f'Distance {distance_percent:.1f}% < {required_distance}% required',
-                'distance': distance_percent,
-                'time_waiting': time_since_last
-            }
+            return _NO_ADD
         
         # Check time (can be overridden if distance is very high)
         if time_since_last < required_wait:
             # Allow override if distance is 1.5x required
             if distance_percent < required_distance * 1.5:
-                return {
-                    'should_add': False,
-                    'reason': f'Wait time {time_since_last:.0f}min < {required_wait}min required',
-                    'distance': distance_percent,
-                    'time_waiting': time_since_last
-                }
+                return _NO_ADD
         
         return {
             'should_add': True,
             'reason': f'Distance {distance_percent:.1f}% + Wait {time_since_last:.0f}min',
             'step_num': next_step,
-            'margin': self.STEPS[next_step - 1],
+            'margin': float(self._steps_np[next_step - 1]),
             'distance': distance_percent,
             'time_waiting': time_since_last
         }
@@ -451,10 +629,10 @@ class MartingaleManager:
             return False
         
         next_step = position.step + 1
-        if next_step > len(self.STEPS):
+        if next_step > self._n_steps:
             return False
         
-        margin = self.STEPS[next_step - 1]
+        margin = float(self._steps_np[next_step - 1])
         
         try:
             quantity = self._calculate_quantity(symbol, margin, current_price)
@@ -482,15 +660,19 @@ class MartingaleManager:
                 position.step = next_step
                 position.total_quantity += quantity
                 position.total_margin += margin
+                self._equity_peaks.pop(symbol, None)  # Margin basis changed
                 position.last_step_time = datetime.now()
+                position.notional_sum += current_price * quantity
+                position.entry_quantity += quantity
                 
-                # Recalculate average entry
-                position.average_entry = self._calculate_average(position)
+                # Recalculate average entry from the running sums (entry_quantity > 0 here)
+                position.average_entry = position.notional_sum / position.entry_quantity
                 
                 logger.info(f"🎰 Martingale Step {next_step}: {symbol}")
                 logger.info(f"   Price: {current_price:.6f} | Margin: ${margin}")
                 logger.info(f"   New Avg: {position.average_entry:.6f} | Total Margin: ${position.total_margin}")
                 
+                self._publish_status()
                 return True
                 
         except Exception as e:
@@ -506,13 +688,13 @@ class MartingaleManager:
         """
         position = self.get_position(symbol)
         if not position:
-            return {'should_close': False}
+            return _NO_CLOSE
         
         if position.step < 3:
-            return {'should_close': False, 'reason': 'Step < 3'}
+            return _NO_CLOSE
         
         if position.half_closed:
-            return {'should_close': False, 'reason': 'Already half-closed'}
+            return _NO_CLOSE
         
         # For SHORT: profit when price drops (current < average)
         # Negative distance = profit for SHORT
@@ -538,7 +720,7 @@ class MartingaleManager:
                 'distance': distance_to_avg
             }
         
-        return {'should_close': False, 'reason': f'Distance {distance_to_avg:.1f}%', 'pnl_usd': pnl_usd}
+        return _NO_CLOSE
     
     def close_half(self, symbol: str, current_price: float) -> bool:
         """Close half of the Martingale position"""
@@ -553,12 +735,13 @@ class MartingaleManager:
             result = self.client.place_market_order(
                 symbol=symbol,
                 side='BUY',
-                quantity=self.client.round_quantity(symbol, half_quantity)
+                quantity=self._round_qty(symbol, half_quantity)
             )
             
             if result:
                 position.total_quantity = half_quantity
                 position.half_closed = True
+                self._equity_peaks.pop(symbol, None)
                 
                 # Calculate P&L on closed portion
                 pnl = (position.average_entry - current_price) * half_quantity
@@ -567,6 +750,7 @@ class MartingaleManager:
                 logger.info(f"   Closed: {half_quantity:.4f} @ {current_price:.6f}")
                 logger.info(f"   P&L: ${pnl:.2f}")
                 
+                self._publish_status()
                 return True
                 
         except Exception as e:
@@ -586,21 +770,21 @@ class MartingaleManager:
         """
         position = self.get_position(symbol)
         if not position:
-            return {'should_close': False}
+            return _NO_CLOSE
         
         total_margin = self.get_total_margin()
         
         # Only trigger when margin is at threshold
         if total_margin < self.MARGIN_THRESHOLD:
-            return {'should_close': False, 'reason': f'Margin ${total_margin:.0f} < ${self.MARGIN_THRESHOLD}'}
+            return _NO_CLOSE
         
         # Only close early step positions (1-3)
         if position.step > 3:
-            return {'should_close': False, 'reason': f'Step {position.step} > 3'}
+            return _NO_CLOSE
         
         # Only trigger when we have too many positions
         if len(self.positions) <= self.MAX_POSITIONS_ABOVE_THRESHOLD:
-            return {'should_close': False, 'reason': f'Only {len(self.positions)} positions'}
+            return _NO_CLOSE
         
         # Calculate P&L
         pnl_usd = (position.average_entry - current_price) * position.total_quantity
@@ -620,7 +804,7 @@ class MartingaleManager:
                 'pnl_usd': pnl_usd
             }
         
-        return {'should_close': False, 'reason': f'P&L ${pnl_usd:.2f} not in range', 'pnl_usd': pnl_usd}
+        return _NO_CLOSE
     
     def should_recycle_margin(self, symbol: str, current_price: float) -> Dict:
         """
@@ -633,13 +817,13 @@ class MartingaleManager:
         """
         position = self.get_position(symbol)
         if not position:
-            return {'should_recycle': False}
+            return _NO_RECYCLE
         
         if position.step < self.RECYCLE_AFTER_STEP:
-            return {'should_recycle': False, 'reason': f'Step {position.step} < {self.RECYCLE_AFTER_STEP}'}
+            return _NO_RECYCLE
         
         if position.recycle_count >= self.MAX_RECYCLES:
-            return {'should_recycle': False, 'reason': f'Max recycles reached ({self.MAX_RECYCLES})'}
+            return _NO_RECYCLE
         
         # For SHORT: check if price has come down closer to average
         distance_to_avg = ((current_price - position.average_entry) / position.average_entry) * 100
@@ -652,7 +836,7 @@ class MartingaleManager:
                 'distance': distance_to_avg
             }
         
-        return {'should_recycle': False, 'reason': f'Distance {distance_to_avg:.1f}%'}
+        return _NO_RECYCLE
     
     def recycle_margin(self, symbol: str, current_price: float) -> bool:
         """
@@ -674,7 +858,7 @@ class MartingaleManager:
             result = self.client.place_market_order(
                 symbol=symbol,
                 side='BUY',  # Close SHORT
-                quantity=self.client.round_quantity(symbol, recycle_quantity)
+                quantity=self._round_qty(symbol, recycle_quantity)
             )
             
             if result:
@@ -687,6 +871,7 @@ class MartingaleManager:
                 # Update position
                 position.total_quantity -= recycle_quantity
                 position.total_margin -= freed_margin
+                self._equity_peaks.pop(symbol, None)
                 position.recycle_count += 1
                 position.recycled_margin += freed_margin
                 
@@ -695,6 +880,7 @@ class MartingaleManager:
                 logger.info(f"   P&L: ${pnl:.2f} | Freed: ${freed_margin:.2f}")
                 logger.info(f"   Recycle #{position.recycle_count} | Total freed: ${position.recycled_margin:.2f}")
                 
+                self._publish_status()
                 return True
                 
         except Exception as e:
@@ -710,14 +896,14 @@ class MartingaleManager:
         """
         position = self.get_position(symbol)
         if not position:
-            return {'should_close': False}
+            return _NO_CLOSE
         
         # For SHORT: loss when price goes up
         drawdown_percent = ((current_price - position.average_entry) / position.average_entry) * 100
         
         # Calculate USD loss
         usd_loss = (position.average_entry - current_price) * position.total_quantity
-        hard_stop_usd = getattr(config, 'MARTINGALE_HARD_STOP_USD', 55)
+        hard_stop_usd = self.hard_stop_usd
         
         # 1. USD Hard Stop
         # Note: usd_loss is negative when losing
@@ -737,7 +923,27 @@ class MartingaleManager:
                 'drawdown': drawdown_percent
             }
         
-        return {'should_close': False, 'drawdown': drawdown_percent}
+        # 3. Lookback Drawdown Stop (equity drop from recent peak)
+        if self.lookback_drawdown > 0:
+            rolling = self._equity_peaks.get(symbol)
+            if rolling is None:
+                rolling = self._equity_peaks[symbol] = RollingMax(self.drawdown_lookback_sec)
+            
+            equity = position.total_margin + usd_loss
+            rolling.push(time.time(), equity)
+            peak = rolling.peak()
+            
+            if peak > 0:
+                equity_drawdown = (peak - equity) / peak * 100
+                if equity_drawdown >= self.lookback_drawdown:
+                    return {
+                        'should_close': True,
+                        'reason': f'Emergency! Equity {equity_drawdown:.1f}% below recent peak',
+                        'drawdown': drawdown_percent,
+                        'pnl': usd_loss
+                    }
+        
+        return _NO_CLOSE
     
     def close_position(self, symbol: str, current_price: float, reason: str = "") -> bool:
         """Close entire Martingale position"""
@@ -746,12 +952,15 @@ class MartingaleManager:
             return False
         
         try:
-            # Close all (BUY to close SHORT)
-            result = self.client.place_market_order(
+            # Close all (BUY to close SHORT) - flushed right away so the order
+            # shares a batch with anything already queued
+            order = self.executor.batcher.submit_market_order(
                 symbol=symbol,
                 side='BUY',
-                quantity=self.client.round_quantity(symbol, position.total_quantity)
+                quantity=self._round_qty(symbol, position.total_quantity)
             )
+            self.executor.batcher.flush()
+            result = order.result()
             
             if result:
                 # Calculate final P&L
@@ -769,7 +978,9 @@ class MartingaleManager:
                 
                 # Remove position
                 del self.positions[symbol]
+                self._equity_peaks.pop(symbol, None)
                 
+                self._publish_status()
                 return True
                 
         except Exception as e:
@@ -779,38 +990,148 @@ class MartingaleManager:
     
     def _calculate_quantity(self, symbol: str, margin: float, price: float) -> float:
         """Calculate position quantity from margin"""
-        leverage = getattr(config, 'LEVERAGE', 5)
-        position_value = margin * leverage
+        position_value = margin * self.leverage
         quantity = position_value / price
-        return self.client.round_quantity(symbol, quantity)
+        return self._round_qty(symbol, quantity)
     
-    def _calculate_average(self, position: MartingalePosition) -> float:
-        """Calculate weighted average entry price"""
-        if not position.entries:
-            return 0
-        
-        total_value = sum(e['price'] * e['quantity'] for e in position.entries)
-        total_qty = sum(e['quantity'] for e in position.entries)
-        
-        return total_value / total_qty if total_qty > 0 else 0
+    def _round_qty(self, symbol: str, quantity: float) -> float:
+        """Round quantity to symbol precision (looked up once per symbol)"""
+        precision = self._qty_precision_cache.get(symbol)
+        if precision is None:
+            info = self.client.get_symbol_info(symbol)
+            if not info:
+                return round(quantity, 3)
+            precision = info.get('quantityPrecision', 3)
+            self._qty_precision_cache[symbol] = precision
+        return round(quantity, precision)
     
-    def get_status(self) -> Dict:
-        """Get status of all Martingale positions"""
-        status = {
-            'active_positions': len(self.positions),
-            'positions': {}
-        }
-        
-        for symbol, pos in self.positions.items():
-            status['positions'][symbol] = {
+    def _publish_status(self):
+        """Rebuild the immutable status snapshot after a position change"""
+        positions = {
+            symbol: MappingProxyType({
                 'step': pos.step,
                 'total_margin': pos.total_margin,
                 'average_entry': pos.average_entry,
                 'half_closed': pos.half_closed,
                 'entries': len(pos.entries)
+            })
+            for symbol, pos in self.positions.items()
+        }
+        status = MappingProxyType({
+            'active_positions': len(positions),
+            'positions': MappingProxyType(positions)
+        })
+        # Single reference assignment - readers see the old or new snapshot, never a mix
+        self._status_snapshot = (status, time.monotonic_ns())
+        self._positions_snapshot = tuple(self.positions.items())
+        
+        # Per-field arrays in the same order, for the vectorized TP pass
+        pos_list = [pos for _, pos in self._positions_snapshot]
+        n = len(pos_list)
+        self._arrays = PositionArrays(
+            step=np.fromiter((p.step for p in pos_list), dtype=np.int32, count=n),
+            average_entry=np.fromiter((p.average_entry for p in pos_list), dtype=np.float64, count=n),
+            total_quantity=np.fromiter((p.total_quantity for p in pos_list), dtype=np.float64, count=n),
+            trailing_tp_active=np.fromiter((p.trailing_tp_active for p in pos_list), dtype=bool, count=n),
+            max_profit_usd=np.fromiter((p.max_profit_usd for p in pos_list), dtype=np.float64, count=n)
+        )
+    
+    def batch_check_tp(self, current_prices: np.ndarray, tp_table: np.ndarray,
+                       trailing_callback: float = 0.30) -> Dict:
+        """
+        Trailing take-profit update for all positions at once
+        
+        Same rules as the per-position check: trailing activates once P&L reaches
+        the step's target, closes after a `trailing_callback` drop from the max,
+        and resets below half the target. Positions with no price (<= 0) are
+        left untouched. Changed trailing state is written back to the positions.
+        
+        Args:
+            current_prices: Mark prices aligned with snapshot_positions()
+            tp_table: TP target ($) by step (steps past the end use the last)
+            trailing_callback: Profit drop from max that triggers the close
+        
+        Returns:
+            Dict of arrays: should_close, pnl_usd, tp_target, max_profit,
+            trailing, activated, new_max
+        """
+        arrays = self._arrays
+        prices = np.asarray(current_prices, dtype=np.float64)
+        tp_table = np.asarray(tp_table, dtype=np.float64)
+        
+        valid = prices > 0
+        pnl = (arrays.average_entry - prices) * arrays.total_quantity
+        tp_target = tp_table[np.clip(arrays.step, 0, len(tp_table) - 1)]
+        above = valid & (pnl >= tp_target)
+        
+        # Common case: nothing at its target and nothing trailing - no state can change
+        if not above.any() and not arrays.trailing_tp_active.any():
+            none = np.zeros(len(prices), dtype=bool)
+            return {
+                'should_close': none,
+                'pnl_usd': pnl,
+                'tp_target': tp_target,
+                'max_profit': arrays.max_profit_usd.copy(),
+                'trailing': none,
+                'activated': none,
+                'new_max': none
             }
         
-        return status
+        was_trailing = arrays.trailing_tp_active.copy()
+        old_max = arrays.max_profit_usd.copy()
+        
+        if NUMBA_AVAILABLE:
+            # Compiled scalar loop - updates the trailing arrays in place
+            action = np.zeros(len(prices), dtype=np.int8)
+            _trailing_tp_pass(
+                pnl, tp_target, valid, arrays.trailing_tp_active, arrays.max_profit_usd,
+                trailing_callback, action
+            )
+            should_close = action == _TP_CLOSE
+            activated = action == _TP_ACTIVATED
+            new_max = action == _TP_NEW_MAX
+            trailing = arrays.trailing_tp_active.copy()
+            max_profit = arrays.max_profit_usd.copy()
+        else:
+            activated = above & ~was_trailing
+            new_max = above & ~activated & (pnl > old_max)
+            max_profit = np.where(activated | new_max, pnl, old_max)
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                drop = np.where(max_profit > 0, (max_profit - pnl) / max_profit, 0.0)
+            should_close = above & (drop >= trailing_callback)
+            
+            reset = valid & ~above & was_trailing & (pnl < tp_target * 0.5)
+            trailing = (was_trailing | above) & ~reset
+            max_profit = np.where(reset, 0.0, max_profit)
+            arrays.trailing_tp_active[:] = trailing
+            arrays.max_profit_usd[:] = max_profit
+        
+        # Only the handful of changed rows go back to the position objects
+        changed = np.flatnonzero((trailing != was_trailing) | (max_profit != old_max))
+        positions = self._positions_snapshot
+        for i in changed:
+            position = positions[i][1]
+            position.trailing_tp_active = bool(trailing[i])
+            position.max_profit_usd = float(max_profit[i])
+        
+        return {
+            'should_close': should_close,
+            'pnl_usd': pnl,
+            'tp_target': tp_target,
+            'max_profit': max_profit,
+            'trailing': trailing,
+            'activated': activated,
+            'new_max': new_max
+        }
+    
+    def snapshot_positions(self) -> tuple:
+        """(symbol, position) pairs as of the last open/close - safe to iterate while closing"""
+        return self._positions_snapshot
+    
+    def get_status(self) -> Dict:
+        """Get status of all Martingale positions (read-only snapshot, safe from any thread)"""
+        return self._status_snapshot[0]
 
 
 if __name__ == "__main__":
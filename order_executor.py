@@ -3,9 +3,98 @@ Order Executor Module
 Handles order placement and management
 """
 
-from typing import Dict, Optional
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 import config
 from logger import logger, log_trade
+from risk_manager import TradeParams
+
+
+@dataclass
+class PendingOrder:
+    """An order waiting in the batch queue"""
+    params: Dict
+    future: Future = field(default_factory=Future)
+
+
+class OrderBatcher:
+    """
+    Coalesce orders into /fapi/v1/batchOrders requests
+    
+    Orders queued within `interval` seconds go out together, at most
+    `max_batch_size` per request. Callers that need the result right away
+    can call flush() to send the queue immediately.
+    """
+    
+    def __init__(self, client, interval: float = 0.1, max_batch_size: int = 5):
+        self.client = client
+        self.interval = interval
+        self.max_batch_size = max_batch_size
+        self.pending_orders: List[PendingOrder] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def submit(self, params: Dict) -> Future:
+        """Queue an order and return a future for its response"""
+        order = PendingOrder(params)
+        with self._lock:
+            self.pending_orders.append(order)
+            if len(self.pending_orders) >= self.max_batch_size:
+                flush_now = True
+            else:
+                flush_now = False
+                if self._timer is None:
+                    self._timer = threading.Timer(self.interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        
+        if flush_now:
+            self.flush()
+        return order.future
+    
+    def submit_market_order(self, symbol: str, side: str, quantity: float) -> Future:
+        """Queue a market order"""
+        return self.submit({
+            'symbol': symbol,
+            'side': side,
+            'type': 'MARKET',
+            'quantity': quantity
+        })
+    
+    def flush(self):
+        """Send all queued orders now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            orders, self.pending_orders = self.pending_orders, []
+        
+        for i in range(0, len(orders), self.max_batch_size):
+            self._send_batch(orders[i:i + self.max_batch_size])
+    
+    def _send_batch(self, batch: List[PendingOrder]):
+        """Send one batch and resolve each order's future"""
+        try:
+            responses = self.client.place_batch_orders([o.params for o in batch])
+        except Exception as e:
+            for order in batch:
+                order.future.set_exception(e)
+            return
+        
+        for order, response in zip(batch, responses):
+            if isinstance(response, dict) and 'orderId' in response:
+                order.future.set_result(response)
+            else:
+                code = response.get('code') if isinstance(response, dict) else None
+                msg = response.get('msg') if isinstance(response, dict) else response
+                order.future.set_exception(Exception(f"API Error {code}: {msg}"))
+        
+        # Guard against a short response list
+        for order in batch[len(responses):]:
+            order.future.set_exception(Exception("No response for batched order"))
 
 
 class OrderExecutor:
@@ -13,7 +102,14 @@ class OrderExecutor:
     
     def __init__(self, client):
         self.client = client
-        self.pending_orders = {}  # Track orders by symbol
+        self.pending_orders = {}  # Protective order futures by symbol, until both finish
+        self.batcher = OrderBatcher(client)
+        self.stop_loss_attempts = 2  # then the unprotected position is closed
+        
+        # Background pool for SL/TP placement so entries don't wait on them
+        self._protective_pool = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="protective"
+        )
     
     def setup_symbol(self, symbol: str) -> bool:
         """
@@ -43,7 +139,7 @@ class OrderExecutor:
             logger.error(f"Failed to setup {symbol}: {e}")
             return False
     
-    def execute_entry(self, trade_params: Dict) -> Optional[Dict]:
+    def execute_entry(self, trade_params: TradeParams) -> Optional[Dict]:
         """
         Execute a market entry order with stop-loss and take-profit
         
@@ -53,11 +149,11 @@ class OrderExecutor:
         Returns:
             Order response or None if failed
         """
-        symbol = trade_params['symbol']
-        side = trade_params['side']
-        quantity = trade_params['quantity']
-        stop_loss = trade_params['stop_loss']
-        take_profit = trade_params['take_profit']
+        symbol = trade_params.symbol
+        side = trade_params.side
+        quantity = trade_params.quantity
+        stop_loss = trade_params.stop_loss
+        take_profit = trade_params.take_profit
         
         try:
             # Setup symbol first
@@ -77,34 +173,12 @@ class OrderExecutor:
                 return None
             
             order_id = entry_order['orderId']
-            entry_price = float(entry_order.get('avgPrice', trade_params['entry_price']))
+            entry_price = float(entry_order.get('avgPrice', trade_params.entry_price))
             
             logger.info(f"✅ Entry order filled: {symbol} {side} {quantity} @ {entry_price}")
             
-            # Place stop loss
-            sl_side = "SELL" if side == "BUY" else "BUY"
-            try:
-                sl_order = self.client.place_stop_loss(
-                    symbol=symbol,
-                    side=sl_side,
-                    quantity=quantity,
-                    stop_price=stop_loss
-                )
-                logger.info(f"✅ Stop Loss placed: {symbol} @ {stop_loss}")
-            except Exception as e:
-                logger.warning(f"Failed to place SL for {symbol}: {e}")
-            
-            # Place take profit
-            try:
-                tp_order = self.client.place_take_profit(
-                    symbol=symbol,
-                    side=sl_side,
-                    quantity=quantity,
-                    stop_price=take_profit
-                )
-                logger.info(f"✅ Take Profit placed: {symbol} @ {take_profit}")
-            except Exception as e:
-                logger.warning(f"Failed to place TP for {symbol}: {e}")
+            # Place stop loss and take profit in the background
+            self._place_protective_orders(symbol, side, quantity, stop_loss, take_profit)
             
             # Log trade
             log_trade(
@@ -131,13 +205,107 @@ class OrderExecutor:
             logger.error(f"Failed to execute entry for {symbol}: {e}")
             return None
     
-    def close_position(self, symbol: str, position: Dict) -> Optional[Dict]:
+    def _place_protective_orders(self, symbol: str, side: str, quantity: float,
+                                 stop_loss: float, take_profit: float) -> Dict[str, Future]:
+        """
+        Submit stop-loss and take-profit orders concurrently
+        
+        The futures are kept in pending_orders[symbol] until both finish.
+        
+        Returns:
+            Dict with 'stop_loss' and 'take_profit' futures
+        """
+        sl_side = "SELL" if side == "BUY" else "BUY"
+        
+        tp_future = self._protective_pool.submit(
+            self.client.place_take_profit,
+            symbol=symbol, side=sl_side, quantity=quantity, stop_price=take_profit
+        )
+        sl_future = self._protective_pool.submit(
+            self._place_stop_loss_or_close, symbol, side, sl_side, quantity, stop_loss, tp_future
+        )
+        futures = {'stop_loss': sl_future, 'take_profit': tp_future}
+        self.pending_orders[symbol] = futures
+        
+        sl_future.add_done_callback(
+            lambda f: self._log_protective_result(f, symbol, "Stop Loss", "SL", stop_loss)
+        )
+        tp_future.add_done_callback(
+            lambda f: self._log_protective_result(f, symbol, "Take Profit", "TP", take_profit)
+        )
+        
+        def release(_):
+            # Drop the entry once both are done (unless a newer entry replaced it)
+            if all(f.done() for f in futures.values()) and self.pending_orders.get(symbol) is futures:
+                self.pending_orders.pop(symbol, None)
+        
+        for future in futures.values():
+            future.add_done_callback(release)
+        
+        return futures
+    
+    def _place_stop_loss_or_close(self, symbol: str, side: str, sl_side: str,
+                                  quantity: float, stop_loss: float, tp_future: Future) -> Dict:
+        """
+        Place the stop loss, retrying; if it can't be placed, close the position
+        
+        An entry must never be left without a stop. Raises the last error
+        after closing, so the future still reports the failure.
+        """
+        for attempt in range(1, self.stop_loss_attempts + 1):
+            try:
+                return self.client.place_stop_loss(
+                    symbol=symbol, side=sl_side, quantity=quantity, stop_price=stop_loss
+                )
+            except Exception as e:
+                error = e
+                logger.warning(f"SL attempt {attempt}/{self.stop_loss_attempts} failed for {symbol}: {e}")
+        
+        logger.error(f"🚨 No stop loss for {symbol} - closing the position")
+        # Let the TP land first so the close's cancel-all removes it too
+        # (bounded - this runs on the same pool as the TP)
+        wait([tp_future], timeout=10)
+        position_amt = quantity if side == "BUY" else -quantity
+        if self.close_position(symbol, {'positionAmt': position_amt}) is None:
+            logger.error(f"🚨 {symbol} is OPEN WITHOUT A STOP LOSS - close it manually")
+        raise error
+    
+    def _log_protective_result(self, future: Future, symbol: str, name: str,
+                               short_name: str, price: float):
+        """Log outcome of a background protective order"""
+        error = future.exception()
+        if error:
+            logger.warning(f"Failed to place {short_name} for {symbol}: {error}")
+        else:
+            logger.info(f"✅ {name} placed: {symbol} @ {price}")
+    
+    def wait_protective_orders(self, symbol: str, timeout: float = None) -> bool:
+        """
+        Block until a symbol's SL/TP orders have been submitted
+        
+        Returns:
+            True if both orders were placed successfully
+        """
+        futures = self.pending_orders.get(symbol)
+        if not futures:
+            return False
+        
+        done, not_done = wait(futures.values(), timeout=timeout)
+        if not_done:
+            return False
+        
+        self.pending_orders.pop(symbol, None)
+        return all(f.exception() is None for f in done)
+    
+    def close_position(self, symbol: str, position: Dict,
+                       order_ids: Optional[List[int]] = None) -> Optional[Dict]:
         """
         Close an existing position
         
         Args:
             symbol: Trading pair
             position: Position info dict
+            order_ids: Known open order ids to cancel (None = cancel all for symbol)
         
         Returns:
             Order response or None
@@ -152,8 +320,11 @@ class OrderExecutor:
             side = "SELL" if position_amt > 0 else "BUY"
             quantity = abs(position_amt)
             
-            # Cancel all pending orders first
-            self.client.cancel_all_orders(symbol)
+            # Cancel pending orders first
+            if order_ids is None:
+                self.client.cancel_all_orders(symbol)
+            elif order_ids:
+                self.client.cancel_batch_orders(symbol, order_ids)
             
             # Close position with market order
             order = self.client.place_market_order(
@@ -170,9 +341,37 @@ class OrderExecutor:
             logger.error(f"Failed to close position for {symbol}: {e}")
             return None
     
+    async def close_position_async(self, symbol: str, position: Dict,
+                                   order_ids: Optional[List[int]] = None) -> Optional[Dict]:
+        """Close a position without blocking the event loop"""
+        return await asyncio.to_thread(self.close_position, symbol, position, order_ids)
+    
+    async def close_positions_async(self, positions: List[Dict],
+                                    orders_by_symbol: Dict[str, List[int]] = None) -> Dict[str, Optional[Dict]]:
+        """
+        Close several positions concurrently
+        
+        Args:
+            positions: Position info dicts
+            orders_by_symbol: Open order ids per symbol, if already known
+                (symbols without open orders then skip the cancel request)
+        
+        Returns:
+            Dict of symbol -> close order response (None if failed)
+        """
+        symbols = [p['symbol'] for p in positions]
+        results = await asyncio.gather(*[
+            self.close_position_async(
+                symbol, position,
+                None if orders_by_symbol is None else orders_by_symbol.get(symbol, [])
+            )
+            for symbol, position in zip(symbols, positions)
+        ])
+        return dict(zip(symbols, results))
+    
     def close_all_positions(self) -> int:
         """
-        Close all open positions
+        Close all open positions (concurrently)
         
         Returns:
             Number of positions closed
@@ -182,11 +381,32 @@ class OrderExecutor:
         try:
             positions = self.client.get_positions()
             
-            for position in positions:
-                symbol = position['symbol']
-                result = self.close_position(symbol, position)
-                if result:
-                    closed_count += 1
+            if positions:
+                # One open-orders fetch, then batch cancels only where needed
+                # (if it fails, each close cancels all orders for its symbol)
+                orders_by_symbol = {}
+                try:
+                    for order in self.client.get_open_orders():
+                        orders_by_symbol.setdefault(order['symbol'], []).append(order['orderId'])
+                except Exception as e:
+                    logger.debug(f"Error fetching open orders: {e}")
+                    orders_by_symbol = None
+                
+                try:
+                    asyncio.get_running_loop()
+                except RuntimeError:
+                    results = asyncio.run(self.close_positions_async(positions, orders_by_symbol))
+                else:
+                    # Called from inside an event loop - asyncio.run would raise
+                    # (async callers should await close_positions_async instead)
+                    results = {
+                        p['symbol']: self.close_position(
+                            p['symbol'], p,
+                            None if orders_by_symbol is None else orders_by_symbol.get(p['symbol'], [])
+                        )
+                        for p in positions
+                    }
+                closed_count = sum(1 for r in results.values() if r)
             
         except Exception as e:
             logger.error(f"Error closing positions: {e}")
@@ -3,22 +3,111 @@ Position Monitor Module
 Monitors open positions and updates trailing stop losses
 """
 
+import copy
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import numpy as np
+
 import config
 from logger import logger
-from typing import Dict, List, Optional
+from mark_price_stream import MarkPriceStream
+from order_executor import OrderBatcher
+from typing import Dict, List, Optional, Tuple
+# numba is optional - the kernels below run as plain Python without it
+from numba_compat import njit
+
+
+@njit(cache=True)
+def _profit_kernel(sign: float, entry: float, mark: float) -> float:
+    """Profit % of a position at `mark` (sign: +1 long, -1 short; 0 if entry is unknown)"""
+    if entry == 0.0:
+        return 0.0
+    return sign * (mark - entry) / entry * 100.0
+
+
+@njit(cache=True)
+def _breakeven_kernel(sign: float, entry: float, mark: float, activation: float) -> float:
+    """Break-even stop (0.1% past entry for fees), NaN if not yet activated"""
+    if _profit_kernel(sign, entry, mark) < activation:
+        return np.nan
+    return entry * (1.0 + 0.001 * sign)
+
+
+@njit(cache=True)
+def _trailing_kernel(sign: float, entry: float, high: float, low: float, mark: float,
+                     activation: float, cb_pct: float) -> Tuple[float, float]:
+    """
+    Trailing stop from the best price seen
+    
+    Returns:
+        (new_stop, profit_pct) - new_stop is NaN below the activation profit
+    """
+    profit_pct = _profit_kernel(sign, entry, mark)
+    if profit_pct < activation:
+        return np.nan, profit_pct
+    # Long trails below the highest price, short above the lowest
+    best = high if sign > 0.0 else low
+    return best * (1.0 - cb_pct * sign), profit_pct
+
+
+@dataclass(slots=True)
+class TrackedPosition:
+    """Trailing/break-even state for one open position"""
+    entry_price: float
+    highest: float
+    lowest: float
+    side: str  # BUY or SELL
+    sign: float  # +1.0 for BUY, -1.0 for SELL (branchless P&L math)
+    quantity: float
+    trailing_active: bool = False
+    breakeven_set: bool = False
+    partial_tp_done: bool = False
 
 
 class PositionMonitor:
     """Monitors positions and manages trailing stops"""
     
-    def __init__(self, client):
+    def __init__(self, client, batcher: OrderBatcher = None):
         self.client = client
+        # Partial TPs and stop replacements are queued so simultaneous triggers share requests
+        self.batcher = batcher or OrderBatcher(client)
         # Track entry prices and highest prices for trailing
-        self.position_data = {}  # {symbol: {'entry_price': x, 'highest': x, 'lowest': x, 'side': 'BUY/SELL'}}
+        self.position_data: Dict[str, TrackedPosition] = {}
+        
+        # Settings read once instead of per tick
+        self.breakeven_enabled = getattr(config, 'BREAKEVEN_ENABLED', False)
+        self.breakeven_activation = getattr(config, 'BREAKEVEN_ACTIVATION', 0.5)
+        self.partial_tp_enabled = getattr(config, 'PARTIAL_TP_ENABLED', False)
+        self.partial_tp_activation = getattr(config, 'PARTIAL_TP_ACTIVATION', 1.0)
+        self.partial_tp_fraction = getattr(config, 'PARTIAL_TP_PERCENT', 50) / 100
+        self.trailing_enabled = config.TRAILING_STOP_ENABLED
+        self.trailing_activation = config.TRAILING_STOP_ACTIVATION
+        self.trailing_callback = config.TRAILING_STOP_CALLBACK / 100
+        self.stop_update_interval = getattr(config, 'TRAILING_STOP_UPDATE_INTERVAL', 5)
+        
+        # Stream mode: pushes arrive on the stream thread, so state changes are locked
+        self.stream: Optional[MarkPriceStream] = None
+        self._stop_orders: Dict[str, Dict] = {}  # symbol -> open STOP_MARKET order
+        self._lock = threading.RLock()
+        
+        # Stream mode: stop replacements (REST) run here, off the socket thread
+        self._stop_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stops")
+        self._moving: set = set()  # Symbols with a replacement in flight
+        self._last_move: Dict[str, float] = {}  # symbol -> monotonic time of the last move
     
-    def update_position_tracking(self, positions: List[Dict]):
-        """Update tracked positions with current market data"""
-        current_symbols = set()
+    def update_position_tracking(self, positions: List[Dict]) -> Dict[str, Dict]:
+        """
+        Update tracked positions with current market data
+        
+        Returns:
+            Dict of symbol -> parsed open position
+            ({'position_amt', 'entry_price', 'mark_price', 'side'})
+        """
+        parsed = {}
         
         for pos in positions:
             symbol = pos['symbol']
@@ -27,34 +116,41 @@ class PositionMonitor:
             if position_amt == 0:
                 continue
                 
-            current_symbols.add(symbol)
             entry_price = float(pos.get('entryPrice', 0))
             mark_price = float(pos.get('markPrice', 0))
             side = 'BUY' if position_amt > 0 else 'SELL'
+            parsed[symbol] = {
+                'position_amt': position_amt,
+                'entry_price': entry_price,
+                'mark_price': mark_price,
+                'side': side
+            }
             
             if symbol not in self.position_data:
                 # New position
-                self.position_data[symbol] = {
-                    'entry_price': entry_price,
-                    'highest': mark_price,
-                    'lowest': mark_price,
-                    'side': side,
-                    'quantity': abs(position_amt),
-                    'trailing_active': False
-                }
+                self.position_data[symbol] = TrackedPosition(
+                    entry_price=entry_price,
+                    highest=mark_price,
+                    lowest=mark_price,
+                    side=side,
+                    sign=1.0 if side == 'BUY' else -1.0,
+                    quantity=abs(position_amt)
+                )
                 logger.debug(f"Tracking new position: {symbol} {side}")
             else:
                 # Update existing position
                 data = self.position_data[symbol]
-                data['highest'] = max(data['highest'], mark_price)
-                data['lowest'] = min(data['lowest'], mark_price)
-                data['quantity'] = abs(position_amt)
+                data.highest = max(data.highest, mark_price)
+                data.lowest = min(data.lowest, mark_price)
+                data.quantity = abs(position_amt)
         
         # Remove closed positions from tracking
-        closed = set(self.position_data.keys()) - current_symbols
+        closed = self.position_data.keys() - parsed.keys()
         for symbol in closed:
             del self.position_data[symbol]
             logger.debug(f"Stopped tracking closed position: {symbol}")
+        
+        return parsed
     
     def calculate_profit_percent(self, symbol: str, current_price: float) -> float:
         """Calculate current profit percentage for a position"""
@@ -62,19 +158,40 @@ class PositionMonitor:
             return 0.0
         
         data = self.position_data[symbol]
-        entry_price = data['entry_price']
+        return _profit_kernel(data.sign, data.entry_price, current_price)
+    
+    def compute_all_profits(self, symbols: List[str], mark_prices: np.ndarray) -> np.ndarray:
+        """
+        Calculate profit percentage for several tracked positions in one vector op
         
-        if entry_price == 0:
-            return 0.0
+        Args:
+            symbols: Tracked symbols
+            mark_prices: Current prices, aligned with symbols
         
-        if data['side'] == 'BUY':
-            return ((current_price - entry_price) / entry_price) * 100
-        else:  # SELL
-            return ((entry_price - current_price) / entry_price) * 100
+        Returns:
+            Profit % per symbol (0 where entry price is unknown)
+        """
+        records = [self.position_data[s] for s in symbols]
+        n = len(records)
+        entries = np.fromiter((r.entry_price for r in records), dtype=np.float64, count=n)
+        signs = np.fromiter((r.sign for r in records), dtype=np.float64, count=n)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profits = signs * (mark_prices - entries) / entries * 100
+        return np.where(entries == 0, 0.0, profits)
+    
+    def _min_stop_activation(self) -> Optional[float]:
+        """Lowest profit % at which break-even or trailing can move a stop"""
+        thresholds = []
+        if self.breakeven_enabled:
+            thresholds.append(self.breakeven_activation)
+        if self.trailing_enabled:
+            thresholds.append(self.trailing_activation)
+        return min(thresholds) if thresholds else None
     
     def calculate_breakeven_stop(self, symbol: str, current_price: float) -> Optional[float]:
         """Calculate break-even stop price (move SL to entry)"""
-        if not getattr(config, 'BREAKEVEN_ENABLED', False):
+        if not self.breakeven_enabled:
             return None
         
         if symbol not in self.position_data:
@@ -83,29 +200,20 @@ class PositionMonitor:
         data = self.position_data[symbol]
         
         # Already moved to break-even
-        if data.get('breakeven_set', False):
+        if data.breakeven_set:
             return None
         
-        profit_pct = self.calculate_profit_percent(symbol, current_price)
-        activation = getattr(config, 'BREAKEVEN_ACTIVATION', 0.5)
-        
-        # Check if profit threshold is met
-        if profit_pct >= activation:
-            entry_price = data['entry_price']
-            # Add small buffer to cover fees
-            if data['side'] == 'BUY':
-                new_stop = entry_price * 1.001  # 0.1% above entry
-            else:
-                new_stop = entry_price * 0.999  # 0.1% below entry
-            
-            new_stop = self.client.round_price(symbol, new_stop)
-            return new_stop
+        new_stop = _breakeven_kernel(data.sign, data.entry_price, current_price, self.breakeven_activation)
         
-        return None
+        # NaN when the profit threshold isn't met yet
+        if new_stop != new_stop:
+            return None
+        
+        return self.client.round_price(symbol, new_stop)
     
     def check_partial_take_profit(self, symbol: str, current_price: float) -> bool:
         """Check and execute partial take profit (close 50% of position)"""
-        if not getattr(config, 'PARTIAL_TP_ENABLED', False):
+        if not self.partial_tp_enabled:
             return False
         
         if symbol not in self.position_data:
@@ -114,68 +222,89 @@ class PositionMonitor:
         data = self.position_data[symbol]
         
         # Already took partial profit
-        if data.get('partial_tp_done', False):
+        if data.partial_tp_done:
             return False
         
         profit_pct = self.calculate_profit_percent(symbol, current_price)
-        activation = getattr(config, 'PARTIAL_TP_ACTIVATION', 1.0)
-        
-        if profit_pct >= activation:
+        if profit_pct >= self.partial_tp_activation:
             try:
                 # Calculate partial quantity (50%)
-                partial_pct = getattr(config, 'PARTIAL_TP_PERCENT', 50) / 100
-                partial_qty = self.client.round_quantity(symbol, data['quantity'] * partial_pct)
+                partial_pct = self.partial_tp_fraction
+                partial_qty = self.client.round_quantity(symbol, data.quantity * partial_pct)
                 
                 if partial_qty > 0:
-                    # Close partial position
-                    close_side = 'SELL' if data['side'] == 'BUY' else 'BUY'
-                    self.client.place_market_order(symbol, close_side, partial_qty)
+                    # Close partial position (batched)
+                    close_side = 'SELL' if data.side == 'BUY' else 'BUY'
+                    order = self.batcher.submit_market_order(symbol, close_side, partial_qty)
                     
-                    # Update tracking
-                    data['partial_tp_done'] = True
-                    data['quantity'] -= partial_qty
+                    # Update tracking now so the next tick doesn't resubmit
+                    data.partial_tp_done = True
+                    data.quantity -= partial_qty
                     
-                    logger.info(f"💰 Partial TP: Closed {partial_pct*100}% of {symbol} at {profit_pct:.2f}% profit")
+                    order.add_done_callback(
+                        lambda f: self._on_partial_tp_done(f, symbol, data, partial_qty, partial_pct, profit_pct)
+                    )
                     return True
             except Exception as e:
                 logger.debug(f"Partial TP failed for {symbol}: {e}")
         
         return False
     
+    def _on_partial_tp_done(self, future, symbol: str, data: TrackedPosition, partial_qty: float,
+                            partial_pct: float, profit_pct: float):
+        """Log a batched partial TP, rolling tracking back if it failed"""
+        error = future.exception()
+        if error:
+            data.partial_tp_done = False
+            data.quantity += partial_qty
+            logger.debug(f"Partial TP failed for {symbol}: {error}")
+            return
+        
+        logger.info(f"💰 Partial TP: Closed {partial_pct*100}% of {symbol} at {profit_pct:.2f}% profit")
+    
+    def _restore_stop(self, symbol: str, side: str, quantity: float, stop_price: float):
+        """Re-place the cancelled stop after its replacement was rejected"""
+        try:
+            order = self.client.place_stop_loss(
+                symbol=symbol,
+                side=side,
+                quantity=quantity,
+                stop_price=stop_price
+            )
+        except Exception as e:
+            logger.error(f"🚨 {symbol} has no stop loss - could not restore {stop_price:.4f}: {e}")
+            return
+        
+        with self._lock:
+            if symbol in self.position_data:
+                self._stop_orders[symbol] = order
+        logger.info(f"↩️ Stop restored: {symbol} → {stop_price:.4f}")
+    
     def calculate_new_trailing_stop(self, symbol: str, current_price: float) -> Optional[float]:
         """Calculate new trailing stop price if needed"""
-        if not config.TRAILING_STOP_ENABLED:
+        if not self.trailing_enabled:
             return None
         
         if symbol not in self.position_data:
             return None
         
         data = self.position_data[symbol]
-        profit_pct = self.calculate_profit_percent(symbol, current_price)
+        new_stop, profit_pct = _trailing_kernel(
+            data.sign, data.entry_price, data.highest, data.lowest, current_price,
+            self.trailing_activation, self.trailing_callback
+        )
         
-        # Check if profit threshold is met for trailing activation
-        if profit_pct < config.TRAILING_STOP_ACTIVATION:
+        # NaN when the profit threshold for trailing activation isn't met
+        if new_stop != new_stop:
             return None
         
         # Mark trailing as active
-        if not data['trailing_active']:
-            data['trailing_active'] = True
+        if not data.trailing_active:
+            data.trailing_active = True
             logger.info(f"📈 Trailing activated for {symbol} at {profit_pct:.2f}% profit")
         
-        # Calculate new stop price
-        callback_pct = config.TRAILING_STOP_CALLBACK / 100
-        
-        if data['side'] == 'BUY':
-            # For long, trail below highest price
-            new_stop = data['highest'] * (1 - callback_pct)
-            # Round to symbol precision
-            new_stop = self.client.round_price(symbol, new_stop)
-        else:  # SELL
-            # For short, trail above lowest price
-            new_stop = data['lowest'] * (1 + callback_pct)
-            new_stop = self.client.round_price(symbol, new_stop)
-        
-        return new_stop
+        # Round to symbol precision
+        return self.client.round_price(symbol, new_stop)
     
     def update_trailing_stops(self, positions: List[Dict]) -> int:
         """
@@ -184,84 +313,274 @@ class PositionMonitor:
         Returns:
             Number of stops updated
         """
-        # Update tracking data
-        self.update_position_tracking(positions)
+        with self._lock:
+            # Update tracking data (also parses each open position once)
+            open_positions = self.update_position_tracking(positions)
+            
+            updated_count = 0
+            stop_by_symbol = None  # First STOP_MARKET per symbol, fetched once on first need
+            
+            activation = self._min_stop_activation()
+            if activation is None or not open_positions:
+                return updated_count
+            
+            # Screen every position at once; only those past activation need stop logic
+            symbols = list(open_positions)
+            mark_prices = np.fromiter(
+                (open_positions[s]['mark_price'] for s in symbols), dtype=np.float64, count=len(symbols)
+            )
+            profits = self.compute_all_profits(symbols, mark_prices)
+            candidates = [s for s, active in zip(symbols, profits >= activation) if active]
+            
+            for symbol in candidates:
+                try:
+                    if stop_by_symbol is None:
+                        stop_by_symbol = self._index_stop_orders(self.client.get_open_orders())
+                    
+                    stop_order = stop_by_symbol.get(symbol)
+                    if stop_order is None:
+                        continue
+                    
+                    if self._move_stop(symbol, open_positions[symbol]['mark_price'], stop_order):
+                        updated_count += 1
+                        
+                except Exception as e:
+                    logger.debug(f"Error updating trailing stop for {symbol}: {e}")
+            
+            return updated_count
+    
+    @staticmethod
+    def _index_stop_orders(orders: List[Dict]) -> Dict[str, Dict]:
+        """Map symbol -> first open STOP_MARKET order in one pass"""
+        stop_by_symbol = {}
+        for order in orders:
+            if order.get('type') == 'STOP_MARKET' and order['symbol'] not in stop_by_symbol:
+                stop_by_symbol[order['symbol']] = order
+        return stop_by_symbol
+    
+    def _move_stop(self, symbol: str, current_price: float, stop_order: Dict) -> bool:
+        """
+        Move a position's stop to break-even or the trailing level if that is better
         
-        updated_count = 0
+        Args:
+            symbol: Tracked symbol
+            current_price: Current mark price
+            stop_order: The symbol's open STOP_MARKET order
         
-        for pos in positions:
-            symbol = pos['symbol']
-            position_amt = float(pos.get('positionAmt', 0))
+        Returns:
+            True if a replacement stop was placed
+        """
+        plan = self._plan_stop(symbol, current_price, stop_order)
+        if plan is None:
+            return False
+        return self._replace_stop(symbol, stop_order, *plan)
+    
+    def _plan_stop(self, symbol: str, current_price: float,
+                   stop_order: Dict) -> Optional[Tuple[float, bool]]:
+        """
+        Pick a better stop for a position (no orders are sent)
+        
+        Returns:
+            (new stop price, is break-even) or None to leave the stop alone
+        """
+        # First check for break-even
+        new_stop = self.calculate_breakeven_stop(symbol, current_price)
+        is_breakeven = new_stop is not None
+        
+        # If no break-even, check for trailing
+        if new_stop is None and self.trailing_enabled:
+            new_stop = self.calculate_new_trailing_stop(symbol, current_price)
+        
+        if new_stop is None:
+            return None
+        
+        current_stop = float(stop_order.get('stopPrice', 0))
+        data = self.position_data[symbol]
+        
+        # Only update if new stop is better
+        if data.side == 'BUY' and new_stop <= current_stop:
+            return None
+        if data.side == 'SELL' and new_stop >= current_stop:
+            return None
+        
+        return new_stop, is_breakeven
+    
+    def _replace_stop(self, symbol: str, stop_order: Dict, new_stop: float,
+                      is_breakeven: bool) -> bool:
+        """
+        Cancel the old stop and place one at new_stop (blocking REST calls)
+        
+        Returns:
+            True if the new stop was placed
+        """
+        data = self.position_data.get(symbol)
+        if data is None:
+            return False
+        current_stop = float(stop_order.get('stopPrice', 0))
+        stop_side = 'SELL' if data.side == 'BUY' else 'BUY'
+        
+        # Cancel only the old stop (keeps the TP order in place).
+        # STOP_MARKET can't be modified in place on Binance Futures.
+        try:
+            self.client.cancel_order(symbol, stop_order['orderId'])
+        except Exception as e:
+            if '-2011' in str(e):  # Unknown order - stop already triggered
+                logger.debug(f"Stop for {symbol} no longer open, skipping update")
+                with self._lock:
+                    self._stop_orders.pop(symbol, None)
+                return False
+            raise
+        with self._lock:
+            self._stop_orders.pop(symbol, None)
+        
+        # Place the new stop now - the position is unprotected until it lands.
+        # Single-order endpoint: batchOrders doesn't take closePosition.
+        try:
+            order = self.client.place_stop_loss(
+                symbol=symbol,
+                side=stop_side,
+                quantity=data.quantity,
+                stop_price=new_stop
+            )
+        except Exception as e:
+            logger.warning(f"Failed to place new stop for {symbol}: {e}")
+            self._restore_stop(symbol, stop_side, data.quantity, current_stop)
+            return False
+        
+        # Keep the stream path pointed at the live stop
+        with self._lock:
+            if symbol in self.position_data:
+                self._stop_orders[symbol] = order
+        
+        if is_breakeven:
+            data.breakeven_set = True
+            logger.info(f"🛡️ Break-even SL set: {symbol} → {new_stop:.4f}")
+        else:
+            logger.info(f"🔄 Trailing SL updated: {symbol} {current_stop:.4f} → {new_stop:.4f}")
+        return True
+    
+    # =========================================================================
+    # Event-driven mode (mark price stream)
+    # =========================================================================
+    
+    def start_stream(self) -> bool:
+        """
+        Evaluate stops on mark price pushes instead of per-scan polling
+        
+        Returns:
+            True if the stream is running
+        """
+        if not getattr(config, 'MARK_PRICE_STREAM_ENABLED', False):
+            return False
+        
+        self.stream = MarkPriceStream(self.on_mark_price)
+        if not self.stream.start():
+            self.stream = None
+            return False
+        
+        self.stream.set_symbols(self.position_data)
+        return True
+    
+    def stop_stream(self):
+        """Stop the mark price stream"""
+        if self.stream:
+            self.stream.stop()
+            self.stream = None
+    
+    @property
+    def stream_active(self) -> bool:
+        return self.stream is not None
+    
+    def sync_positions(self, positions: List[Dict]):
+        """
+        Sync tracked positions and streamed symbols with the account (stream mode)
+        
+        Stop orders are re-read only while a tracked position has no known stop
+        (new position, or its protective orders were still being placed).
+        """
+        with self._lock:
+            self.update_position_tracking(positions)
+            tracked = self.position_data.keys()
             
-            if position_amt == 0 or symbol not in self.position_data:
-                continue
+            for symbol in self._stop_orders.keys() - tracked:
+                del self._stop_orders[symbol]
+            for symbol in self._last_move.keys() - tracked:
+                del self._last_move[symbol]
             
-            current_price = float(pos.get('markPrice', 0))
+            missing = tracked - self._stop_orders.keys()
+            if missing:
+                try:
+                    stop_by_symbol = self._index_stop_orders(self.client.get_open_orders())
+                    for symbol in missing & stop_by_symbol.keys():
+                        self._stop_orders[symbol] = stop_by_symbol[symbol]
+                except Exception as e:
+                    logger.debug(f"Error loading stop orders: {e}")
+        
+        if self.stream:
+            self.stream.set_symbols(tracked)
+    
+    def on_mark_price(self, symbol: str, mark_price: float):
+        """
+        Handle one mark price update from the stream
+        
+        Only tracking and the stop decision happen here, under the lock; the
+        cancel / re-place runs on the stop pool so the socket thread never blocks.
+        """
+        with self._lock:
+            data = self.position_data.get(symbol)
+            if data is None or mark_price <= 0:
+                return
             
-            # First check for break-even
-            new_stop = self.calculate_breakeven_stop(symbol, current_price)
-            is_breakeven = new_stop is not None
+            if mark_price > data.highest:
+                data.highest = mark_price
+            elif mark_price < data.lowest:
+                data.lowest = mark_price
             
-            # If no break-even, check for trailing
-            if new_stop is None and config.TRAILING_STOP_ENABLED:
-                new_stop = self.calculate_new_trailing_stop(symbol, current_price)
+            self.check_partial_take_profit(symbol, mark_price)
             
-            if new_stop is None:
-                continue
+            stop_order = self._stop_orders.get(symbol)
+            if stop_order is None or symbol in self._moving:
+                return
             
-            # Get current stop orders
             try:
-                open_orders = self.client.get_open_orders(symbol)
-                stop_orders = [o for o in open_orders if o.get('type') == 'STOP_MARKET']
-                
-                if not stop_orders:
-                    continue
-                
-                current_stop = float(stop_orders[0].get('stopPrice', 0))
-                data = self.position_data[symbol]
-                
-                # Only update if new stop is better
-                should_update = False
-                if data['side'] == 'BUY' and new_stop > current_stop:
-                    should_update = True
-                elif data['side'] == 'SELL' and new_stop < current_stop:
-                    should_update = True
-                
-                if should_update:
-                    # Cancel old stop and place new one
-                    quantity = data['quantity']
-                    stop_side = 'SELL' if data['side'] == 'BUY' else 'BUY'
-                    
-                    # Cancel existing stop orders
-                    self.client.cancel_all_orders(symbol)
-                    
-                    # Place new stop
-                    self.client.place_stop_loss(
-                        symbol=symbol,
-                        side=stop_side,
-                        quantity=quantity,
-                        stop_price=new_stop
-                    )
-                    
-                    if is_breakeven:
-                        data['breakeven_set'] = True
-                        logger.info(f"🛡️ Break-even SL set: {symbol} → {new_stop:.4f}")
-                    else:
-                        logger.info(f"🔄 Trailing SL updated: {symbol} {current_stop:.4f} → {new_stop:.4f}")
-                    updated_count += 1
-                    
+                plan = self._plan_stop(symbol, mark_price, stop_order)
             except Exception as e:
                 logger.debug(f"Error updating trailing stop for {symbol}: {e}")
+                return
+            if plan is None:
+                return
+            
+            # At most one replacement per interval - each leaves a short unprotected gap
+            now = time.monotonic()
+            if now - self._last_move.get(symbol, float('-inf')) < self.stop_update_interval:
+                return
+            self._last_move[symbol] = now
+            self._moving.add(symbol)
         
-        return updated_count
+        self._stop_pool.submit(self._replace_stop_worker, symbol, stop_order, *plan)
+    
+    def _replace_stop_worker(self, symbol: str, stop_order: Dict, new_stop: float,
+                             is_breakeven: bool):
+        """Stream mode: replace one stop on the stop pool"""
+        try:
+            self._replace_stop(symbol, stop_order, new_stop, is_breakeven)
+        except Exception as e:
+            logger.debug(f"Error updating trailing stop for {symbol}: {e}")
+        finally:
+            with self._lock:
+                self._moving.discard(symbol)
     
     def get_tracking_info(self) -> Dict:
-        """Get current tracking information"""
+        """Get current tracking information (positions is a live read-only view)"""
         return {
             'tracked_positions': len(self.position_data),
-            'trailing_active': sum(1 for d in self.position_data.values() if d.get('trailing_active')),
-            'positions': self.position_data.copy()
+            'trailing_active': sum(1 for d in self.position_data.values() if d.trailing_active),
+            'positions': MappingProxyType(self.position_data)
         }
+    
+    def snapshot(self) -> Dict:
+        """Get an independent deep copy of the tracked position data"""
+        return copy.deepcopy(self.position_data)
 
 
 # Test when run directly
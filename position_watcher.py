@@ -3,11 +3,19 @@ Position Watcher - 24/7 monitoring of Martingale positions
 """
 
 import time
-from typing import Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
 from datetime import datetime
+import numpy as np
+from indicators import klines_to_ohlcv, volume_window_means, OPEN, HIGH, LOW, CLOSE
 from logger import logger
 import config
 
+# Take-profit target ($) by step; steps past the end use the last entry
+_TP_TARGETS = np.array([3, 3, 4, 6, 8, 10, 12, 12, 20], dtype=np.float64)
+_TRAILING_CALLBACK = 0.30  # Close if profit drops 30% from max
+_KLINE_LIMIT = 50  # 5m candles fetched per entry check
+
 
 class PositionWatcher:
     """
@@ -26,6 +34,13 @@ class PositionWatcher:
         
         # Take profit settings
         self.take_profit_percent = getattr(config, 'MARTINGALE_TP_PERCENT', 1.5)
+        self._blacklist = frozenset(getattr(config, 'BLACKLIST', []))
+        
+        # Per-symbol REST calls are I/O bound - fan them out
+        self._price_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="watcher")
+        
+        # Reused OHLCV buffer - entry checks run one at a time and keep no reference
+        self._ohlcv_buf = np.empty((_KLINE_LIMIT, 6), dtype=np.float64)
         
         logger.info("👁️ Position Watcher initialized")
     
@@ -43,10 +58,22 @@ class PositionWatcher:
             'emergency_closed': []
         }
         
-        # Get blacklist from config
-        blacklist = getattr(config, 'BLACKLIST', [])
+        blacklist = self._blacklist
+        
+        positions = self.martingale.snapshot_positions()
+        
+        # Fetch all mark prices concurrently up front
+        prices = self._fetch_mark_prices([s for s, _ in positions if s not in blacklist])
+        
+        # Trailing TP for every position in one vectorized pass
+        price_arr = np.fromiter((prices.get(s, 0) for s, _ in positions),
+                                dtype=np.float64, count=len(positions))
+        tp = self.martingale.batch_check_tp(price_arr, _TP_TARGETS, _TRAILING_CALLBACK)
         
-        for symbol, position in list(self.martingale.positions.items()):
+        # Steps due this cycle - klines fetched concurrently, confirmed after the loop
+        pending_steps = []
+        
+        for i, (symbol, position) in enumerate(positions):
             try:
                 # Skip blacklisted symbols - they cause API errors
                 if symbol in blacklist:
@@ -54,11 +81,7 @@ class PositionWatcher:
                     continue
                 
                 # Get current price
-                ticker = self.client.get_mark_price(symbol)
-                if not ticker:
-                    continue
-                
-                current_price = float(ticker.get('markPrice', 0))
+                current_price = prices.get(symbol, 0)
                 if current_price <= 0:
                     continue
                 
@@ -69,7 +92,7 @@ class PositionWatcher:
                     # NO AUTO CLOSE - just warning, user will decide
                 
                 # 2. Check take profit
-                tp_check = self._check_take_profit(position, current_price)
+                tp_check = self._check_take_profit(position, tp, i)
                 if tp_check.get('should_close'):
                     logger.info(f"🎯 Take Profit: {tp_check['reason']}")
                     if self.martingale.close_position(symbol, current_price, "Take Profit"):
@@ -106,18 +129,61 @@ class PositionWatcher:
                 step_check = self.martingale.should_add_step(symbol, current_price)
                 if step_check.get('should_add'):
                     # Get fresh data for entry confirmation
-                    if self._confirm_step_entry(symbol, current_price, position.step + 1):
-                        if self.martingale.add_step(symbol, current_price):
-                            actions['steps_added'].append(symbol)
+                    klines_future = self._price_pool.submit(
+                        self.client.get_klines, symbol, '5m', _KLINE_LIMIT
+                    )
+                    pending_steps.append((symbol, current_price, position.step + 1, klines_future))
                 
             except Exception as e:
                 logger.error(f"Position check failed for {symbol}: {e}")
         
+        for symbol, current_price, step_num, klines_future in pending_steps:
+            try:
+                if self._confirm_step_entry(symbol, current_price, step_num, klines_future):
+                    if self.martingale.add_step(symbol, current_price):
+                        actions['steps_added'].append(symbol)
+            except Exception as e:
+                logger.error(f"Position check failed for {symbol}: {e}")
+        
         return actions
     
-    def _check_take_profit(self, position, current_price: float) -> Dict:
+    def _fetch_mark_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Fetch mark prices for several symbols
+        
+        One premiumIndex call covers the whole market; per-symbol requests
+        (in parallel) are only the fallback if that call fails.
+        
+        Returns:
+            Dict of symbol -> mark price (0 if the fetch failed)
+        """
+        if not symbols:
+            return {}
+        
+        try:
+            all_prices = self.client.get_all_mark_prices()
+            return {s: all_prices.get(s, 0) for s in symbols}
+        except Exception as e:
+            logger.debug(f"Batch mark price fetch failed, falling back to per-symbol: {e}")
+        
+        futures = {s: self._price_pool.submit(self.client.get_mark_price, s) for s in symbols}
+        
+        prices = {}
+        for symbol, future in futures.items():
+            try:
+                ticker = future.result()
+                prices[symbol] = float(ticker.get('markPrice', 0)) if ticker else 0
+            except Exception as e:
+                logger.debug(f"Mark price fetch failed for {symbol}: {e}")
+                prices[symbol] = 0
+        return prices
+    
+    def _check_take_profit(self, position, tp: Dict, i: int) -> Dict:
         """
-        Check if position should take profit with TRAILING TP
+        Report the TRAILING TP decision for one position
+        
+        The numbers come from MartingaleManager.batch_check_tp (row i of `tp`);
+        this only logs state changes and builds the per-position result.
         
         Dynamic TP based on step level:
         - Step 1: $3 profit
@@ -133,132 +199,98 @@ class PositionWatcher:
         - Tracks max profit
         - Closes when profit drops 30% from max
         """
-        # Calculate actual P&L in USD
-        pnl_usd = (position.average_entry - current_price) * position.total_quantity
-        
-        # Dynamic TP target based on step
-        step = position.step
-        if step <= 1:
-            tp_target = 3
-        elif step == 2:
-            tp_target = 4
-        elif step == 3:
-            tp_target = 6
-        elif step == 4:
-            tp_target = 8
-        elif step == 5:
-            tp_target = 10
-        elif step <= 7:
-            tp_target = 12
-        else:  # step 8+
-            tp_target = 20
-        
-        # TRAILING TP LOGIC
-        trailing_callback = 0.30  # Close if profit drops 30% from max
-        
-        # If profit exceeds target, activate trailing mode
+        pnl_usd = tp['pnl_usd'][i]
+        tp_target = tp['tp_target'][i]
+        max_profit = tp['max_profit'][i]
+        
+        if tp['activated'][i]:
+            logger.info(f"🎯 {position.symbol}: Trailing TP activated at ${pnl_usd:.2f}")
+        elif tp['new_max'][i]:
+            logger.debug(f"📈 {position.symbol}: New max profit ${pnl_usd:.2f}")
+        
+        if tp['should_close'][i]:
+            return {
+                'should_close': True,
+                'reason': f'Trailing TP hit (${pnl_usd:.2f}, max was ${max_profit:.2f})',
+                'pnl_usd': pnl_usd,
+                'tp_target': tp_target,
+                'max_profit': max_profit
+            }
+        
         if pnl_usd >= tp_target:
-            # Activate trailing if not already
-            if not position.trailing_tp_active:
-                position.trailing_tp_active = True
-                position.max_profit_usd = pnl_usd
-                logger.info(f"🎯 {position.symbol}: Trailing TP activated at ${pnl_usd:.2f}")
-            
-            # Update max profit if current is higher
-            if pnl_usd > position.max_profit_usd:
-                position.max_profit_usd = pnl_usd
-                logger.debug(f"📈 {position.symbol}: New max profit ${pnl_usd:.2f}")
-            
-            # Check if profit dropped from max (trailing callback)
-            profit_drop_percent = (position.max_profit_usd - pnl_usd) / position.max_profit_usd if position.max_profit_usd > 0 else 0
-            
-            if profit_drop_percent >= trailing_callback:
-                return {
-                    'should_close': True,
-                    'reason': f'Trailing TP hit (${pnl_usd:.2f}, max was ${position.max_profit_usd:.2f})',
-                    'pnl_usd': pnl_usd,
-                    'tp_target': tp_target,
-                    'max_profit': position.max_profit_usd
-                }
-            
             # Still above target, trail further
             return {
                 'should_close': False, 
                 'pnl_usd': pnl_usd, 
                 'tp_target': tp_target,
                 'trailing': True,
-                'max_profit': position.max_profit_usd
+                'max_profit': max_profit
             }
         
-        # Reset trailing if profit dropped below target
-        if position.trailing_tp_active and pnl_usd < tp_target * 0.5:
-            position.trailing_tp_active = False
-            position.max_profit_usd = 0
-        
         return {'should_close': False, 'pnl_usd': pnl_usd, 'tp_target': tp_target}
     
-    def _confirm_step_entry(self, symbol: str, current_price: float, step_num: int) -> bool:
+    def _confirm_step_entry(self, symbol: str, current_price: float, step_num: int,
+                            klines_future: Future = None) -> bool:
         """
         Confirm that it's a good time to add a step
         
         Steps 1-3: Quick entry (distance-based only)
         Steps 4+: Eagle-eye mode - wait for strong reversal signals
+        
+        Args:
+            klines_future: Already-submitted get_klines call (fetched here if None)
         """
         try:
             # Get klines for analysis
-            klines = self.client.get_klines(symbol, '5m', 50)
+            if klines_future is not None:
+                klines = klines_future.result()
+            else:
+                klines = self.client.get_klines(symbol, '5m', _KLINE_LIMIT)
             if not klines:
                 return step_num <= 3  # Allow early steps without data
             
-            import pandas as pd
-            columns = ['open_time', 'open', 'high', 'low', 'close', 'volume', 
-                      'close_time', 'quote_volume', 'trades', 'taker_buy_volume', 
-                      'taker_buy_quote_volume', 'ignore']
-            df = pd.DataFrame(klines, columns=columns)
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = df[col].astype(float)
+            ohlcv = klines_to_ohlcv(klines, self._ohlcv_buf)
             
             # Steps 1-3: Less strict, just check RSI
             if step_num <= 3:
-                entry = self.pump_detector.is_entry_ready(symbol, df)
+                entry = self.pump_detector.is_entry_ready(symbol, ohlcv)
                 return True  # Always allow if distance ok
             
             # 🦅 EAGLE-EYE MODE for Steps 4+ 🦅
             logger.info(f"🦅 Eagle-eye analysis for Step {step_num}...")
             
             # Get last candles
-            last = df.iloc[-1]
-            prev = df.iloc[-2]
+            o, h, l, c = ohlcv[-1, OPEN], ohlcv[-1, HIGH], ohlcv[-1, LOW], ohlcv[-1, CLOSE]
+            prev_o, prev_c = ohlcv[-2, OPEN], ohlcv[-2, CLOSE]
             
             # 1. Check for PIN BAR (long upper wick = buyers exhausted)
-            body = abs(last['close'] - last['open'])
-            upper_wick = last['high'] - max(last['close'], last['open'])
-            lower_wick = min(last['close'], last['open']) - last['low']
-            total_range = last['high'] - last['low']
+            body = abs(c - o)
+            upper_wick = h - max(c, o)
+            lower_wick = min(c, o) - l
+            total_range = h - l
             
             has_pin_bar = upper_wick > body * 2 and upper_wick > total_range * 0.5
             if has_pin_bar:
                 logger.info(f"   ✅ Pin Bar detected! Upper wick = {upper_wick:.6f}")
             
             # 2. Check for VOLUME EXHAUSTION (volume decreasing)
-            recent_vol = df['volume'].tail(3).mean()
-            prev_vol = df['volume'].tail(10).head(7).mean()
+            recent_vol, prev_vol = volume_window_means(ohlcv)
             volume_exhaustion = recent_vol < prev_vol * 0.7  # 30% drop
             if volume_exhaustion:
                 logger.info(f"   ✅ Volume exhaustion! {recent_vol:.0f} < {prev_vol:.0f}")
             
             # 3. Check for BEARISH ENGULFING
             bearish_engulf = (
-                last['close'] < last['open'] and  # Red candle
-                prev['close'] > prev['open'] and  # Previous green
-                last['open'] > prev['close'] and  # Opens above
-                last['close'] < prev['open']       # Closes below
+                c < o and  # Red candle
+                prev_c > prev_o and  # Previous green
+                o > prev_c and  # Opens above
+                c < prev_o  # Closes below
             )
             if bearish_engulf:
                 logger.info(f"   ✅ Bearish Engulfing pattern!")
             
             # 4. Check RSI still high
-            rsi = self.pump_detector.get_rsi(df)
+            rsi = self.pump_detector.get_rsi(ohlcv, symbol)
             rsi_high = rsi > 65
             if rsi_high:
                 logger.info(f"   ✅ RSI still overbought: {rsi:.1f}")
@@ -310,29 +342,26 @@ class PositionWatcher:
         # Refresh pumped coins list
         pumped = self.pump_detector.find_pumped_coins()
         
-        for coin in pumped[:10]:  # Check top 10 pumped
+        # Check top 10 pumped, skipping ones we already hold
+        candidates = [c for c in pumped[:10] if not self.martingale.has_position(c['symbol'])]
+        
+        # Fetch klines for all candidates concurrently
+        kline_futures = {
+            c['symbol']: self._price_pool.submit(self.client.get_klines, c['symbol'], '5m', _KLINE_LIMIT)
+            for c in candidates
+        }
+        
+        for coin in candidates:
             symbol = coin['symbol']
             
-            # Skip if already have position
-            if self.martingale.has_position(symbol):
-                continue
-            
             try:
                 # Get klines for entry check
-                klines = self.client.get_klines(symbol, '5m', 50)
+                klines = kline_futures[symbol].result()
                 if not klines:
                     continue
                 
-                import pandas as pd
-                columns = ['open_time', 'open', 'high', 'low', 'close', 'volume', 
-                          'close_time', 'quote_volume', 'trades', 'taker_buy_volume', 
-                          'taker_buy_quote_volume', 'ignore']
-                df = pd.DataFrame(klines, columns=columns)
-                for col in ['open', 'high', 'low', 'close', 'volume']:
-                    df[col] = df[col].astype(float)
-                
                 # Check entry conditions
-                entry = self.pump_detector.is_entry_ready(symbol, df)
+                entry = self.pump_detector.is_entry_ready(symbol, klines_to_ohlcv(klines, self._ohlcv_buf))
                 
                 if entry['ready']:
                     opportunities.append({
@@ -360,10 +389,11 @@ class PositionWatcher:
         
         logger.info(f"📊 Martingale Status: {status['active_positions']} positions")
         
+        prices = self._fetch_mark_prices(list(status['positions']))
+        
         for symbol, pos in status['positions'].items():
             try:
-                ticker = self.client.get_mark_price(symbol)
-                current_price = float(ticker.get('markPrice', 0)) if ticker else 0
+                current_price = prices.get(symbol, 0)
                 
                 # Calculate unrealized P&L
                 position = self.martingale.get_position(symbol)
@@ -3,7 +3,14 @@ Pump Detector - Find coins that pumped >30% for counter-trend trading
 """
 
 import time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from binance_client import SPECIAL_PAIR
+from indicators import (
+    calculate_rsi, klines_to_ohlcv, volume_window_means, OPEN, HIGH, LOW, CLOSE, OPEN_TIME
+)
 from logger import logger
 import config
 
@@ -14,22 +21,40 @@ class PumpDetector:
     def __init__(self, client):
         self.client = client
         self.min_pump_percent = getattr(config, 'MARTINGALE_MIN_PUMP', 30)
+        self.min_volume = getattr(config, 'MIN_24H_VOLUME_USDT', 500000)  # $500K default
         self.last_scan = 0
         self.pumped_coins = []
+        self._pumped_by_symbol: Dict[str, Dict] = {}
+        self._blacklist = frozenset(getattr(config, 'BLACKLIST', []))
+        self._cache_ttl = getattr(config, 'PUMP_CACHE_TTL', 30)  # seconds
+        
+        # Streaming RSI: symbol -> (open_time, close, avg_gain, avg_loss) of the
+        # last closed candle, so each call only folds in the newest candles
+        self.rsi_period = getattr(config, 'RSI_PERIOD', 14)
+        self._rsi_state: Dict[str, Tuple[float, float, float, float]] = {}
+        
+        # Same idea for the 1h trend check: RSI(14) state and EMA 9/21 state
+        # as (open_time, num_9, den_9, num_21, den_21) of pandas' adjusted ewm
+        self._rsi_1h_state: Dict[str, Tuple[float, float, float, float]] = {}
+        self._ema_1h_state: Dict[str, Tuple[float, float, float, float, float]] = {}
         
     def find_pumped_coins(self) -> List[Dict]:
         """
         Find coins with significant pump in 24h
         
+        Results are reused for PUMP_CACHE_TTL seconds (24h changes move slowly).
+        
         Returns:
             List of dicts with symbol, pump_percent, price info
         """
+        if self.pumped_coins and time.time() - self.last_scan < self._cache_ttl:
+            return self.pumped_coins
+        
         try:
             tickers = self.client.get_ticker_24h()
             
-            # Get blacklist and volume settings
-            blacklist = getattr(config, 'BLACKLIST', [])
-            min_volume = getattr(config, 'MIN_24H_VOLUME_USDT', 500000)  # $500K default
+            blacklist = self._blacklist
+            min_volume = self.min_volume
             
             pumped = []
             filtered_low_volume = 0
@@ -43,7 +68,7 @@ class PumpDetector:
                     continue
                     
                 # Skip special pairs
-                if any(x in symbol for x in ['_', 'DEFI', 'INDEX']):
+                if SPECIAL_PAIR.search(symbol):
                     continue
                 
                 # Skip blacklisted symbols
@@ -76,6 +101,7 @@ class PumpDetector:
             pumped.sort(key=lambda x: x['pump_percent'], reverse=True)
             
             self.pumped_coins = pumped
+            self._pumped_by_symbol = {c['symbol']: c for c in pumped}
             self.last_scan = time.time()
             
             if pumped:
@@ -91,16 +117,109 @@ class PumpDetector:
             logger.error(f"Pump detection failed: {e}")
             return []
     
-    def get_rsi(self, df) -> float:
-        """Calculate current RSI from dataframe"""
+    def get_rsi(self, ohlcv: np.ndarray, symbol: str = None) -> float:
+        """
+        Calculate current RSI from an OHLCV array (see klines_to_ohlcv)
+        
+        With a symbol, smoothing state is kept between calls and only candles
+        closed since the last call are folded in (same EMA as calculate_rsi).
+        """
         try:
-            from indicators import calculate_rsi
-            rsi = calculate_rsi(df['close'], getattr(config, 'RSI_PERIOD', 14))
-            return float(rsi.iloc[-1])
+            if symbol is None or len(ohlcv) < 3:
+                rsi = calculate_rsi(ohlcv[:, CLOSE], self.rsi_period)
+                return float(rsi.iloc[-1])
+            
+            return self._stream_rsi(ohlcv, symbol, self.rsi_period, self._rsi_state)
         except:
             return 50
     
-    def is_entry_ready(self, symbol: str, df) -> Dict:
+    @staticmethod
+    def _fold_start(open_times: np.ndarray, state: Optional[tuple]) -> int:
+        """
+        Index of the first closed candle a saved streaming state has not seen
+        
+        State tuples start with the open time of the last candle folded in.
+        Returns 0 when there is no usable state (caller re-seeds from candle 0).
+        """
+        if state is None:
+            return 0
+        
+        interval = open_times[-1] - open_times[-2]
+        if interval <= 0:
+            return 0
+        
+        new_closed = int(round((open_times[-2] - state[0]) / interval))
+        if 0 <= new_closed < len(open_times) - 1:
+            return len(open_times) - 1 - new_closed
+        return 0
+    
+    def _stream_rsi(self, ohlcv: np.ndarray, symbol: str, period: int, states: Dict) -> float:
+        """Streaming RSI: fold newly closed candles into states[symbol] (needs >= 3 candles)"""
+        closes = ohlcv[:, CLOSE]
+        open_times = ohlcv[:, OPEN_TIME]
+        alpha = 2 / (period + 1)
+        
+        state = states.get(symbol)
+        start = self._fold_start(open_times, state)
+        if start:
+            _, last_close, avg_gain, avg_loss = state
+        else:
+            # Seed like calculate_rsi: first delta counts as 0 gain/loss
+            last_close, avg_gain, avg_loss = closes[0], 0.0, 0.0
+            start = 1
+        
+        # Fold in closed candles (everything except the forming one)
+        for close in closes[start:-1]:
+            delta = close - last_close
+            avg_gain += alpha * ((delta if delta > 0 else 0.0) - avg_gain)
+            avg_loss += alpha * ((-delta if delta < 0 else 0.0) - avg_loss)
+            last_close = close
+        states[symbol] = (open_times[-2], last_close, avg_gain, avg_loss)
+        
+        # Forming candle - applied but not saved (its close still moves)
+        delta = closes[-1] - last_close
+        avg_gain += alpha * ((delta if delta > 0 else 0.0) - avg_gain)
+        avg_loss += alpha * ((-delta if delta < 0 else 0.0) - avg_loss)
+        
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else float('nan')
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+    
+    def _stream_ema_9_21(self, ohlcv: np.ndarray, symbol: str) -> Tuple[float, float]:
+        """
+        Streaming EMA 9 and EMA 21 of closes (pandas ewm(span).mean(), adjust=True)
+        
+        Keeps the weighted sum and weight total per span, so each call only
+        folds in candles closed since the last one.
+        """
+        closes = ohlcv[:, CLOSE]
+        open_times = ohlcv[:, OPEN_TIME]
+        decay_9 = 1 - 2 / (9 + 1)
+        decay_21 = 1 - 2 / (21 + 1)
+        
+        state = self._ema_1h_state.get(symbol)
+        start = self._fold_start(open_times, state)
+        if start:
+            _, num_9, den_9, num_21, den_21 = state
+        else:
+            num_9 = num_21 = closes[0]
+            den_9 = den_21 = 1.0
+            start = 1
+        
+        for close in closes[start:-1]:
+            num_9 = close + decay_9 * num_9
+            den_9 = 1.0 + decay_9 * den_9
+            num_21 = close + decay_21 * num_21
+            den_21 = 1.0 + decay_21 * den_21
+        self._ema_1h_state[symbol] = (open_times[-2], num_9, den_9, num_21, den_21)
+        
+        close = closes[-1]
+        return (
+            (close + decay_9 * num_9) / (1.0 + decay_9 * den_9),
+            (close + decay_21 * num_21) / (1.0 + decay_21 * den_21)
+        )
+    
+    def is_entry_ready(self, symbol: str, ohlcv: np.ndarray) -> Dict:
         """
         Check if a pumped coin is ready for SHORT entry
         
@@ -109,11 +228,15 @@ class PumpDetector:
         - OR RSI divergence (price up, RSI down)
         - OR candlestick reversal pattern
         
+        Args:
+            symbol: Trading pair
+            ohlcv: OHLCV array from klines_to_ohlcv
+        
         Returns:
             Dict with ready: bool, reason: str, rsi: float
         """
         try:
-            rsi = self.get_rsi(df)
+            rsi = self.get_rsi(ohlcv, symbol)
             
             # Condition 1: Extreme overbought
             if rsi > 75:
@@ -127,8 +250,7 @@ class PumpDetector:
             # Condition 2: Near overbought with volume decline
             if rsi > 65:
                 # Check if volume is declining (exhaustion)
-                recent_volume = df['volume'].tail(3).mean()
-                prev_volume = df['volume'].tail(10).head(7).mean()
+                recent_volume, prev_volume = volume_window_means(ohlcv)
                 
                 if recent_volume < prev_volume * 0.7:  # 30% volume drop
                     return {
@@ -139,12 +261,12 @@ class PumpDetector:
                     }
             
             # Condition 3: Check for reversal candle patterns
-            last_candle = df.iloc[-1]
-            prev_candle = df.iloc[-2]
+            o, h, l, c = ohlcv[-1, OPEN], ohlcv[-1, HIGH], ohlcv[-1, LOW], ohlcv[-1, CLOSE]
+            prev_o, prev_c = ohlcv[-2, OPEN], ohlcv[-2, CLOSE]
             
-            body = abs(last_candle['close'] - last_candle['open'])
-            wick_top = last_candle['high'] - max(last_candle['close'], last_candle['open'])
-            wick_bottom = min(last_candle['close'], last_candle['open']) - last_candle['low']
+            body = abs(c - o)
+            wick_top = h - max(c, o)
+            wick_bottom = min(c, o) - l
             
             # Shooting star / doji at top
             if wick_top > body * 2 and rsi > 60:
@@ -156,10 +278,10 @@ class PumpDetector:
                 }
             
             # Bearish engulfing
-            if (last_candle['close'] < last_candle['open'] and  # Red candle
-                prev_candle['close'] > prev_candle['open'] and  # Previous green
-                last_candle['open'] > prev_candle['close'] and  # Opens above
-                last_candle['close'] < prev_candle['open'] and  # Closes below
+            if (c < o and  # Red candle
+                prev_c > prev_o and  # Previous green
+                o > prev_c and  # Opens above
+                c < prev_o and  # Closes below
                 rsi > 55):
                 return {
                     'ready': True,
@@ -181,10 +303,7 @@ class PumpDetector:
     
     def get_pumped_coin(self, symbol: str) -> Optional[Dict]:
         """Get specific pumped coin data"""
-        for coin in self.pumped_coins:
-            if coin['symbol'] == symbol:
-                return coin
-        return None
+        return self._pumped_by_symbol.get(symbol)
     
     def check_1h_trend(self, symbol: str) -> Dict:
         """
@@ -209,24 +328,14 @@ class PumpDetector:
                     'rsi_1h': 50
                 }
             
-            import pandas as pd
-            from indicators import calculate_rsi
-            
-            # Binance returns 12 columns for klines
-            columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 
-                      'close_time', 'quote_volume', 'trades', 'taker_buy_volume', 
-                      'taker_buy_quote_volume', 'ignore']
-            df = pd.DataFrame(klines, columns=columns)
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            ohlcv = klines_to_ohlcv(klines)
             
-            rsi_1h = calculate_rsi(df['close'], 14)
-            current_rsi = float(rsi_1h.iloc[-1])
+            # RSI and EMAs keep per-symbol state - only new 1h candles are folded in
+            current_rsi = self._stream_rsi(ohlcv, symbol, 14, self._rsi_1h_state)
             
             # Check EMA for trend
-            ema_9 = df['close'].ewm(span=9).mean().iloc[-1]
-            ema_21 = df['close'].ewm(span=21).mean().iloc[-1]
-            current_price = df['close'].iloc[-1]
+            ema_9, ema_21 = self._stream_ema_9_21(ohlcv, symbol)
+            current_price = ohlcv[-1, CLOSE]
             
             # Strong overbought on 1h - BEST for SHORT
             if current_rsi > 70:
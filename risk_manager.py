@@ -3,9 +3,36 @@ Risk Manager Module
 Handles position sizing, stop-loss, and take-profit calculations
 """
 
-from typing import Dict, Tuple, Optional
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Sequence, Tuple, Optional
+import numpy as np
 import config
+from indicators import SRLevels
 from logger import logger
+from risk_math import (
+    stop_loss_price, take_profit_price, smart_stop_loss_price, smart_take_profit_price
+)
+
+
+def side_sign(side: str) -> float:
+    """+1.0 for BUY, -1.0 for SELL (price moves in the trade's favour by +sign)"""
+    return 1.0 if side == "BUY" else -1.0
+
+
+@dataclass(slots=True)
+class TradeParams:
+    """Sized entry with its protective prices (from calculate_trade_params)"""
+    symbol: str
+    side: str  # BUY or SELL
+    entry_price: float
+    quantity: float
+    stop_loss: float
+    take_profit: float
+    risk_usdt: float
+    reward_usdt: float
+    initial_margin: float
+    risk_reward_ratio: float
+    smart_sl: bool  # Stop loss sits at an S/R level (not the ATR fallback)
 
 
 class RiskManager:
@@ -13,22 +40,57 @@ class RiskManager:
     
     def __init__(self, client):
         self.client = client
-        self._symbol_info_cache = {}
+        # symbol -> (price precision, quantity precision), known symbols only
+        self._precisions: Dict[str, Tuple[int, int]] = {}
+        self.reload_config()
+    
+    def reload_config(self):
+        """Re-read the risk settings from config (they are cached per instance)"""
+        self._use_fixed_capital = config.USE_FIXED_CAPITAL
+        self._total_capital = config.TOTAL_CAPITAL_USDT
+        self._init_margin = config.INITIAL_MARGIN_PER_TRADE
+        self._max_pct = config.MAX_POSITION_SIZE_PERCENT
+        self._lev = config.LEVERAGE
+        self._sl_mult = config.STOP_LOSS_ATR_MULTIPLIER
+        self._rr = config.TAKE_PROFIT_RR_RATIO
+        self._max_positions = config.MAX_OPEN_POSITIONS
     
     def get_capital(self) -> float:
         """Get trading capital (fixed or from balance)"""
-        if config.USE_FIXED_CAPITAL:
-            return config.TOTAL_CAPITAL_USDT
+        if self._use_fixed_capital:
+            return self._total_capital
         else:
             return self.client.get_usdt_balance()
     
     def get_symbol_info(self, symbol: str) -> Dict:
-        """Get and cache symbol info"""
-        if symbol not in self._symbol_info_cache:
+        """Get symbol info (cached by the client, which also reloads unknown symbols)"""
+        return self.client.get_symbol_info(symbol) or {}
+    
+    def _precision(self, symbol: str) -> Optional[Tuple[int, int]]:
+        """(price, quantity) precision, or None for a symbol the client doesn't know"""
+        precision = self._precisions.get(symbol)
+        if precision is None:
             info = self.client.get_symbol_info(symbol)
-            if info:
-                self._symbol_info_cache[symbol] = info
-        return self._symbol_info_cache.get(symbol, {})
+            if not info:
+                return None
+            precision = self._precisions[symbol] = (
+                info.get('pricePrecision', 2), info.get('quantityPrecision', 3)
+            )
+        return precision
+    
+    def round_price(self, symbol: str, price: float) -> float:
+        """client.round_price with the symbol's precision cached"""
+        precision = self._precision(symbol)
+        if precision is None:
+            return self.client.round_price(symbol, price)
+        return round(price, precision[0])
+    
+    def round_quantity(self, symbol: str, quantity: float) -> float:
+        """client.round_quantity with the symbol's precision cached"""
+        precision = self._precision(symbol)
+        if precision is None:
+            return self.client.round_quantity(symbol, quantity)
+        return round(quantity, precision[1])
     
     def calculate_position_size(self, symbol: str, entry_price: float, 
                                  stop_loss_price: float) -> float:
@@ -52,20 +114,20 @@ class RiskManager:
         capital = self.get_capital()
         
         # Calculate Initial Margin for this trade
-        initial_margin = config.INITIAL_MARGIN_PER_TRADE
+        initial_margin = self._init_margin
         
         # Cap at max position size
-        max_margin = capital * (config.MAX_POSITION_SIZE_PERCENT / 100)
+        max_margin = capital * (self._max_pct / 100)
         initial_margin = min(initial_margin, max_margin)
         
         # Calculate position value with leverage
-        position_value = initial_margin * config.LEVERAGE
+        position_value = initial_margin * self._lev
         
         # Convert to quantity
         quantity = position_value / entry_price
         
         # Round to symbol precision
-        quantity = self.client.round_quantity(symbol, quantity)
+        quantity = self.round_quantity(symbol, quantity)
         
         return quantity
     
@@ -82,18 +144,10 @@ class RiskManager:
         Returns:
             Stop loss price
         """
-        stop_distance = atr * config.STOP_LOSS_ATR_MULTIPLIER
-        
-        # Ensure minimum distance (0.5%) to prevent immediate trigger
-        min_distance = entry_price * 0.005
-        stop_distance = max(stop_distance, min_distance)
-        
-        if side == "BUY":
-            stop_loss = entry_price - stop_distance
-        else:  # SELL
-            stop_loss = entry_price + stop_distance
-        
-        return stop_loss
+        # Minimum distance (0.5%) prevents an immediate trigger
+        return stop_loss_price(
+            float(entry_price), float(atr), side_sign(side), self._sl_mult
+        )
     
     def calculate_take_profit(self, entry_price: float, stop_loss: float,
                               side: str) -> float:
@@ -108,18 +162,12 @@ class RiskManager:
         Returns:
             Take profit price
         """
-        risk = abs(entry_price - stop_loss)
-        reward = risk * config.TAKE_PROFIT_RR_RATIO
-        
-        if side == "BUY":
-            take_profit = entry_price + reward
-        else:  # SELL
-            take_profit = entry_price - reward
-        
-        return take_profit
+        return take_profit_price(
+            float(entry_price), float(stop_loss), side_sign(side), self._rr
+        )
     
     def calculate_smart_stop_loss(self, entry_price: float, atr: float, 
-                                   side: str, sr_levels: dict) -> float:
+                                   side: str, sr_levels: SRLevels) -> Tuple[float, bool]:
         """
         Calculate smart stop loss using Support/Resistance levels
         Places SL just below support (for BUY) or above resistance (for SELL)
@@ -129,37 +177,21 @@ class RiskManager:
             entry_price: Entry price
             atr: ATR value
             side: BUY or SELL
-            sr_levels: Support/Resistance levels dict
+            sr_levels: Support/Resistance levels
         
         Returns:
-            Smart stop loss price
+            (stop loss price, True if an S/R level was used)
         """
-        atr_sl = self.calculate_stop_loss(entry_price, atr, side)
-        
-        if not sr_levels:
-            return atr_sl
-        
-        if side == "BUY":
-            nearest_support = sr_levels.get('nearest_support')
-            if nearest_support:
-                # Place SL just below support (0.3% buffer)
-                smart_sl = nearest_support * 0.997
-                # Use smart SL if it's better than ATR SL (higher = tighter)
-                if smart_sl > atr_sl and smart_sl < entry_price * 0.99:
-                    return smart_sl
-        else:  # SELL
-            nearest_resistance = sr_levels.get('nearest_resistance')
-            if nearest_resistance:
-                # Place SL just above resistance (0.3% buffer)
-                smart_sl = nearest_resistance * 1.003
-                # Use smart SL if it's better than ATR SL (lower = tighter)
-                if smart_sl < atr_sl and smart_sl > entry_price * 1.01:
-                    return smart_sl
-        
-        return atr_sl
+        if sr_levels is None:
+            return self.calculate_stop_loss(entry_price, atr, side), False
+        
+        return smart_stop_loss_price(
+            float(entry_price), float(atr), side_sign(side), self._sl_mult,
+            sr_levels.support, sr_levels.resistance
+        )
     
     def calculate_smart_take_profit(self, entry_price: float, stop_loss: float,
-                                     side: str, sr_levels: dict) -> float:
+                                     side: str, sr_levels: SRLevels) -> float:
         """
         Calculate smart take profit using Support/Resistance levels
         Places TP at next resistance (for BUY) or support (for SELL)
@@ -169,42 +201,22 @@ class RiskManager:
             entry_price: Entry price
             stop_loss: Stop loss price
             side: BUY or SELL
-            sr_levels: Support/Resistance levels dict
+            sr_levels: Support/Resistance levels
         
         Returns:
             Smart take profit price
         """
-        rr_tp = self.calculate_take_profit(entry_price, stop_loss, side)
-        
-        if not sr_levels:
-            return rr_tp
-        
-        if side == "BUY":
-            nearest_resistance = sr_levels.get('nearest_resistance')
-            if nearest_resistance:
-                # Place TP just below resistance (0.2% buffer)
-                smart_tp = nearest_resistance * 0.998
-                # Only use if gives reasonable R:R (at least 1.5:1)
-                risk = entry_price - stop_loss
-                reward = smart_tp - entry_price
-                if reward >= risk * 1.5:
-                    return smart_tp
-        else:  # SELL
-            nearest_support = sr_levels.get('nearest_support')
-            if nearest_support:
-                # Place TP just above support (0.2% buffer)
-                smart_tp = nearest_support * 1.002
-                # Only use if gives reasonable R:R (at least 1.5:1)
-                risk = stop_loss - entry_price
-                reward = entry_price - smart_tp
-                if reward >= risk * 1.5:
-                    return smart_tp
-        
-        return rr_tp
+        if sr_levels is None:
+            return self.calculate_take_profit(entry_price, stop_loss, side)
+        
+        return smart_take_profit_price(
+            float(entry_price), float(stop_loss), side_sign(side), self._rr,
+            sr_levels.support, sr_levels.resistance
+        )
     
     def calculate_trade_params(self, symbol: str, side: str, 
                                 entry_price: float, atr: float,
-                                sr_levels: dict = None) -> Dict:
+                                sr_levels: SRLevels = None) -> TradeParams:
         """
         Calculate all trade parameters using Initial Margin approach
         
@@ -220,21 +232,21 @@ class RiskManager:
             sr_levels: Optional Support/Resistance levels for smart SL/TP
         
         Returns:
-            Dictionary with quantity, stop_loss, take_profit
+            TradeParams with quantity, stop_loss, take_profit
         """
         # Calculate stop loss (smart if S/R available)
-        if sr_levels:
-            stop_loss = self.calculate_smart_stop_loss(entry_price, atr, side, sr_levels)
+        if sr_levels is not None:
+            stop_loss, smart_sl = self.calculate_smart_stop_loss(entry_price, atr, side, sr_levels)
         else:
-            stop_loss = self.calculate_stop_loss(entry_price, atr, side)
-        stop_loss = self.client.round_price(symbol, stop_loss)
+            stop_loss, smart_sl = self.calculate_stop_loss(entry_price, atr, side), False
+        stop_loss = self.round_price(symbol, stop_loss)
         
         # Calculate take profit (smart if S/R available)
-        if sr_levels:
+        if sr_levels is not None:
             take_profit = self.calculate_smart_take_profit(entry_price, stop_loss, side, sr_levels)
         else:
             take_profit = self.calculate_take_profit(entry_price, stop_loss, side)
-        take_profit = self.client.round_price(symbol, take_profit)
+        take_profit = self.round_price(symbol, take_profit)
         
         # Calculate position size (now uses fixed capital internally)
         quantity = self.calculate_position_size(symbol, entry_price, stop_loss)
@@ -244,21 +256,119 @@ class RiskManager:
         reward_amount = abs(take_profit - entry_price) * quantity
         
         # Calculate Initial Margin for display
-        initial_margin = (quantity * entry_price) / config.LEVERAGE
-        
-        return {
-            'symbol': symbol,
-            'side': side,
-            'entry_price': entry_price,
-            'quantity': quantity,
-            'stop_loss': stop_loss,
-            'take_profit': take_profit,
-            'risk_usdt': risk_amount,
-            'reward_usdt': reward_amount,
-            'initial_margin': initial_margin,
-            'risk_reward_ratio': config.TAKE_PROFIT_RR_RATIO,
-            'smart_sl': sr_levels is not None
-        }
+        initial_margin = (quantity * entry_price) / self._lev
+        
+        return TradeParams(
+            symbol=symbol,
+            side=side,
+            entry_price=entry_price,
+            quantity=quantity,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            risk_usdt=risk_amount,
+            reward_usdt=reward_amount,
+            initial_margin=initial_margin,
+            risk_reward_ratio=self._rr,
+            smart_sl=smart_sl
+        )
+    
+    def calculate_trade_params_batch(self, symbols: Sequence[str], sides: Sequence[str],
+                                     entries: np.ndarray, atrs: np.ndarray,
+                                     sr_levels: Tuple[np.ndarray, np.ndarray] = None) -> List[TradeParams]:
+        """
+        calculate_trade_params for N signals at once (same results)
+        
+        The SL/TP/size arithmetic runs as array ops; only the per-symbol
+        price/quantity rounding stays a Python loop.
+        
+        Args:
+            symbols: Trading pairs
+            sides: BUY or SELL per signal
+            entries: Entry prices
+            atrs: ATR values
+            sr_levels: Optional (supports, resistances) arrays, NaN = no level
+        
+        Returns:
+            List of TradeParams, in input order
+        """
+        n = len(symbols)
+        if n == 0:
+            return []
+        
+        entries = np.asarray(entries, dtype=np.float64)
+        atrs = np.asarray(atrs, dtype=np.float64)
+        is_buy = np.asarray(sides) == "BUY"
+        sign = np.where(is_buy, 1.0, -1.0)
+        
+        # ATR stop, at least 0.5% away from entry
+        stop_loss = entries - sign * np.maximum(atrs * self._sl_mult, entries * 0.005)
+        smart_sl = np.zeros(n, dtype=bool)
+        
+        if sr_levels is not None:
+            supports = np.asarray(sr_levels[0], dtype=np.float64)
+            resistances = np.asarray(sr_levels[1], dtype=np.float64)
+            
+            # Tighter stop just past the nearest S/R level
+            support_sl = supports * 0.997
+            resistance_sl = resistances * 1.003
+            use_support = is_buy & (supports > 0) & (support_sl > stop_loss) & (support_sl < entries * 0.99)
+            use_resistance = ~is_buy & (resistances > 0) & (resistance_sl < stop_loss) & (resistance_sl > entries * 1.01)
+            stop_loss = np.where(use_support, support_sl, stop_loss)
+            stop_loss = np.where(use_resistance, resistance_sl, stop_loss)
+            smart_sl = use_support | use_resistance
+        
+        stop_loss = np.fromiter(
+            (self.round_price(s, p) for s, p in zip(symbols, stop_loss.tolist())),
+            dtype=np.float64, count=n
+        )
+        
+        # R:R take profit from the rounded stop
+        take_profit = entries + sign * (np.abs(entries - stop_loss) * self._rr)
+        
+        if sr_levels is not None:
+            # Just before the next S/R level if that still gives >= 1.5:1
+            resistance_tp = resistances * 0.998
+            support_tp = supports * 1.002
+            use_resistance = is_buy & (resistances > 0) & (resistance_tp - entries >= (entries - stop_loss) * 1.5)
+            use_support = ~is_buy & (supports > 0) & (entries - support_tp >= (stop_loss - entries) * 1.5)
+            take_profit = np.where(use_resistance, resistance_tp, take_profit)
+            take_profit = np.where(use_support, support_tp, take_profit)
+        
+        take_profit = [self.round_price(s, p) for s, p in zip(symbols, take_profit.tolist())]
+        
+        # Same margin for every signal: min(fixed margin, max % of capital)
+        initial_margin = min(self._init_margin,
+                             self.get_capital() * (self._max_pct / 100))
+        raw_quantity = (initial_margin * self._lev) / entries
+        quantity = np.fromiter(
+            (self.round_quantity(s, q) for s, q in zip(symbols, raw_quantity.tolist())),
+            dtype=np.float64, count=n
+        )
+        
+        risk_amount = np.abs(entries - stop_loss) * quantity
+        reward_amount = np.abs(np.asarray(take_profit) - entries) * quantity
+        margin = (quantity * entries) / self._lev
+        
+        smart_sl = smart_sl.tolist()
+        return [
+            TradeParams(
+                symbol=symbols[i],
+                side=sides[i],
+                entry_price=entry,
+                quantity=q,
+                stop_loss=sl,
+                take_profit=take_profit[i],
+                risk_usdt=risk,
+                reward_usdt=rew,
+                initial_margin=im,
+                risk_reward_ratio=self._rr,
+                smart_sl=smart_sl[i]
+            )
+            for i, (entry, q, sl, risk, rew, im) in enumerate(zip(
+                entries.tolist(), quantity.tolist(), stop_loss.tolist(),
+                risk_amount.tolist(), reward_amount.tolist(), margin.tolist()
+            ))
+        ]
     
     def can_open_position(self, current_positions: list) -> bool:
         """
@@ -270,36 +380,48 @@ class RiskManager:
         Returns:
             True if we can open new position
         """
-        return len(current_positions) < config.MAX_OPEN_POSITIONS
+        return len(current_positions) < self._max_positions
+    
+    @staticmethod
+    def open_symbols(positions: list) -> FrozenSet[str]:
+        """
+        Symbols with a non-zero position (build once per cycle, then O(1) lookups)
+        
+        Args:
+            positions: List of current positions
+        
+        Returns:
+            Frozenset of symbols
+        """
+        return frozenset(
+            pos['symbol'] for pos in positions if float(pos.get('positionAmt', 0)) != 0
+        )
     
-    def is_symbol_in_position(self, symbol: str, positions: list) -> bool:
+    def is_symbol_in_position(self, symbol: str, open_symbols: FrozenSet[str]) -> bool:
         """
         Check if we already have a position in this symbol
         
         Args:
             symbol: Trading pair
-            positions: List of current positions
+            open_symbols: Set from open_symbols(positions)
         
         Returns:
             True if already in position
         """
-        for pos in positions:
-            if pos['symbol'] == symbol and float(pos.get('positionAmt', 0)) != 0:
-                return True
-        return False
+        return symbol in open_symbols
     
-    def validate_trade(self, trade_params: Dict) -> Tuple[bool, str]:
+    def validate_trade(self, trade_params: TradeParams) -> Tuple[bool, str]:
         """
         Validate trade parameters before execution
         
         Args:
-            trade_params: Trade parameters dictionary
+            trade_params: Trade parameters
         
         Returns:
             Tuple of (is_valid, reason)
         """
-        quantity = trade_params['quantity']
-        entry_price = trade_params['entry_price']
+        quantity = trade_params.quantity
+        entry_price = trade_params.entry_price
         
         # Get capital
         capital = self.get_capital()
@@ -309,7 +431,7 @@ class RiskManager:
             return False, "Quantity too small"
         
         # Check if we have enough margin
-        required_margin = (quantity * entry_price) / config.LEVERAGE
+        required_margin = (quantity * entry_price) / self._lev
         if required_margin > capital:
             return False, f"Insufficient capital. Need {required_margin:.2f} USDT"
         
@@ -342,13 +464,13 @@ if __name__ == "__main__":
         atr=500.0
     )
     
-    print(f"\n✅ Quantity: {params['quantity']} BTC")
-    print(f"✅ Position Value: ${params['quantity'] * params['entry_price']:.2f}")
-    print(f"✅ Initial Margin: ${params['initial_margin']:.2f}")
-    print(f"✅ Stop Loss: ${params['stop_loss']}")
-    print(f"✅ Take Profit: ${params['take_profit']}")
-    print(f"✅ Risk: ${params['risk_usdt']:.2f}")
-    print(f"✅ Reward: ${params['reward_usdt']:.2f}")
+    print(f"\n✅ Quantity: {params.quantity} BTC")
+    print(f"✅ Position Value: ${params.quantity * params.entry_price:.2f}")
+    print(f"✅ Initial Margin: ${params.initial_margin:.2f}")
+    print(f"✅ Stop Loss: ${params.stop_loss}")
+    print(f"✅ Take Profit: ${params.take_profit}")
+    print(f"✅ Risk: ${params.risk_usdt:.2f}")
+    print(f"✅ Reward: ${params.reward_usdt:.2f}")
     
     # Validate
     is_valid, reason = rm.validate_trade(params)
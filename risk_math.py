@@ -0,0 +1,72 @@
+"""
+Risk Math Module
+Scalar stop-loss / take-profit kernels used by RiskManager
+
+Side is passed as a sign: +1.0 for BUY, -1.0 for SELL.
+"""
+
+# numba is optional - the kernels run as plain Python without it
+from numba_compat import njit
+
+
+@njit("float64(float64, float64, float64, float64)", cache=True)
+def stop_loss_price(entry: float, atr: float, sign: float, atr_mult: float) -> float:
+    """ATR stop, at least 0.5% from entry so it can't trigger immediately"""
+    return entry - sign * max(atr * atr_mult, entry * 0.005)
+
+
+@njit("float64(float64, float64, float64, float64)", cache=True)
+def take_profit_price(entry: float, stop_loss: float, sign: float, rr_ratio: float) -> float:
+    """Take profit at rr_ratio times the stop distance"""
+    return entry + sign * (abs(entry - stop_loss) * rr_ratio)
+
+
+@njit("Tuple((float64, boolean))(float64, float64, float64, float64, float64, float64)", cache=True)
+def smart_stop_loss_price(entry: float, atr: float, sign: float, atr_mult: float,
+                          support: float, resistance: float):
+    """
+    Stop just past the nearest S/R level when tighter than the ATR stop
+    
+    support / resistance are NaN (or 0) when there is no level.
+    Returns (stop_loss, used_sr) - used_sr is False for the ATR fallback.
+    """
+    atr_sl = stop_loss_price(entry, atr, sign, atr_mult)
+    
+    if sign > 0:
+        if support > 0.0:
+            # Just below support (0.3% buffer), higher = tighter
+            smart_sl = support * 0.997
+            if smart_sl > atr_sl and smart_sl < entry * 0.99:
+                return smart_sl, True
+    else:
+        if resistance > 0.0:
+            # Just above resistance (0.3% buffer), lower = tighter
+            smart_sl = resistance * 1.003
+            if smart_sl < atr_sl and smart_sl > entry * 1.01:
+                return smart_sl, True
+    
+    return atr_sl, False
+
+
+@njit("float64(float64, float64, float64, float64, float64, float64)", cache=True)
+def smart_take_profit_price(entry: float, stop_loss: float, sign: float, rr_ratio: float,
+                            support: float, resistance: float) -> float:
+    """
+    Take profit just before the next S/R level if that still gives >= 1.5:1
+    
+    support / resistance are NaN (or 0) when there is no level.
+    """
+    if sign > 0:
+        if resistance > 0.0:
+            # Just below resistance (0.2% buffer)
+            smart_tp = resistance * 0.998
+            if smart_tp - entry >= (entry - stop_loss) * 1.5:
+                return smart_tp
+    else:
+        if support > 0.0:
+            # Just above support (0.2% buffer)
+            smart_tp = support * 1.002
+            if entry - smart_tp >= (stop_loss - entry) * 1.5:
+                return smart_tp
+    
+    return take_profit_price(entry, stop_loss, sign, rr_ratio)
@@ -4,17 +4,31 @@ Scans top 30 pairs for trading signals
 """
 
 import asyncio
-import aiohttp
+import sqlite3
+import threading
 import time
-from typing import Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import numpy as np
 
 import config
-from binance_client import BinanceClient
-from indicators import klines_to_dataframe, calculate_all_indicators, get_latest_indicators
-from strategy import generate_signal, filter_signals, Signal
+from binance_client import BinanceClient, json_loads
+from kline_cache import KlineCache
+from kline_stream import KlineStream, interval_ms
+from indicators import klines_to_ohlcv, calculate_latest_indicators, OPEN_TIME
+from indicators_numba import calculate_latest_indicators_numba, NUMBA_AVAILABLE
+from strategy import generate_signal, filter_signals, primary_can_qualify, Signal
 from logger import logger
 
+# aiohttp is optional - without it scans use the thread pool
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
 
 class Scanner:
     """Scans multiple trading pairs for signals"""
@@ -28,14 +42,56 @@ class Scanner:
         # Volatility refresh tracking
         self.last_volatility_refresh = 0
         
-        # Cache for kline data
-        self._kline_cache = {}
+        # LRU cache of indicators: key -> (time, indicators), bounded by _cache_capacity()
+        self._kline_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
         self._cache_expiry = 5  # seconds
+        self._cache_lock = threading.Lock()  # Scan threads share it
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Live kline buffers (start_stream); REST only seeds them
+        self.kline_stream: Optional[KlineStream] = None
+        
+        # Compiled indicator pass when numba is installed - compiled (or
+        # loaded from the cache) here rather than on the first scan
+        self._latest_indicators = calculate_latest_indicators
+        if getattr(config, 'USE_NUMBA_INDICATORS', False) and NUMBA_AVAILABLE:
+            self._latest_indicators = calculate_latest_indicators_numba
+            calculate_latest_indicators_numba(np.ones((2, 6)))
+        
+        # Parsed OHLCV per (symbol, interval), shifted in place as candles arrive
+        self._ohlcv_bufs: Dict[Tuple[str, str], np.ndarray] = {}
+        # One lock per buffer - a straggler from an earlier scan may still be parsing
+        self._ohlcv_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        
+        # Closed candles on disk - REST fetches only the tail past them
+        self.kline_cache: Optional[KlineCache] = None
+        cache_file = getattr(config, 'KLINE_CACHE_FILE', None)
+        if cache_file:
+            try:
+                self.kline_cache = KlineCache(cache_file, config.KLINES_LIMIT)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Kline cache unavailable: {e}")
+        
+        # Async fan-out of every (symbol, timeframe) fetch when aiohttp is available.
+        # One event loop and session for the scanner's lifetime, so keep-alive
+        # connections survive between scans (closed in close()).
+        self.use_async = AIOHTTP_AVAILABLE
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session = None
+        
+        # Persistent scan pool - threads (and their keep-alive connections) stay warm
+        self.scan_workers = getattr(config, 'SCAN_WORKERS', 10)
+        self.scan_timeout = getattr(config, 'SCAN_TIMEOUT_SECONDS', 10)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.scan_workers, thread_name_prefix="scanner"
+        )
     
     def update_pairs(self) -> List[str]:
         """Fetch and update top trading pairs by volume (fallback)"""
         try:
             self.pairs = self.client.get_top_pairs_by_volume(config.TOP_PAIRS_COUNT)
+            self._pairs_changed()
             logger.info(f"Updated pairs list: {len(self.pairs)} pairs (by volume)")
             return self.pairs
         except Exception as e:
@@ -47,6 +103,7 @@ class Scanner:
         try:
             self.pairs = self.client.get_top_pairs_by_volatility(config.TOP_PAIRS_COUNT)
             self.last_volatility_refresh = time.time()
+            self._pairs_changed()
             logger.info(f"🔥 Updated pairs list: {len(self.pairs)} pairs (by volatility)")
             return self.pairs
         except Exception as e:
@@ -80,37 +137,230 @@ class Scanner:
             Dictionary with indicators or None
         """
         try:
-            # Check cache
             cache_key = f"{symbol}_{interval}"
-            if cache_key in self._kline_cache:
-                cache_time, data = self._kline_cache[cache_key]
-                if time.time() - cache_time < self._cache_expiry:
-                    return data
+            data = self._cache_get(cache_key)
+            if data is not None:
+                return data
             
-            # Fetch klines
-            klines = self.client.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=config.KLINES_LIMIT
-            )
+            # Live buffer first, REST only to (re)seed it
+            klines = self.kline_stream.get_klines(symbol, interval) if self.kline_stream else None
+            if klines is None:
+                klines = self._fetch_rest_klines(symbol, interval)
+                if self.kline_stream and klines:
+                    self.kline_stream.seed(symbol, interval, klines)
             
             if not klines:
                 return None
             
-            # Convert to DataFrame and calculate indicators
-            df = klines_to_dataframe(klines)
-            df = calculate_all_indicators(df)
-            indicators = get_latest_indicators(df)
+            # Calculate indicators
+            indicators = self._process_klines(symbol, interval, klines)
+            
+            self._cache_put(cache_key, indicators)
+            return indicators
+            
+        except Exception as e:
+            logger.debug(f"Error fetching {symbol} {interval}: {e}")
+            return None
+    
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        """Fresh cached indicators (marked most recently used) or None"""
+        with self._cache_lock:
+            entry = self._kline_cache.get(key)
+            if entry is not None and time.time() - entry[0] < self._cache_expiry:
+                self._kline_cache.move_to_end(key)
+                self.cache_hits += 1
+                return entry[1]
+            self.cache_misses += 1
+            return None
+    
+    def _cache_put(self, key: str, indicators: Dict):
+        """Cache indicators, evicting least recently used entries past capacity"""
+        capacity = self._cache_capacity()
+        with self._cache_lock:
+            self._kline_cache[key] = (time.time(), indicators)
+            self._kline_cache.move_to_end(key)
+            while len(self._kline_cache) > capacity:
+                self._kline_cache.popitem(last=False)
+    
+    def _cache_capacity(self) -> int:
+        """Two scans' worth of (pair, timeframe) entries"""
+        timeframes = sum(1 for tf in self._timeframes() if tf)
+        return max(len(self.pairs), 1) * timeframes * 2
+    
+    def _fetch_rest_klines(self, symbol: str, interval: str) -> Optional[list]:
+        """REST klines, fetching only the candles the disk cache doesn't have"""
+        if not self.kline_cache:
+            return self.client.get_klines(symbol=symbol, interval=interval, limit=config.KLINES_LIMIT)
+        
+        cached, limit = self.kline_cache.plan(symbol, interval)
+        klines = self.kline_cache.merge(
+            symbol, interval, cached,
+            self.client.get_klines(symbol=symbol, interval=interval, limit=limit)
+        )
+        if klines is None and cached:
+            # Tail didn't line up with the cache - fetch in full
+            klines = self.kline_cache.merge(
+                symbol, interval, [],
+                self.client.get_klines(symbol=symbol, interval=interval, limit=config.KLINES_LIMIT)
+            )
+        return klines
+    
+    async def _fetch_rest_klines_async(self, session, symbol: str, interval: str) -> Optional[list]:
+        """Async _fetch_rest_klines"""
+        async def get(limit):
+            params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+            async with session.get(f"{self.client.base_url}/fapi/v1/klines", params=params) as response:
+                response.raise_for_status()
+                return json_loads(await response.read())
+        
+        if not self.kline_cache:
+            return await get(config.KLINES_LIMIT)
+        
+        cached, limit = self.kline_cache.plan(symbol, interval)
+        klines = self.kline_cache.merge(symbol, interval, cached, await get(limit))
+        if klines is None and cached:
+            klines = self.kline_cache.merge(symbol, interval, [], await get(config.KLINES_LIMIT))
+        return klines
+    
+    def _process_klines(self, symbol: str, interval: str, klines: list) -> Dict:
+        """Klines -> latest indicators (CPU-bound part of a fetch)"""
+        return self._latest_indicators(self._parse_klines(symbol, interval, klines))
+    
+    def _parse_klines(self, symbol: str, interval: str, klines: list) -> np.ndarray:
+        """
+        klines_to_ohlcv into the (symbol, interval) buffer
+        
+        Closed candles never change, so after the first parse only the
+        candles opened since the last call (plus the one that was still
+        forming) are parsed; the rest are shifted up in place.
+        
+        Returns a copy, so a later parse can't change candles a scan that
+        ran past its deadline is still reading.
+        """
+        key = (symbol, interval)
+        lock = self._ohlcv_locks.get(key)
+        if lock is None:
+            lock = self._ohlcv_locks.setdefault(key, threading.Lock())
+        
+        with lock:
+            buf = self._ohlcv_bufs.get(key)
+            n = len(klines)
+            if buf is None or len(buf) != n:
+                buf = self._ohlcv_bufs[key] = klines_to_ohlcv(klines)
+                return buf.copy()
+            
+            shift = int(klines[-1][0] - buf[-1, OPEN_TIME]) // interval_ms(interval)
+            if 0 <= shift < n and klines[0][0] == buf[shift, OPEN_TIME]:
+                if shift:
+                    buf[:-shift] = buf[shift:]
+                start = n - shift - 1
+                klines_to_ohlcv(klines[start:], out=buf[start:])
+            else:
+                klines_to_ohlcv(klines, out=buf)
+            return buf.copy()
+    
+    def _timeframes(self) -> Tuple[Optional[str], ...]:
+        """(primary, confirmation, trend, macro, major) intervals, None where disabled"""
+        return (
+            config.PRIMARY_TIMEFRAME,
+            config.CONFIRMATION_TIMEFRAME if config.REQUIRE_CONFIRMATION else None,
+            getattr(config, 'TREND_TIMEFRAME', None),
+            getattr(config, 'MACRO_TIMEFRAME', None),
+            getattr(config, 'MAJOR_TIMEFRAME', None)
+        )
+    
+    async def _fetch_klines_async(self, session, symbol: str, interval: str) -> Optional[Dict]:
+        """Async fetch_klines_for_symbol (same cache, indicators computed on the pool)"""
+        try:
+            cache_key = f"{symbol}_{interval}"
+            data = self._cache_get(cache_key)
+            if data is not None:
+                return data
+            
+            klines = self.kline_stream.get_klines(symbol, interval) if self.kline_stream else None
+            if klines is None:
+                klines = await self._fetch_rest_klines_async(session, symbol, interval)
+                if self.kline_stream and klines:
+                    self.kline_stream.seed(symbol, interval, klines)
+            
+            if not klines:
+                return None
             
-            # Cache result
-            self._kline_cache[cache_key] = (time.time(), indicators)
+            # Keep the indicator math off the event loop
+            loop = asyncio.get_running_loop()
+            indicators = await loop.run_in_executor(self._executor, self._process_klines, symbol, interval, klines)
             
+            self._cache_put(cache_key, indicators)
             return indicators
             
         except Exception as e:
             logger.debug(f"Error fetching {symbol} {interval}: {e}")
             return None
     
+    async def scan_symbol_async(self, session, symbol: str) -> Optional[Signal]:
+        """scan_symbol with the higher timeframes fetched concurrently"""
+        async def fetch(interval):
+            if interval is None:
+                return None
+            return await self._fetch_klines_async(session, symbol, interval)
+        
+        primary_tf, *higher_tfs = self._timeframes()
+        primary = await fetch(primary_tf)
+        if not primary:
+            return None
+        
+        # Filtered out, neutral, or too weak on 1m - the other timeframes can't change that
+        if not primary_can_qualify(primary):
+            return None
+        
+        confirmation, trend, macro, major = await asyncio.gather(
+            *[fetch(tf) for tf in higher_tfs]
+        )
+        
+        return generate_signal(symbol, primary, confirmation, trend, macro, major)
+    
+    async def scan_all_async(self, pairs: List[str] = None) -> List[Signal]:
+        """
+        Fetch every (symbol, timeframe) pair over the scanner's aiohttp session
+        
+        Args:
+            pairs: Symbols to scan (default: all pairs)
+        
+        Returns:
+            Non-neutral signals (unfiltered); symbols not done within
+            scan_timeout are skipped
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=50, limit_per_host=50)
+            self._session = aiohttp.ClientSession(connector=connector)
+        session = self._session
+        
+        tasks = [
+            asyncio.create_task(self.scan_symbol_async(session, s))
+            for s in (self.pairs if pairs is None else pairs)
+        ]
+        if not tasks:
+            return []
+        
+        done, pending = await asyncio.wait(tasks, timeout=self.scan_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.debug(f"Scan budget {self.scan_timeout}s exceeded, skipped {len(pending)} symbols")
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        # Pair order (not completion order) so equal-strength ties sort the same every scan
+        results = [None] * len(tasks)
+        for i, task in enumerate(tasks):
+            if task not in done:
+                continue
+            try:
+                results[i] = task.result()
+            except Exception as e:
+                logger.debug(f"Async scan error: {e}")
+        
+        return [s for s in results if s is not None and s.type != Signal.NEUTRAL]
+    
     def scan_symbol(self, symbol: str) -> Optional[Signal]:
         """
         Perform full analysis on a single symbol using triple timeframe
@@ -123,6 +373,10 @@ class Scanner:
         if not primary:
             return None
         
+        # Filtered out, neutral, or too weak on 1m - the other timeframes can't change that
+        if not primary_can_qualify(primary):
+            return None
+        
         # Get confirmation timeframe (5m)
         confirmation = None
         if config.REQUIRE_CONFIRMATION:
@@ -190,9 +444,13 @@ class Scanner:
         
         return valid_signals
     
-    def scan_all_pairs_threaded(self) -> List[Signal]:
+    def scan_all_pairs_threaded(self, skip_symbols: FrozenSet[str] = frozenset()) -> List[Signal]:
         """
-        Scan all pairs using thread pool for better performance
+        Scan all pairs concurrently (aiohttp if available, else thread pool)
+        
+        Args:
+            skip_symbols: Symbols not to scan - RiskManager.open_symbols(),
+                since no second trade can be opened on them
         
         Returns:
             List of valid signals sorted by strength
@@ -200,23 +458,15 @@ class Scanner:
         self.scan_count += 1
         self.last_scan_time = time.time()
         
-        signals = []
+        pairs = [s for s in self.pairs if s not in skip_symbols]
         
-        # Use thread pool for concurrent requests
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = {
-                executor.submit(self.scan_symbol, symbol): symbol 
-                for symbol in self.pairs
-            }
-            
-            for future in futures:
-                try:
-                    signal = future.result(timeout=5)
-                    if signal and signal.type != Signal.NEUTRAL:
-                        signals.append(signal)
-                except Exception as e:
-                    logger.debug(f"Thread error: {e}")
-                    continue
+        if self.use_async:
+            # The session is tied to its loop, so every scan reuses the same loop
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+            signals = self._loop.run_until_complete(self.scan_all_async(pairs))
+        else:
+            signals = self._scan_with_threads(pairs)
         
         # Filter and sort
         valid_signals = filter_signals(signals)
@@ -228,6 +478,32 @@ class Scanner:
         
         return valid_signals
     
+    def _scan_with_threads(self, pairs: List[str] = None) -> List[Signal]:
+        """Thread pool scan of pairs (default: all) - returns non-neutral signals (unfiltered)"""
+        # Fan out, then handle each result as soon as it lands
+        futures = {
+            self._executor.submit(self.scan_symbol, symbol): i
+            for i, symbol in enumerate(self.pairs if pairs is None else pairs)
+        }
+        # Stored by pair index so equal-strength ties sort the same every scan
+        results = [None] * len(futures)
+        
+        try:
+            for future in as_completed(futures, timeout=self.scan_timeout):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.debug(f"Thread error: {e}")
+                    continue
+        except FuturesTimeout:
+            # Over the scan budget - drop what hasn't started, skip the stragglers
+            pending = [f for f in futures if not f.done()]
+            for future in pending:
+                future.cancel()
+            logger.debug(f"Scan budget {self.scan_timeout}s exceeded, skipped {len(pending)} symbols")
+        
+        return [s for s in results if s is not None and s.type != Signal.NEUTRAL]
+    
     def get_best_signal(self) -> Optional[Signal]:
         """
         Get the single best trading signal
@@ -241,9 +517,60 @@ class Scanner:
             return signals[0]
         return None
     
+    def start_stream(self) -> bool:
+        """
+        Keep klines for all pairs/timeframes live over one WebSocket
+        
+        Returns:
+            True if the stream is running
+        """
+        if not getattr(config, 'KLINE_STREAM_ENABLED', False):
+            return False
+        
+        self.kline_stream = KlineStream(config.KLINES_LIMIT)
+        if not self.kline_stream.start():
+            self.kline_stream = None
+            return False
+        
+        self._subscribe_pairs()
+        return True
+    
+    def stop_stream(self):
+        """Stop the kline stream"""
+        if self.kline_stream:
+            self.kline_stream.stop()
+            self.kline_stream = None
+    
+    def close(self):
+        """Stop the kline stream, close the aiohttp session and the kline cache (bot shutdown)"""
+        self.stop_stream()
+        if self._loop is not None:
+            if self._session is not None:
+                self._loop.run_until_complete(self._session.close())
+                self._session = None
+            self._loop.close()
+            self._loop = None
+        if self.kline_cache:
+            kline_cache, self.kline_cache = self.kline_cache, None
+            kline_cache.close()
+    
+    def _pairs_changed(self):
+        """Resubscribe the stream and free the buffers of dropped pairs"""
+        self._subscribe_pairs()
+        pairs = set(self.pairs)
+        for key in [k for k in self._ohlcv_bufs if k[0] not in pairs]:
+            del self._ohlcv_bufs[key]
+            self._ohlcv_locks.pop(key, None)
+    
+    def _subscribe_pairs(self):
+        """Point the kline stream at the current pairs list"""
+        if self.kline_stream:
+            self.kline_stream.set_pairs(self.pairs, [tf for tf in self._timeframes() if tf])
+    
     def clear_cache(self):
         """Clear the kline cache"""
-        self._kline_cache.clear()
+        with self._cache_lock:
+            self._kline_cache.clear()
     
     def get_stats(self) -> Dict:
         """Get scanner statistics"""
@@ -251,7 +578,9 @@ class Scanner:
             'pairs_count': len(self.pairs),
             'scan_count': self.scan_count,
             'last_scan': self.last_scan_time,
-            'cache_size': len(self._kline_cache)
+            'cache_size': len(self._kline_cache),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
         }
 
 
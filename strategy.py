@@ -3,124 +3,259 @@ Trading Strategy Module
 Multi-timeframe signal generation using EMA + RSI + MACD
 """
 
-from typing import Dict, Optional, Tuple
+import heapq
+from dataclasses import dataclass
+from operator import attrgetter, itemgetter
+from typing import ClassVar, Dict, List, Optional, Sequence, Tuple
+import numpy as np
 import config
-from indicators import get_latest_indicators
+from indicators import IndicatorDict, get_latest_indicators
 
 
+def reload_config():
+    """Re-read the signal settings from config (cached in module globals)"""
+    global _MIN_STRENGTH, _REQUIRE_CONFIRMATION, _ALIGNMENT_ENABLED, _MIN_ALIGNMENT
+    global _RSI_BUY, _RSI_SELL, _RSI_OB, _RSI_OS, _RSI_TABLE
+    global _VOL_ENABLED, _MIN_VOL, _ADX_ENABLED, _MIN_ADX
+    _MIN_STRENGTH = config.MIN_SIGNAL_STRENGTH
+    _REQUIRE_CONFIRMATION = config.REQUIRE_CONFIRMATION
+    _ALIGNMENT_ENABLED = getattr(config, 'TREND_ALIGNMENT_ENABLED', False)
+    _MIN_ALIGNMENT = getattr(config, 'MIN_TF_ALIGNMENT', 4)
+    _RSI_BUY = config.RSI_BUY_THRESHOLD
+    _RSI_SELL = config.RSI_SELL_THRESHOLD
+    _RSI_OB = config.RSI_OVERBOUGHT
+    _RSI_OS = config.RSI_OVERSOLD
+    _RSI_TABLE = _rsi_table(_RSI_BUY, _RSI_SELL, _RSI_OB, _RSI_OS)
+    _VOL_ENABLED = getattr(config, 'VOLUME_FILTER_ENABLED', False)
+    _MIN_VOL = getattr(config, 'MIN_VOLUME_MULTIPLIER', 1.5)
+    _ADX_ENABLED = getattr(config, 'ADX_FILTER_ENABLED', False)
+    _MIN_ADX = getattr(config, 'ADX_MIN_THRESHOLD', 25)
+
+
+@dataclass(slots=True, eq=False)
 class Signal:
     """Represents a trading signal"""
     
-    BUY = "BUY"
-    SELL = "SELL"
-    NEUTRAL = "NEUTRAL"
+    BUY: ClassVar[str] = "BUY"
+    SELL: ClassVar[str] = "SELL"
+    NEUTRAL: ClassVar[str] = "NEUTRAL"
     
-    def __init__(self, signal_type: str, strength: int, symbol: str, 
-                 price: float, indicators: dict):
-        self.type = signal_type
-        self.strength = strength  # 0-5
-        self.symbol = symbol
-        self.price = price
-        self.indicators = indicators
+    type: str
+    strength: int  # 0-8
+    symbol: str
+    price: float
+    indicators: IndicatorDict
     
-    def __repr__(self):
+    def __repr__(self) -> str:
         return f"Signal({self.type}, {self.symbol}, strength={self.strength})"
     
     def is_valid(self) -> bool:
         """Check if signal meets minimum strength requirement"""
-        return self.strength >= config.MIN_SIGNAL_STRENGTH
+        return self.strength >= _MIN_STRENGTH
+
+
+# Rule bits set by _score_primary -> reason text ({rsi} filled in by decode_reasons)
+_EMA_UP, _EMA_DOWN = 1 << 0, 1 << 1
+_EMA_CROSS_UP, _EMA_CROSS_DOWN = 1 << 2, 1 << 3
+_RSI_BULLISH, _RSI_BEARISH = 1 << 4, 1 << 5
+_RSI_OVERSOLD, _RSI_OVERBOUGHT = 1 << 6, 1 << 7
+_MACD_UP, _MACD_DOWN = 1 << 8, 1 << 9
+_MACD_CROSS_UP, _MACD_CROSS_DOWN = 1 << 10, 1 << 11
 
+_REASONS = (
+    (_EMA_UP, "EMA9 > EMA21 (Uptrend)"),
+    (_EMA_DOWN, "EMA9 < EMA21 (Downtrend)"),
+    (_EMA_CROSS_UP, "EMA Bullish Crossover"),
+    (_EMA_CROSS_DOWN, "EMA Bearish Crossover"),
+    (_RSI_BULLISH, "RSI {rsi:.1f} (Bullish zone)"),
+    (_RSI_BEARISH, "RSI {rsi:.1f} (Bearish zone)"),
+    (_RSI_OVERSOLD, "RSI {rsi:.1f} (Oversold - Reversal)"),
+    (_RSI_OVERBOUGHT, "RSI {rsi:.1f} (Overbought - Reversal)"),
+    (_MACD_UP, "MACD > Signal (Bullish)"),
+    (_MACD_DOWN, "MACD < Signal (Bearish)"),
+    (_MACD_CROSS_UP, "MACD Bullish Crossover"),
+    (_MACD_CROSS_DOWN, "MACD Bearish Crossover"),
+)
 
-def analyze_primary_timeframe(indicators: dict) -> Tuple[str, int, list]:
+
+def decode_reasons(flags: int, rsi: float) -> List[str]:
     """
-    Analyze 1-minute timeframe for entry signals
+    Reason strings for the rule bits from analyze_primary_timeframe
+    
+    Only for logging/display - scoring never builds them.
+    
+    Args:
+        flags: Rule bits
+        rsi: The primary RSI (shown in the RSI reasons)
+    """
+    return [text.format(rsi=rsi) for bit, text in _REASONS if flags & bit]
+
+
+def _score_primary(ema_fast: float, ema_slow: float, ema_cross: int, rsi: float,
+                   macd: float, macd_signal: float, macd_cross: int,
+                   rsi_buy: float, rsi_sell: float,
+                   rsi_overbought: float, rsi_oversold: float) -> Tuple[str, int, int]:
+    """
+    Score the entry rules - scalars in, no dicts or strings built
     
     Returns:
-        Tuple of (signal_type, strength, reasons)
+        Tuple of (signal_type, strength, rule bits for decode_reasons)
     """
-    reasons = []
     buy_score = 0
     sell_score = 0
+    flags = 0
     
     # 1. EMA Trend (1 point)
-    if indicators['ema_fast'] > indicators['ema_slow']:
+    if ema_fast > ema_slow:
         buy_score += 1
-        reasons.append("EMA9 > EMA21 (Uptrend)")
-    elif indicators['ema_fast'] < indicators['ema_slow']:
+        flags |= _EMA_UP
+    elif ema_fast < ema_slow:
         sell_score += 1
-        reasons.append("EMA9 < EMA21 (Downtrend)")
+        flags |= _EMA_DOWN
     
     # 2. EMA Crossover (1 point - recent crossover is stronger signal)
-    if indicators['ema_cross'] == 1:
+    if ema_cross == 1:
         buy_score += 1
-        reasons.append("EMA Bullish Crossover")
-    elif indicators['ema_cross'] == -1:
+        flags |= _EMA_CROSS_UP
+    elif ema_cross == -1:
         sell_score += 1
-        reasons.append("EMA Bearish Crossover")
+        flags |= _EMA_CROSS_DOWN
     
     # 3. RSI Conditions (1 point)
-    rsi = indicators['rsi']
-    if rsi > config.RSI_BUY_THRESHOLD and rsi < config.RSI_OVERBOUGHT:
+    if rsi > rsi_buy and rsi < rsi_overbought:
         buy_score += 1
-        reasons.append(f"RSI {rsi:.1f} (Bullish zone)")
-    elif rsi < config.RSI_SELL_THRESHOLD and rsi > config.RSI_OVERSOLD:
+        flags |= _RSI_BULLISH
+    elif rsi < rsi_sell and rsi > rsi_oversold:
         sell_score += 1
-        reasons.append(f"RSI {rsi:.1f} (Bearish zone)")
-    elif rsi <= config.RSI_OVERSOLD:
+        flags |= _RSI_BEARISH
+    elif rsi <= rsi_oversold:
         buy_score += 1
-        reasons.append(f"RSI {rsi:.1f} (Oversold - Reversal)")
-    elif rsi >= config.RSI_OVERBOUGHT:
+        flags |= _RSI_OVERSOLD
+    elif rsi >= rsi_overbought:
         sell_score += 1
-        reasons.append(f"RSI {rsi:.1f} (Overbought - Reversal)")
+        flags |= _RSI_OVERBOUGHT
     
     # 4. MACD Direction (1 point)
-    if indicators['macd'] > indicators['macd_signal']:
+    if macd > macd_signal:
         buy_score += 1
-        reasons.append("MACD > Signal (Bullish)")
-    elif indicators['macd'] < indicators['macd_signal']:
+        flags |= _MACD_UP
+    elif macd < macd_signal:
         sell_score += 1
-        reasons.append("MACD < Signal (Bearish)")
+        flags |= _MACD_DOWN
     
     # 5. MACD Crossover (1 point - recent crossover is stronger)
-    if indicators['macd_cross'] == 1:
+    if macd_cross == 1:
         buy_score += 1
-        reasons.append("MACD Bullish Crossover")
-    elif indicators['macd_cross'] == -1:
+        flags |= _MACD_CROSS_UP
+    elif macd_cross == -1:
         sell_score += 1
-        reasons.append("MACD Bearish Crossover")
+        flags |= _MACD_CROSS_DOWN
     
     # Determine signal
     if buy_score > sell_score and buy_score >= 2:
-        return Signal.BUY, buy_score, reasons
+        return Signal.BUY, buy_score, flags
     elif sell_score > buy_score and sell_score >= 2:
-        return Signal.SELL, sell_score, reasons
+        return Signal.SELL, sell_score, flags
     else:
-        return Signal.NEUTRAL, 0, reasons
+        return Signal.NEUTRAL, 0, flags
+
+
+def _rsi_table(rsi_buy: float, rsi_sell: float, rsi_overbought: float,
+               rsi_oversold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The RSI ladder of _score_primary as a lookup table for array scoring
+    
+    With sorted thresholds b, searchsorted(b, rsi, 'left') + searchsorted(b, rsi, 'right')
+    numbers the open intervals and the thresholds themselves in order, so
+    each region gets the point the ladder gives a value inside it.
+    
+    Returns:
+        (thresholds, buy point per region, sell point per region)
+    """
+    bounds = np.unique(np.array([rsi_oversold, rsi_buy, rsi_sell, rsi_overbought], dtype=np.float64))
+    samples = [bounds[0] - 1.0]
+    for i, bound in enumerate(bounds):
+        samples.append(bound)
+        samples.append((bound + bounds[i + 1]) / 2 if i + 1 < len(bounds) else bound + 1.0)
+    
+    flags = np.array([
+        _score_primary(0.0, 0.0, 0, rsi, 0.0, 0.0, 0,
+                       rsi_buy, rsi_sell, rsi_overbought, rsi_oversold)[2]
+        for rsi in samples
+    ])
+    return (bounds,
+            (flags & (_RSI_BULLISH | _RSI_OVERSOLD)) != 0,
+            (flags & (_RSI_BEARISH | _RSI_OVERBOUGHT)) != 0)
+
+
+def analyze_primary_timeframe(indicators: IndicatorDict) -> Tuple[str, int, int]:
+    """
+    Analyze 1-minute timeframe for entry signals
+    
+    Returns:
+        Tuple of (signal_type, strength, rule bits) - decode_reasons(bits, rsi)
+        gives the reason strings
+    """
+    return _score_primary(
+        indicators['ema_fast'], indicators['ema_slow'], indicators['ema_cross'],
+        indicators['rsi'], indicators['macd'], indicators['macd_signal'],
+        indicators['macd_cross'],
+        _RSI_BUY, _RSI_SELL, _RSI_OB, _RSI_OS
+    )
 
 
-def analyze_confirmation_timeframe(indicators: dict) -> bool:
+def analyze_confirmation_timeframe(indicators: IndicatorDict) -> int:
     """
     Analyze 5-minute timeframe for trend confirmation
     
     Returns:
-        True if trend is confirmed, False otherwise
+        Trend direction: 1 up, -1 down
     """
     # Check if 5m trend aligns with signal
     # We just need EMA trend confirmation
     return indicators['trend']
 
 
-def generate_signal(symbol: str, primary_indicators: dict, 
-                   confirmation_indicators: dict = None,
-                   trend_indicators: dict = None,
-                   macro_indicators: dict = None,
-                   major_indicators: dict = None) -> Signal:
+def passes_filters(indicators: IndicatorDict) -> bool:
+    """
+    Volume / ADX filters on the primary timeframe
+    
+    Returns:
+        False if generate_signal would return NEUTRAL whatever the other timeframes say
+    """
+    if _VOL_ENABLED and indicators['volume_ratio'] < _MIN_VOL:
+        return False
+    if _ADX_ENABLED and indicators['adx'] < _MIN_ADX:
+        return False
+    return True
+
+
+def primary_can_qualify(indicators: IndicatorDict) -> bool:
+    """
+    Whether a signal from this 1m analysis can still reach MIN_SIGNAL_STRENGTH
+    
+    False when the filters reject it, the primary timeframe is neutral, or
+    even +1 from every higher timeframe would leave it short - the other
+    timeframes needn't be fetched then.
+    """
+    if not passes_filters(indicators):
+        return False
+    signal_type, strength, _ = analyze_primary_timeframe(indicators)
+    return signal_type != Signal.NEUTRAL and strength + _REQUIRE_CONFIRMATION + 3 >= _MIN_STRENGTH
+
+
+def generate_signal(symbol: str, primary_indicators: IndicatorDict, 
+                   confirmation_indicators: Optional[IndicatorDict] = None,
+                   trend_indicators: Optional[IndicatorDict] = None,
+                   macro_indicators: Optional[IndicatorDict] = None,
+                   major_indicators: Optional[IndicatorDict] = None) -> Signal:
     """
     Generate trading signal from 5 timeframe analysis
     
     Args:
         symbol: Trading pair
-        primary_indicators: 1m timeframe indicators (entry)
+        primary_indicators: 1m timeframe indicators (entry) - a full
+            calculate_latest_indicators dict (volume_ratio and adx included)
         confirmation_indicators: 5m timeframe indicators (short-term)
         trend_indicators: 15m timeframe indicators (medium-term)
         macro_indicators: 30m timeframe indicators (main trend)
@@ -129,34 +264,18 @@ def generate_signal(symbol: str, primary_indicators: dict,
     Returns:
         Signal object
     """
-    # Volume Filter - skip low volume signals
-    if getattr(config, 'VOLUME_FILTER_ENABLED', False):
-        volume_ratio = primary_indicators.get('volume_ratio', 1.0)
-        min_volume = getattr(config, 'MIN_VOLUME_MULTIPLIER', 1.5)
-        if volume_ratio < min_volume:
-            return Signal(
-                Signal.NEUTRAL, 
-                0, 
-                symbol, 
-                primary_indicators['close'],
-                primary_indicators
-            )
-    
-    # ADX Filter - skip weak trend signals
-    if getattr(config, 'ADX_FILTER_ENABLED', False):
-        adx = primary_indicators.get('adx', 0)
-        min_adx = getattr(config, 'ADX_MIN_THRESHOLD', 25)
-        if adx < min_adx:
-            return Signal(
-                Signal.NEUTRAL, 
-                0, 
-                symbol, 
-                primary_indicators['close'],
-                primary_indicators
-            )
+    # Volume / ADX Filters - skip low volume and weak trend signals
+    if not passes_filters(primary_indicators):
+        return Signal(
+            Signal.NEUTRAL, 
+            0, 
+            symbol, 
+            primary_indicators['close'],
+            primary_indicators
+        )
     
     # Analyze primary timeframe
-    signal_type, strength, reasons = analyze_primary_timeframe(primary_indicators)
+    signal_type, strength, _ = analyze_primary_timeframe(primary_indicators)
     
     # If no clear signal, return neutral
     if signal_type == Signal.NEUTRAL:
@@ -168,89 +287,38 @@ def generate_signal(symbol: str, primary_indicators: dict,
             primary_indicators
         )
     
-    # Check 5m confirmation timeframe
-    if config.REQUIRE_CONFIRMATION and confirmation_indicators:
-        conf_trend = analyze_confirmation_timeframe(confirmation_indicators)
-        
-        if signal_type == Signal.BUY and conf_trend != 1:
-            strength -= 1
-        elif signal_type == Signal.SELL and conf_trend != -1:
-            strength -= 1
-        
-        if (signal_type == Signal.BUY and conf_trend == 1) or \
-           (signal_type == Signal.SELL and conf_trend == -1):
-            strength = min(strength + 1, 8)  # Cap at 8 for 5 TF
-    
-    # Check 15m trend timeframe (medium-term)
-    if trend_indicators:
-        mid_trend = analyze_confirmation_timeframe(trend_indicators)
-        
-        if signal_type == Signal.BUY and mid_trend != 1:
-            strength -= 1
-        elif signal_type == Signal.SELL and mid_trend != -1:
-            strength -= 1
-        
-        if (signal_type == Signal.BUY and mid_trend == 1) or \
-           (signal_type == Signal.SELL and mid_trend == -1):
-            strength = min(strength + 1, 8)
-    
-    # Check 30m macro timeframe (main trend)
-    if macro_indicators:
-        main_trend = analyze_confirmation_timeframe(macro_indicators)
-        
-        if signal_type == Signal.BUY and main_trend != 1:
-            strength -= 1
-        elif signal_type == Signal.SELL and main_trend != -1:
-            strength -= 1
-        
-        if (signal_type == Signal.BUY and main_trend == 1) or \
-           (signal_type == Signal.SELL and main_trend == -1):
-            strength = min(strength + 1, 8)
-    
-    # Check 1h major timeframe (major trend)
-    if major_indicators:
-        major_trend = analyze_confirmation_timeframe(major_indicators)
-        
-        if signal_type == Signal.BUY and major_trend != 1:
-            strength -= 1
-        elif signal_type == Signal.SELL and major_trend != -1:
-            strength -= 1
-        
-        if (signal_type == Signal.BUY and major_trend == 1) or \
-           (signal_type == Signal.SELL and major_trend == -1):
-            strength = min(strength + 1, 8)
-    
-    # Trend Alignment Check - count aligned timeframes
-    if getattr(config, 'TREND_ALIGNMENT_ENABLED', False):
-        aligned_count = 1  # Primary TF already aligned (we have a signal)
-        
-        # Check each confirmation TF
-        if confirmation_indicators:
-            conf_trend = analyze_confirmation_timeframe(confirmation_indicators)
-            if (signal_type == Signal.BUY and conf_trend == 1) or \
-               (signal_type == Signal.SELL and conf_trend == -1):
-                aligned_count += 1
-        
-        if trend_indicators:
-            mid_trend = analyze_confirmation_timeframe(trend_indicators)
-            if (signal_type == Signal.BUY and mid_trend == 1) or \
-               (signal_type == Signal.SELL and mid_trend == -1):
-                aligned_count += 1
-        
-        if macro_indicators:
-            main_trend = analyze_confirmation_timeframe(macro_indicators)
-            if (signal_type == Signal.BUY and main_trend == 1) or \
-               (signal_type == Signal.SELL and main_trend == -1):
-                aligned_count += 1
-        
-        if major_indicators:
-            major_trend = analyze_confirmation_timeframe(major_indicators)
-            if (signal_type == Signal.BUY and major_trend == 1) or \
-               (signal_type == Signal.SELL and major_trend == -1):
+    # Can't reach MIN_SIGNAL_STRENGTH even if every higher timeframe agrees
+    max_strength = strength + ((_REQUIRE_CONFIRMATION and bool(confirmation_indicators))
+                               + bool(trend_indicators) + bool(macro_indicators)
+                               + bool(major_indicators))
+    if max_strength < _MIN_STRENGTH:
+        return Signal(
+            Signal.NEUTRAL, 
+            0, 
+            symbol, 
+            primary_indicators['close'],
+            primary_indicators
+        )
+    
+    # Higher timeframes (5m, 15m, 30m, 1h): +1 when aligned, -1 when not.
+    # 5m only scores with REQUIRE_CONFIRMATION but always counts toward alignment.
+    want = 1 if signal_type == Signal.BUY else -1
+    aligned_count = 1  # Primary TF already aligned (we have a signal)
+    scored = _REQUIRE_CONFIRMATION
+    for tf_indicators in (confirmation_indicators, trend_indicators,
+                          macro_indicators, major_indicators):
+        if tf_indicators:
+            if analyze_confirmation_timeframe(tf_indicators) == want:
                 aligned_count += 1
-        
-        min_alignment = getattr(config, 'MIN_TF_ALIGNMENT', 4)
-        if aligned_count < min_alignment:
+                if scored:
+                    strength = min(strength + 1, 8)  # Cap at 8 for 5 TF
+            elif scored:
+                strength -= 1
+        scored = True
+    
+    # Trend Alignment Check - enough aligned timeframes
+    if _ALIGNMENT_ENABLED:
+        if aligned_count < _MIN_ALIGNMENT:
             return Signal(
                 Signal.NEUTRAL, 
                 0, 
@@ -268,18 +336,133 @@ def generate_signal(symbol: str, primary_indicators: dict,
     )
 
 
-def filter_signals(signals: list) -> list:
+# Primary timeframe columns scored by generate_signals_batch
+_PRIMARY_FIELDS = ('ema_fast', 'ema_slow', 'ema_cross', 'rsi', 'macd', 'macd_signal', 'macd_cross')
+
+
+def _collect_indicators(indicator_dicts: Sequence[IndicatorDict], fields: Tuple[str, ...]) -> np.ndarray:
+    """Stack indicator dicts into a (symbols, fields) float array"""
+    row = itemgetter(*fields)
+    return np.array(
+        [row(d) for d in indicator_dicts], dtype=np.float64
+    ).reshape(len(indicator_dicts), len(fields))
+
+
+def prefilter_symbols(volume_ratios: np.ndarray, adx: np.ndarray) -> np.ndarray:
+    """
+    Volume / ADX filters of generate_signal for many symbols at once
+    
+    Args:
+        volume_ratios: Primary timeframe volume ratio per symbol
+        adx: Primary timeframe ADX per symbol
+    
+    Returns:
+        Boolean mask of symbols that pass (NaN passes, as in generate_signal)
+    """
+    keep = np.ones(len(volume_ratios), dtype=bool)
+    if _VOL_ENABLED:
+        keep &= ~(np.asarray(volume_ratios) < _MIN_VOL)
+    if _ADX_ENABLED:
+        keep &= ~(np.asarray(adx) < _MIN_ADX)
+    return keep
+
+
+def generate_signals_batch(symbols: Sequence[str], primary: Sequence[IndicatorDict],
+                           confirmation: Optional[Sequence[Optional[IndicatorDict]]] = None,
+                           trend: Optional[Sequence[Optional[IndicatorDict]]] = None,
+                           macro: Optional[Sequence[Optional[IndicatorDict]]] = None,
+                           major: Optional[Sequence[Optional[IndicatorDict]]] = None) -> List[Signal]:
+    """
+    generate_signal for many symbols at once (same scoring, as array ops)
+    
+    Args:
+        symbols: Trading pairs
+        primary: 1m indicators per symbol
+        confirmation, trend, macro, major: 5m / 15m / 30m / 1h indicators
+            per symbol (a missing timeframe, or None / {} entries, is skipped)
+    
+    Returns:
+        Non-neutral signals (unfiltered), in symbol order
+    """
+    n = len(symbols)
+    if n == 0:
+        return []
+    
+    ema_fast, ema_slow, ema_cross, rsi, macd, macd_signal, macd_cross = \
+        _collect_indicators(primary, _PRIMARY_FIELDS).T
+    
+    # RSI ladder via its lookup table (NaN scores nothing)
+    rsi_bounds, rsi_buy_table, rsi_sell_table = _RSI_TABLE
+    region = np.searchsorted(rsi_bounds, rsi, 'left') + np.searchsorted(rsi_bounds, rsi, 'right')
+    rsi_valid = ~np.isnan(rsi)
+    
+    buy_score = ((ema_fast > ema_slow).astype(np.int8) + (ema_cross == 1)
+                 + (rsi_buy_table[region] & rsi_valid) + (macd > macd_signal) + (macd_cross == 1))
+    sell_score = ((ema_fast < ema_slow).astype(np.int8) + (ema_cross == -1)
+                  + (rsi_sell_table[region] & rsi_valid) + (macd < macd_signal) + (macd_cross == -1))
+    
+    is_buy = (buy_score > sell_score) & (buy_score >= 2)
+    keep = is_buy | ((sell_score > buy_score) & (sell_score >= 2))
+    want = np.where(is_buy, 1, -1)
+    strength = np.where(is_buy, buy_score, sell_score).astype(np.int64)
+    
+    if _VOL_ENABLED or _ADX_ENABLED:
+        keep &= prefilter_symbols(
+            np.array([d['volume_ratio'] for d in primary], dtype=np.float64),
+            np.array([d['adx'] for d in primary], dtype=np.float64)
+        )
+    
+    # Higher timeframes: +1 when aligned, -1 when not (5m only if REQUIRE_CONFIRMATION)
+    aligned_count = np.ones(n, dtype=np.int64)  # Primary TF already aligned
+    max_strength = strength.copy()
+    for i, tf_indicators in enumerate((confirmation, trend, macro, major)):
+        if tf_indicators is None:
+            continue
+        present = np.array([bool(d) for d in tf_indicators])
+        tf_trend = np.array([d['trend'] if d else 0 for d in tf_indicators])
+        aligned = present & (tf_trend == want)
+        aligned_count += aligned
+        if i > 0 or _REQUIRE_CONFIRMATION:
+            max_strength += present
+            strength += aligned
+            strength -= present & ~aligned
+    strength = np.minimum(strength, 8)  # Cap at 8 for 5 TF
+    keep &= max_strength >= _MIN_STRENGTH  # Could never reach MIN_SIGNAL_STRENGTH
+    
+    if _ALIGNMENT_ENABLED:
+        keep &= aligned_count >= _MIN_ALIGNMENT
+    
+    return [
+        Signal(Signal.BUY if want[i] > 0 else Signal.SELL, int(strength[i]),
+               symbols[i], primary[i]['close'], primary[i])
+        for i in np.flatnonzero(keep).tolist()
+    ]
+
+
+_BY_STRENGTH = attrgetter('strength')
+
+
+def filter_signals(signals: List[Signal], k: Optional[int] = None) -> List[Signal]:
     """
     Filter and sort signals by strength
     
     Args:
         signals: List of Signal objects
+        k: Only return the k strongest (partial sort)
     
     Returns:
         Filtered list of valid signals, sorted by strength
     """
-    valid_signals = [s for s in signals if s.is_valid()]
-    return sorted(valid_signals, key=lambda x: x.strength, reverse=True)
+    # Same test as Signal.is_valid, without a method call per signal
+    min_strength = _MIN_STRENGTH
+    valid_signals = (s for s in signals if s.strength >= min_strength)
+    if k is not None:
+        # Same order as the full sort (ties keep input order)
+        return heapq.nlargest(k, valid_signals, key=_BY_STRENGTH)
+    return sorted(valid_signals, key=_BY_STRENGTH, reverse=True)
+
+
+reload_config()
 
 
 # Test when run directly
@@ -296,9 +479,12 @@ if __name__ == "__main__":
         'macd_signal': 0.3,
         'macd_hist': 0.2,
         'atr': 1.5,
+        'adx': 30.0,
         'trend': 1,
         'ema_cross': 1,
-        'macd_cross': 1
+        'macd_cross': 1,
+        'volume': 2000.0,
+        'volume_ratio': 2.0
     }
     
     signal = generate_signal("BTCUSDT", buy_indicators)
@@ -316,9 +502,12 @@ if __name__ == "__main__":
         'macd_signal': -0.3,
         'macd_hist': -0.2,
         'atr': 1.5,
+        'adx': 30.0,
         'trend': -1,
         'ema_cross': -1,
-        'macd_cross': -1
+        'macd_cross': -1,
+        'volume': 2000.0,
+        'volume_ratio': 2.0
     }
     
     signal = generate_signal("ETHUSDT", sell_indicators)
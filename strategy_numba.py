@@ -0,0 +1,177 @@
+"""
+Numba Strategy Module
+generate_signal for a whole (symbol, timeframe, feature) array in one compiled pass
+"""
+
+from operator import itemgetter
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import strategy
+from indicators import IndicatorDict
+from strategy import Signal
+# numba is optional - without it the kernel runs as (slow) plain Python
+from numba_compat import njit, prange
+
+# Feature columns of the (symbols, 5 timeframes, FEATURES) array
+FEATURES = ('ema_fast', 'ema_slow', 'ema_cross', 'rsi', 'macd', 'macd_signal',
+            'macd_cross', 'volume_ratio', 'adx', 'trend')
+EMA_FAST, EMA_SLOW, EMA_CROSS, RSI, MACD, MACD_SIGNAL, MACD_CROSS, VOLUME_RATIO, ADX, TREND = range(10)
+
+# Timeframe rows: 1m, 5m, 15m, 30m, 1h (a NaN trend = timeframe not supplied)
+TIMEFRAMES = 5
+
+
+@njit(cache=True, parallel=True)
+def score_batch(ind, thresh, flags):
+    """
+    The generate_signal rules for every symbol
+    
+    Args:
+        ind: (symbols, 5, FEATURES) float array - row 0 is the primary
+            timeframe, rows 1-4 only need TREND
+        thresh: (rsi_buy, rsi_sell, rsi_overbought, rsi_oversold,
+                 min_volume, min_adx, min_strength, min_alignment)
+        flags: (volume_filter, adx_filter, require_confirmation, trend_alignment)
+    
+    Returns:
+        (signal per symbol: 1 BUY / -1 SELL / 0 NEUTRAL, strength per symbol)
+    """
+    n = ind.shape[0]
+    signal = np.zeros(n, dtype=np.int8)
+    strength_out = np.zeros(n, dtype=np.int64)
+    rsi_buy, rsi_sell, rsi_ob, rsi_os = thresh[0], thresh[1], thresh[2], thresh[3]
+    
+    for s in prange(n):
+        p = ind[s, 0]
+        
+        # Volume / ADX filters (NaN passes)
+        if flags[0] and p[VOLUME_RATIO] < thresh[4]:
+            continue
+        if flags[1] and p[ADX] < thresh[5]:
+            continue
+        
+        # Primary timeframe rules (same order as strategy._score_primary)
+        buy = 0
+        sell = 0
+        if p[EMA_FAST] > p[EMA_SLOW]:
+            buy += 1
+        elif p[EMA_FAST] < p[EMA_SLOW]:
+            sell += 1
+        if p[EMA_CROSS] == 1:
+            buy += 1
+        elif p[EMA_CROSS] == -1:
+            sell += 1
+        rsi = p[RSI]
+        if rsi > rsi_buy and rsi < rsi_ob:
+            buy += 1
+        elif rsi < rsi_sell and rsi > rsi_os:
+            sell += 1
+        elif rsi <= rsi_os:
+            buy += 1
+        elif rsi >= rsi_ob:
+            sell += 1
+        if p[MACD] > p[MACD_SIGNAL]:
+            buy += 1
+        elif p[MACD] < p[MACD_SIGNAL]:
+            sell += 1
+        if p[MACD_CROSS] == 1:
+            buy += 1
+        elif p[MACD_CROSS] == -1:
+            sell += 1
+        
+        if buy > sell and buy >= 2:
+            want = 1
+            strength = buy
+        elif sell > buy and sell >= 2:
+            want = -1
+            strength = sell
+        else:
+            continue
+        
+        # Higher timeframes: +1 aligned / -1 not (5m scores only with require_confirmation)
+        max_strength = strength
+        aligned_count = 1
+        for tf in range(1, TIMEFRAMES):
+            tf_trend = ind[s, tf, TREND]
+            if tf_trend != tf_trend:
+                continue
+            scored = tf > 1 or flags[2]
+            if scored:
+                max_strength += 1
+            if tf_trend == want:
+                aligned_count += 1
+                if scored:
+                    strength = min(strength + 1, 8)
+            elif scored:
+                strength -= 1
+        
+        if max_strength < thresh[6]:
+            continue
+        if flags[3] and aligned_count < thresh[7]:
+            continue
+        
+        signal[s] = want
+        strength_out[s] = strength
+    
+    return signal, strength_out
+
+
+def pack_indicators(primary: Sequence[IndicatorDict],
+                    higher: Sequence[Optional[Sequence[Optional[IndicatorDict]]]]) -> np.ndarray:
+    """
+    Build the score_batch input from indicator dicts
+    
+    Args:
+        primary: 1m indicators per symbol
+        higher: 5m / 15m / 30m / 1h indicators per symbol (a missing
+            timeframe, or None / {} entries, is left as NaN)
+    """
+    ind = np.full((len(primary), TIMEFRAMES, len(FEATURES)), np.nan)
+    row = itemgetter(*FEATURES)
+    ind[:, 0] = np.array([row(d) for d in primary], dtype=np.float64).reshape(len(primary), len(FEATURES))
+    nan = np.nan
+    for tf, tf_indicators in enumerate(higher, 1):
+        if tf_indicators is not None:
+            ind[:, tf, TREND] = np.array([d['trend'] if d else nan for d in tf_indicators], dtype=np.float64)
+    return ind
+
+
+def strategy_params() -> Tuple[np.ndarray, np.ndarray]:
+    """score_batch thresholds and flags from strategy's cached config"""
+    thresh = np.array([
+        strategy._RSI_BUY, strategy._RSI_SELL, strategy._RSI_OB, strategy._RSI_OS,
+        strategy._MIN_VOL, strategy._MIN_ADX, strategy._MIN_STRENGTH, strategy._MIN_ALIGNMENT
+    ], dtype=np.float64)
+    flags = np.array([
+        strategy._VOL_ENABLED, strategy._ADX_ENABLED,
+        strategy._REQUIRE_CONFIRMATION, strategy._ALIGNMENT_ENABLED
+    ], dtype=np.bool_)
+    return thresh, flags
+
+
+def generate_signals_numba(symbols: Sequence[str], primary: Sequence[IndicatorDict],
+                           confirmation: Optional[Sequence[Optional[IndicatorDict]]] = None,
+                           trend: Optional[Sequence[Optional[IndicatorDict]]] = None,
+                           macro: Optional[Sequence[Optional[IndicatorDict]]] = None,
+                           major: Optional[Sequence[Optional[IndicatorDict]]] = None) -> List[Signal]:
+    """
+    strategy.generate_signals_batch via the compiled kernel
+    
+    Returns:
+        Non-neutral signals (unfiltered), in symbol order
+    """
+    if len(symbols) == 0:
+        return []
+    
+    thresh, flags = strategy_params()
+    signal, strength = score_batch(
+        pack_indicators(primary, (confirmation, trend, macro, major)), thresh, flags
+    )
+    
+    return [
+        Signal(Signal.BUY if signal[i] > 0 else Signal.SELL, int(strength[i]),
+               symbols[i], primary[i]['close'], primary[i])
+        for i in np.flatnonzero(signal).tolist()
+    ]